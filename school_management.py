@@ -2,7 +2,26 @@ import pyodbc
 import sys
 import re
 import csv
-from datetime import datetime
+import hashlib
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, OrderedDict, defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from heapq import nlargest
+from html import escape
+from itertools import chain
+from string import Template
+
+try:
+    import numpy as np  # tabulation and marks sheets only
+except ImportError:
+    np = None
 
 CONN_STR = (
     "DRIVER={SQL SERVER};"
@@ -11,30 +30,526 @@ CONN_STR = (
     "TRUSTED_CONNECTION=YES;"
 )
 
+# Connection pool settings (see ConnectionPool below)
+POOL_SIZE = 5                   # most connections open at the same time
+POOL_MIN_IDLE = 1               # idle connections kept open even past the timeout
+POOL_IDLE_TIMEOUT = 300         # seconds an unused connection stays open
+POOL_HEALTH_CHECK_AFTER = 30    # seconds idle before a connection is pinged on borrow
+POOL_ACQUIRE_TIMEOUT = 30       # seconds to wait when every connection is busy
+POOL_STATEMENT_CACHE_SIZE = 32  # prepared statements kept per connection
+
 ###############################################################################
 # Database connectivity and basic utilities
 ###############################################################################
 
+class PooledConnection:
+    """
+    A pyodbc connection borrowed from the ConnectionPool.
+    close() hands it back to the pool instead of closing it, so the usual
+    "conn = get_connection() ... conn.close()" pattern keeps working.
+    Anything not defined here (autocommit, getinfo, ...) goes to the raw connection.
+    """
+
+    def __init__(self, pool, raw_conn):
+        self._pool = pool
+        self._raw = raw_conn
+        self._statements = OrderedDict()  # sql text -> cursor it is prepared on
+        self._cursors = []                # plain cursors handed out during this lease
+        self.last_used = time.monotonic()
+        self.leased = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def cursor(self):
+        cursor = self._raw.cursor()
+        self._cursors.append(cursor)
+        return cursor
+
+    def commit(self):
+        self._raw.commit()
+
+    def rollback(self):
+        self._raw.rollback()
+
+    def close(self):
+        if self.leased:
+            self._pool.release(self)
+
+    def prepared(self, sql):
+        """
+        Returns the cursor that `sql` is prepared on for this connection:
+            rows = conn.prepared(sql).execute(sql, *params).fetchall()
+        pyodbc only calls SQLPrepare again when a cursor runs a different SQL
+        text than last time, so one cursor per statement lets repeated lookups
+        skip the prepare step. Least recently used statements are dropped.
+        The cursor is shared: read all of its results straight away and do
+        not close it.
+        """
+        cursor = self._statements.get(sql)
+        if cursor is not None:
+            self._statements.move_to_end(sql)
+            self._pool.record_statement(hit=True)
+            return cursor
+
+        self._pool.record_statement(hit=False)
+        cursor = self._raw.cursor()
+        self._statements[sql] = cursor
+        if len(self._statements) > self._pool.statement_cache_size:
+            _old_sql, old_cursor = self._statements.popitem(last=False)
+            try:
+                old_cursor.close()
+            except pyodbc.Error:
+                pass
+        return cursor
+
+    def execute(self, sql, *params):
+        """
+        Like pyodbc's Connection.execute: runs `sql` on a new cursor and
+        returns it. Use prepared() for statements repeated in a loop.
+        """
+        cursor = self.cursor()
+        cursor.execute(sql, *params)
+        return cursor
+
+    def end_lease(self):
+        """
+        Closes the cursors handed out during the lease and drains any
+        unread results on the prepared ones, so the next borrower does not
+        find the connection busy with someone else's result set (the
+        {SQL SERVER} driver allows one active result set per connection).
+        """
+        for cursor in self._cursors:
+            try:
+                cursor.close()
+            except pyodbc.Error:
+                pass  # already closed by its user
+        self._cursors.clear()
+        for cursor in self._statements.values():
+            try:
+                while cursor.nextset():
+                    pass
+            except pyodbc.Error:
+                pass  # no results pending
+
+    def discard(self):
+        """
+        Closes the underlying connection for good (used by the pool).
+        """
+        self.end_lease()
+        for cursor in self._statements.values():
+            try:
+                cursor.close()
+            except pyodbc.Error:
+                pass
+        self._statements.clear()
+        try:
+            self._raw.close()
+        except pyodbc.Error:
+            pass
+
+
+class ConnectionPool:
+    """
+    Keeps up to `size` open ODBC connections and lends them out.
+    - Idle connections are reused newest-first; ones idle longer than
+      `idle_timeout` are closed (down to `min_idle`).
+    - A connection that sat idle for `health_check_after` seconds is pinged
+      with SELECT 1 before it is handed out, and replaced if it is dead.
+    - Borrowers wait up to `acquire_timeout` seconds when all are in use.
+    stats() reports the reuse hit rate, wait times and statement cache hits.
+    """
+
+    def __init__(self, conn_str, size=POOL_SIZE, min_idle=POOL_MIN_IDLE,
+                 idle_timeout=POOL_IDLE_TIMEOUT, health_check_after=POOL_HEALTH_CHECK_AFTER,
+                 acquire_timeout=POOL_ACQUIRE_TIMEOUT, statement_cache_size=POOL_STATEMENT_CACHE_SIZE):
+        self.conn_str = conn_str
+        self.size = size
+        self.min_idle = min_idle
+        self.idle_timeout = idle_timeout
+        self.health_check_after = health_check_after
+        self.acquire_timeout = acquire_timeout
+        self.statement_cache_size = statement_cache_size
+
+        self._cond = threading.Condition()
+        self._idle = []       # oldest first; we pop from the end
+        self._open_count = 0  # idle + leased + being opened
+        self._stats = {
+            "borrows": 0,
+            "hits": 0,            # served by an already open connection
+            "misses": 0,          # had to open a new connection
+            "waits": 0,           # borrows that blocked because the pool was full
+            "wait_total": 0.0,
+            "wait_max": 0.0,
+            "health_check_failures": 0,
+            "evicted": 0,
+            "statement_hits": 0,
+            "statement_misses": 0,
+        }
+
+    def _connect(self):
+        return PooledConnection(self, pyodbc.connect(self.conn_str))
+
+    def _is_healthy(self, pooled):
+        try:
+            cursor = pooled.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            return True
+        except pyodbc.Error:
+            return False
+
+    def _evict_idle_locked(self, now):
+        # self._idle is ordered oldest first, so stale connections sit at the front
+        while len(self._idle) > self.min_idle and now - self._idle[0].last_used > self.idle_timeout:
+            stale = self._idle.pop(0)
+            self._open_count -= 1
+            self._stats["evicted"] += 1
+            stale.discard()
+
+    def acquire(self):
+        started = time.monotonic()
+        deadline = started + self.acquire_timeout
+        waited = False
+        pooled = None
+
+        with self._cond:
+            self._evict_idle_locked(started)
+            while True:
+                if self._idle:
+                    pooled = self._idle.pop()
+                    break
+                if self._open_count < self.size:
+                    self._open_count += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise RuntimeError(
+                        f"Timed out after {self.acquire_timeout}s waiting for a database connection "
+                        f"(pool size {self.size})."
+                    )
+                waited = True
+                self._cond.wait(remaining)
+
+        reused = pooled is not None
+        try:
+            if reused and time.monotonic() - pooled.last_used > self.health_check_after:
+                if not self._is_healthy(pooled):
+                    with self._cond:
+                        self._stats["health_check_failures"] += 1
+                    pooled.discard()
+                    reused = False
+                    pooled = None
+            if pooled is None:
+                pooled = self._connect()
+        except BaseException:
+            with self._cond:
+                self._open_count -= 1
+                self._cond.notify()
+            raise
+
+        pooled.leased = True
+        wait = time.monotonic() - started
+        with self._cond:
+            self._stats["borrows"] += 1
+            self._stats["hits" if reused else "misses"] += 1
+            if waited:
+                self._stats["waits"] += 1
+            self._stats["wait_total"] += wait
+            self._stats["wait_max"] = max(self._stats["wait_max"], wait)
+        return pooled
+
+    def release(self, pooled):
+        pooled.leased = False
+        try:
+            # Never hand the next borrower someone else's cursors or open transaction
+            pooled.end_lease()
+            pooled.rollback()
+        except pyodbc.Error:
+            pooled.discard()
+            with self._cond:
+                self._open_count -= 1
+                self._cond.notify()
+            return
+
+        pooled.last_used = time.monotonic()
+        with self._cond:
+            self._idle.append(pooled)
+            self._evict_idle_locked(pooled.last_used)
+            self._cond.notify()
+
+    def record_statement(self, hit):
+        with self._cond:
+            self._stats["statement_hits" if hit else "statement_misses"] += 1
+
+    def close_all(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._open_count -= len(idle)
+        for pooled in idle:
+            pooled.discard()
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats["open"] = self._open_count
+            stats["idle"] = len(self._idle)
+        borrows = stats["borrows"]
+        statements = stats["statement_hits"] + stats["statement_misses"]
+        stats["hit_rate"] = stats["hits"] / borrows if borrows else 0.0
+        stats["wait_avg"] = stats["wait_total"] / borrows if borrows else 0.0
+        stats["statement_hit_rate"] = stats["statement_hits"] / statements if statements else 0.0
+        return stats
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(CONN_STR)
+    return _pool
+
 def get_connection():
+    """
+    Borrows a connection from the pool. Call conn.close() to give it back.
+    """
     try:
-        conn = pyodbc.connect(CONN_STR)
-        return conn
+        return get_pool().acquire()
     except pyodbc.Error as e:
         print(f"[ERROR] Could not connect to database: {str(e)}")
         sys.exit(1)
 
-def initialize_database():
+@contextmanager
+def db_session():
     """
-    Creates a StudentRegistration table with 62 columns (A..BJ) 
-    matching your provided headers exactly.
-    Adjust data types and lengths as needed.
+    with db_session() as conn: ...
+    Borrows a pooled connection and always returns it, rolling back anything
+    that was not committed.
     """
-    create_stmt = """
-    IF NOT EXISTS (
-       SELECT * FROM sys.objects
-       WHERE object_id = OBJECT_ID(N'[dbo].[StudentRegistration]')
-         AND type in (N'U')
-    )
+    conn = get_connection()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+def print_pool_stats():
+    if _pool is None:
+        return
+    s = _pool.stats()
+    print("\n--- Database Connection Pool ---")
+    print(f"  Borrows: {s['borrows']}  Reused: {s['hits']}  Opened: {s['misses']}  "
+          f"Hit rate: {s['hit_rate']:.1%}")
+    print(f"  Wait avg: {s['wait_avg'] * 1000:.2f} ms  Wait max: {s['wait_max'] * 1000:.2f} ms  "
+          f"Blocked borrows: {s['waits']}")
+    print(f"  Open: {s['open']}  Idle: {s['idle']}  Evicted: {s['evicted']}  "
+          f"Failed health checks: {s['health_check_failures']}")
+    print(f"  Prepared statement hit rate: {s['statement_hit_rate']:.1%}")
+
+###############################################################################
+# Bulk inserts (array parameter binding)
+###############################################################################
+
+BULK_BATCH_SIZE = 500  # rows sent per executemany round trip
+
+_insert_sql_cache = {}
+
+def build_insert_sql(table, columns):
+    """
+    INSERT INTO table (c1, c2, ...) VALUES (?, ?, ...), built once per column list.
+    """
+    key = (table, tuple(columns))
+    sql = _insert_sql_cache.get(key)
+    if sql is None:
+        placeholders = ", ".join("?" for _ in columns)
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+        _insert_sql_cache[key] = sql
+    return sql
+
+def bulk_insert(cursor, table, columns, rows, batch_size=BULK_BATCH_SIZE):
+    """
+    Inserts `rows` into `table` in batches using pyodbc's fast_executemany,
+    so each batch is one array-bound round trip instead of one per row.
+
+    rows: list of (tag, params) pairs. The tag is anything the caller wants
+          back in the report (e.g. the spreadsheet row number).
+    Returns (inserted_tags, failed) where failed is a list of (tag, error text).
+
+    Each batch runs behind a savepoint. If a batch fails it is rolled back to
+    the savepoint and split in half until the bad rows are isolated, so one
+    malformed row costs a few extra round trips instead of a per-row import.
+    Nothing is committed here; the caller owns the transaction.
+    """
+    return bulk_execute(cursor, table, build_insert_sql(table, columns), rows, batch_size)
+
+def bulk_execute(cursor, table, sql, rows, batch_size=BULK_BATCH_SIZE):
+    """
+    bulk_insert for any single-row statement `sql` (e.g. an UPDATE ... WHERE
+    RegNo = ?) that writes to `table`. Same rows, batching, savepoints and
+    return value: (done_tags, failed).
+    """
+    cursor.fast_executemany = True
+
+    # SAVE TRANSACTION needs an open transaction. In pyodbc's manual-commit mode
+    # SQL Server only opens one on the first statement that touches a table.
+    cursor.execute(f"IF @@TRANCOUNT = 0 SELECT TOP (0) NULL FROM {table}")
+
+    inserted = []
+    failed = []
+    pending = [rows[i:i + batch_size] for i in range(0, len(rows), batch_size)]
+    pending.reverse()  # used as a stack; keep the original row order
+
+    while pending:
+        batch = pending.pop()
+        cursor.execute("SAVE TRANSACTION bulk_batch")
+        try:
+            cursor.executemany(sql, [params for (_tag, params) in batch])
+            inserted.extend(tag for (tag, _params) in batch)
+            continue
+        except pyodbc.Error as ex:
+            error = ex
+
+        cursor.execute("IF XACT_STATE() = 1 ROLLBACK TRANSACTION bulk_batch")
+        if cursor.execute("SELECT XACT_STATE()").fetchone()[0] != 1:
+            # The error doomed or rolled back the whole transaction, earlier
+            # batches included; nothing more can be written.
+            raise error
+
+        if len(batch) == 1:
+            failed.append((batch[0][0], str(error)))
+        else:
+            middle = len(batch) // 2
+            pending.append(batch[middle:])
+            pending.append(batch[:middle])
+
+    return inserted, failed
+
+def execute_batch(cursor, sql, *params):
+    """
+    Runs a multi-statement batch and reads through all of its results.
+    SQL Server reports an error in a later statement on a later result set,
+    so without this a failed INSERT or MERGE could go unnoticed and the
+    transaction would still be committed.
+    """
+    cursor.execute(sql, *params)
+    while cursor.nextset():
+        pass
+    return cursor
+
+###############################################################################
+# Paged listings (keyset pagination)
+###############################################################################
+
+LIST_PAGE_SIZE = 25  # rows shown per page in the listing screens
+
+def iter_keyset_pages(conn, select_sql, key_column, where=(), params=(),
+                      page_size=LIST_PAGE_SIZE, key_index=0):
+    """
+    Yields pages (lists of rows) of a listing ordered by `key_column`.
+    select_sql is "SELECT TOP (?) <columns> FROM <tables>"; the WHERE and
+    ORDER BY are added here. `where` is a list of conditions ANDed together
+    with their `params`. Each page seeks past the last key of the previous
+    one (key_column > ?) instead of using OFFSET, so every page costs the
+    same index seek and only one page is in memory. key_index is the
+    position of key_column in the selected columns.
+    """
+    last_key = None
+    while True:
+        conditions = list(where)
+        args = [page_size] + list(params)
+        if last_key is not None:
+            conditions.append(f"{key_column} > ?")
+            args.append(last_key)
+        sql = select_sql
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += f" ORDER BY {key_column}"
+
+        rows = conn.prepared(sql).execute(sql, *args).fetchall()  # at most page_size rows (TOP)
+        if not rows:
+            return
+        yield rows
+        if len(rows) < page_size:
+            return
+        last_key = rows[-1][key_index]
+
+def browse_pages(pages, format_row, title, empty_message, page_size=LIST_PAGE_SIZE):
+    """
+    Prints `pages` one at a time; Enter shows the next page, 'q' or 'esc' stops.
+    page_size must be the size the pages were fetched with: a shorter page
+    is taken to be the last one.
+    """
+    shown = 0
+    for page in pages:
+        if shown == 0:
+            print(f"\n--- {title} ---")
+        for row in page:
+            print(format_row(row))
+        shown += len(page)
+        if len(page) < page_size:
+            break
+        more = input(f"-- {shown} shown. Enter for more, 'q' to stop: ").strip().lower()
+        if more in ('q', 'esc'):
+            break
+    if shown == 0:
+        print(empty_message)
+
+def prompt_listing_filters(active_column=None, year_column=None):
+    """
+    Asks for the optional listing filters. Returns (where, params) for
+    iter_keyset_pages, or None if the user cancelled.
+    """
+    where = []
+    params = []
+    if year_column:
+        year = input("Filter by academic year (e.g. 2025-2026, Enter for all, 'esc' to cancel): ").strip()
+        if year.lower() == 'esc':
+            return None
+        if year:
+            where.append(f"{year_column} = ?")
+            params.append(year)
+    if active_column:
+        status = input("Show (A)ctive, (I)nactive or Enter for all: ").strip().upper()
+        if status.lower() == 'esc':
+            return None
+        if status == 'A':
+            where.append(f"{active_column} = 1")
+        elif status == 'I':
+            where.append(f"{active_column} = 0")
+    return where, params
+
+###############################################################################
+# Schema versioning (migrations)
+###############################################################################
+#
+# initialize_database() runs at every startup. The schema version is kept in
+# SchemaVersion; when it is already current, startup costs one cheap query.
+# To change the schema, append a (version, name, [statements]) entry to
+# MIGRATIONS. Each statement runs as its own batch, and every DDL statement
+# is guarded so it is safe on databases created by older versions of this
+# program.
+
+def _table_missing(table):
+    return f"NOT EXISTS (SELECT * FROM sys.objects WHERE object_id = OBJECT_ID(N'[dbo].[{table}]') AND type in (N'U'))"
+
+def _column_missing(table, column):
+    return f"COL_LENGTH('dbo.{table}', '{column}') IS NULL"
+
+def _index_missing(table, index):
+    return f"NOT EXISTS (SELECT * FROM sys.indexes WHERE object_id = OBJECT_ID(N'[dbo].[{table}]') AND name = N'{index}')"
+
+def _primary_key_missing(table):
+    return f"NOT EXISTS (SELECT * FROM sys.key_constraints WHERE parent_object_id = OBJECT_ID(N'[dbo].[{table}]') AND type = 'PK')"
+
+# Creates a StudentRegistration table with 62 columns (A..BJ) 
+# matching your provided headers exactly.
+# Adjust data types and lengths as needed.
+_CREATE_STUDENT_REGISTRATION = f"""
+    IF {_table_missing('StudentRegistration')}
     CREATE TABLE [dbo].[StudentRegistration] (
       -- A=0
       FormNo                VARCHAR(50),
@@ -161,17 +676,417 @@ def initialize_database():
       -- BJ=61
       RelativesWorkedInSchoolDetails VARCHAR(200)
     )
+"""
+
+def _require_unique_teacher_cnics(cursor):
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(create_stmt)
-    conn.commit()
-    conn.close()
+    Lists teachers that share a CNIC. The unique CNIC index cannot be built
+    while any exist, so the migration stops with the list to fix by hand.
+    """
+    duplicates = cursor.execute("""
+        SELECT t.CNIC, t.ID, t.Name
+        FROM Teachers AS t
+        WHERE t.CNIC IN (SELECT CNIC FROM Teachers GROUP BY CNIC HAVING COUNT(*) > 1)
+        ORDER BY t.CNIC, t.ID
+    """).fetchall()
+    if not duplicates:
+        return
+    print("[ERROR] These teachers share a CNIC; correct or remove the extra records and run again:")
+    for (cnic, teacher_id, name) in duplicates:
+        print(f"  CNIC {cnic}: ID {teacher_id} - {name}")
+    cnics = len({row[0] for row in duplicates})
+    raise RuntimeError(f"{cnics} CNIC(s) appear on more than one teacher")
+
+# A step is a SQL statement or a callable that is given the cursor
+MIGRATIONS = [
+    (1, "Base tables", [
+        _CREATE_STUDENT_REGISTRATION,
+        f"""
+        IF {_table_missing('SequenceCounters')}
+        CREATE TABLE [dbo].[SequenceCounters] (
+          SequenceName          VARCHAR(50) NOT NULL PRIMARY KEY,
+          NextValue             INT NOT NULL
+        )
+        """,
+        f"""
+        IF {_table_missing('Teachers')}
+        CREATE TABLE [dbo].[Teachers] (
+          ID                    INT IDENTITY(1,1) NOT NULL,
+          Name                  VARCHAR(100) NOT NULL,
+          CNIC                  VARCHAR(50) NOT NULL,
+          IsClassTeacher        BIT NOT NULL DEFAULT 0,
+          Subjects              VARCHAR(500)
+        )
+        """,
+        f"""
+        IF {_table_missing('TeacherClasses')}
+        CREATE TABLE [dbo].[TeacherClasses] (
+          ID                    INT IDENTITY(1,1) NOT NULL,
+          TeacherID             INT NOT NULL,
+          ClassName             VARCHAR(50) NOT NULL,
+          Section               VARCHAR(10) NOT NULL
+        )
+        """,
+        f"""
+        IF {_table_missing('StudentAdmitted')}
+        CREATE TABLE [dbo].[StudentAdmitted] (
+          GRNo                  VARCHAR(10) NOT NULL,
+          RegNo                 VARCHAR(20) NOT NULL,
+          AcademicYear          VARCHAR(20),
+          ClassName             VARCHAR(50),
+          Section               VARCHAR(10),
+          AdmissionDate         DATE
+        )
+        """,
+        # Columns the program relies on that the original sheet layout lacks
+        f"IF {_column_missing('StudentRegistration', 'StudentID')} "
+        "ALTER TABLE StudentRegistration ADD StudentID INT IDENTITY(1,1) NOT NULL",
+        f"IF {_column_missing('StudentRegistration', 'RegNo')} "
+        "ALTER TABLE StudentRegistration ADD RegNo VARCHAR(20) NULL",
+        f"IF {_column_missing('StudentRegistration', 'AcademicYear')} "
+        "ALTER TABLE StudentRegistration ADD AcademicYear VARCHAR(20) NULL",
+        f"IF {_column_missing('StudentRegistration', 'IsActive')} "
+        "ALTER TABLE StudentRegistration ADD IsActive BIT NOT NULL "
+        "CONSTRAINT DF_StudentRegistration_IsActive DEFAULT 1",
+    ]),
+    (2, "Primary keys, unique keys and lookup indexes", [
+        # Rows registered before RegNo existed get a legacy number (L + StudentID)
+        "UPDATE StudentRegistration SET RegNo = 'L' + RIGHT('0000000' + CAST(StudentID AS VARCHAR(10)), 7) "
+        "WHERE RegNo IS NULL",
+        "ALTER TABLE StudentRegistration ALTER COLUMN RegNo VARCHAR(20) NOT NULL",
+        f"IF {_primary_key_missing('StudentRegistration')} "
+        "ALTER TABLE StudentRegistration ADD CONSTRAINT PK_StudentRegistration PRIMARY KEY CLUSTERED (StudentID)",
+        f"IF {_index_missing('StudentRegistration', 'UX_StudentRegistration_RegNo')} "
+        "CREATE UNIQUE INDEX UX_StudentRegistration_RegNo ON StudentRegistration (RegNo) "
+        "INCLUDE (ChildName, AcademicYear, IsActive)",
+        f"IF {_index_missing('StudentRegistration', 'IX_StudentRegistration_FatherCNIC')} "
+        "CREATE INDEX IX_StudentRegistration_FatherCNIC ON StudentRegistration (FatherCNIC) "
+        "INCLUDE (RegNo, ChildName)",
+        f"IF {_index_missing('StudentRegistration', 'IX_StudentRegistration_ChildName')} "
+        "CREATE INDEX IX_StudentRegistration_ChildName ON StudentRegistration (ChildName) "
+        "INCLUDE (RegNo, FatherName)",
+
+        f"IF {_primary_key_missing('Teachers')} "
+        "ALTER TABLE Teachers ADD CONSTRAINT PK_Teachers PRIMARY KEY CLUSTERED (ID)",
+        _require_unique_teacher_cnics,
+        f"IF {_index_missing('Teachers', 'UX_Teachers_CNIC')} "
+        "CREATE UNIQUE INDEX UX_Teachers_CNIC ON Teachers (CNIC) INCLUDE (Name, IsClassTeacher)",
+
+        f"IF {_primary_key_missing('TeacherClasses')} "
+        "ALTER TABLE TeacherClasses ADD CONSTRAINT PK_TeacherClasses PRIMARY KEY CLUSTERED (ID)",
+        f"IF {_index_missing('TeacherClasses', 'IX_TeacherClasses_ClassSection')} "
+        "CREATE INDEX IX_TeacherClasses_ClassSection ON TeacherClasses (ClassName, Section) INCLUDE (TeacherID)",
+        f"IF {_index_missing('TeacherClasses', 'IX_TeacherClasses_TeacherID')} "
+        "CREATE INDEX IX_TeacherClasses_TeacherID ON TeacherClasses (TeacherID) INCLUDE (ClassName, Section)",
+
+        f"IF {_primary_key_missing('StudentAdmitted')} "
+        "ALTER TABLE StudentAdmitted ADD CONSTRAINT PK_StudentAdmitted PRIMARY KEY CLUSTERED (GRNo)",
+        f"IF {_index_missing('StudentAdmitted', 'UX_StudentAdmitted_RegNo')} "
+        "CREATE UNIQUE INDEX UX_StudentAdmitted_RegNo ON StudentAdmitted (RegNo)",
+    ]),
+    (3, "Indexes for filtered student listings", [
+        # Equality on year/status, then the clustered StudentID keeps keyset order
+        f"IF {_index_missing('StudentRegistration', 'IX_StudentRegistration_Year_Active')} "
+        "CREATE INDEX IX_StudentRegistration_Year_Active ON StudentRegistration (AcademicYear, IsActive)",
+        f"IF {_index_missing('StudentAdmitted', 'IX_StudentAdmitted_Year_GRNo')} "
+        "CREATE INDEX IX_StudentAdmitted_Year_GRNo ON StudentAdmitted (AcademicYear, GRNo) INCLUDE (RegNo)",
+    ]),
+    (4, "Phone number lookup table", [
+        # One row per (number, student, column); filled by the importers and
+        # by the backfill-contacts command for rows registered before this.
+        f"""
+        IF {_table_missing('StudentContacts')}
+        CREATE TABLE [dbo].[StudentContacts] (
+          PhoneNumber           VARCHAR(20) NOT NULL,
+          RegNo                 VARCHAR(20) NOT NULL,
+          ContactRole           VARCHAR(30) NOT NULL,
+          CONSTRAINT PK_StudentContacts PRIMARY KEY CLUSTERED (PhoneNumber, RegNo, ContactRole)
+        )
+        """,
+        f"IF {_index_missing('StudentContacts', 'IX_StudentContacts_RegNo')} "
+        "CREATE INDEX IX_StudentContacts_RegNo ON StudentContacts (RegNo)",
+    ]),
+    (5, "Mother CNIC index for family lookups", [
+        f"IF {_index_missing('StudentRegistration', 'IX_StudentRegistration_MotherCNIC')} "
+        "CREATE INDEX IX_StudentRegistration_MotherCNIC ON StudentRegistration (MotherCNIC) "
+        "INCLUDE (RegNo, ChildName)",
+    ]),
+    (6, "TeacherSubjects table", [
+        # One row per (subject, teacher); Teachers.Subjects stays as the display text
+        f"""
+        IF {_table_missing('TeacherSubjects')}
+        CREATE TABLE [dbo].[TeacherSubjects] (
+          Subject               VARCHAR(100) NOT NULL,
+          TeacherID             INT NOT NULL,
+          CONSTRAINT PK_TeacherSubjects PRIMARY KEY CLUSTERED (Subject, TeacherID)
+        )
+        """,
+        f"IF {_index_missing('TeacherSubjects', 'IX_TeacherSubjects_TeacherID')} "
+        "CREATE INDEX IX_TeacherSubjects_TeacherID ON TeacherSubjects (TeacherID)",
+        # Backfill from the comma-separated column (STRING_SPLIT: SQL Server 2016+)
+        """
+        INSERT INTO TeacherSubjects (Subject, TeacherID)
+        SELECT DISTINCT LEFT(LTRIM(RTRIM(S.value)), 100), T.ID
+        FROM Teachers T
+        CROSS APPLY STRING_SPLIT(T.Subjects, ',') S
+        WHERE LTRIM(RTRIM(S.value)) <> ''
+          AND NOT EXISTS (SELECT 1 FROM TeacherSubjects X
+                          WHERE X.TeacherID = T.ID AND X.Subject = LEFT(LTRIM(RTRIM(S.value)), 100))
+        """,
+    ]),
+    (7, "Versioned fee policies", [
+        # ClassName is '' for the registration and admission policies.
+        # RowVer changes on every write; MAX(RowVer) is the fee policy cache version.
+        f"""
+        IF {_table_missing('FeePolicies')}
+        CREATE TABLE [dbo].[FeePolicies] (
+          PolicyID              INT IDENTITY(1,1) NOT NULL CONSTRAINT PK_FeePolicies PRIMARY KEY,
+          PolicyType            VARCHAR(20) NOT NULL,
+          ClassName             VARCHAR(50) NOT NULL CONSTRAINT DF_FeePolicies_ClassName DEFAULT '',
+          EffectiveFrom         DATE NOT NULL,
+          RegistrationFee       DECIMAL(12,2) NULL,
+          AdmissionFee          DECIMAL(12,2) NULL,
+          SecurityDeposit       DECIMAL(12,2) NULL,
+          MonthlyFee            DECIMAL(12,2) NULL,
+          AnnualCharges         DECIMAL(12,2) NULL,
+          OtherCharges          DECIMAL(12,2) NULL,
+          ComputerLabCharges    DECIMAL(12,2) NULL,
+          LabCharges            DECIMAL(12,2) NULL,
+          UpdatedAt             DATETIME NOT NULL CONSTRAINT DF_FeePolicies_UpdatedAt DEFAULT GETDATE(),
+          RowVer                ROWVERSION NOT NULL,
+          CONSTRAINT UX_FeePolicies_Type_Class_From UNIQUE (PolicyType, ClassName, EffectiveFrom)
+        )
+        """,
+    ]),
+    (8, "Fee vouchers", [
+        # One voucher per student, type and billing month (first day of the month)
+        f"""
+        IF {_table_missing('FeeVouchers')}
+        CREATE TABLE [dbo].[FeeVouchers] (
+          VoucherNo             VARCHAR(20) NOT NULL CONSTRAINT PK_FeeVouchers PRIMARY KEY,
+          RegNo                 VARCHAR(20) NOT NULL,
+          GRNo                  VARCHAR(10) NULL,
+          VoucherType           VARCHAR(20) NOT NULL,
+          BillingMonth          DATE NOT NULL,
+          ClassName             VARCHAR(50) NULL,
+          MonthlyFee            DECIMAL(12,2) NOT NULL DEFAULT 0,
+          ComputerLabCharges    DECIMAL(12,2) NOT NULL DEFAULT 0,
+          LabCharges            DECIMAL(12,2) NOT NULL DEFAULT 0,
+          AnnualCharges         DECIMAL(12,2) NOT NULL DEFAULT 0,
+          OtherCharges          DECIMAL(12,2) NOT NULL DEFAULT 0,
+          AdmissionFee          DECIMAL(12,2) NOT NULL DEFAULT 0,
+          SecurityDeposit       DECIMAL(12,2) NOT NULL DEFAULT 0,
+          SiblingDiscount       DECIMAL(12,2) NOT NULL DEFAULT 0,
+          TotalAmount           DECIMAL(12,2) NOT NULL,
+          DueDate               DATE NULL,
+          Status                VARCHAR(10) NOT NULL CONSTRAINT DF_FeeVouchers_Status DEFAULT 'unpaid',
+          PaidAmount            DECIMAL(12,2) NULL,
+          PaidOn                DATE NULL,
+          CreatedAt             DATETIME NOT NULL CONSTRAINT DF_FeeVouchers_CreatedAt DEFAULT GETDATE(),
+          CONSTRAINT UX_FeeVouchers_Student_Type_Month UNIQUE (RegNo, VoucherType, BillingMonth)
+        )
+        """,
+        f"IF {_index_missing('FeeVouchers', 'IX_FeeVouchers_Month_Class')} "
+        "CREATE INDEX IX_FeeVouchers_Month_Class ON FeeVouchers (BillingMonth, VoucherType, ClassName) "
+        "INCLUDE (RegNo, TotalAmount, Status)",
+    ]),
+    (9, "Student marks", [
+        # One row per student, subject and term; report cards and tabulation sheets read it.
+        # This program only reads it: marks are loaded into it outside the program.
+        f"""
+        IF {_table_missing('StudentMarks')}
+        CREATE TABLE [dbo].[StudentMarks] (
+          AcademicYear          VARCHAR(20) NOT NULL,
+          Term                  VARCHAR(30) NOT NULL,
+          GRNo                  VARCHAR(10) NOT NULL,
+          Subject               VARCHAR(100) NOT NULL,
+          ObtainedMarks         DECIMAL(6,2) NULL,
+          TotalMarks            DECIMAL(6,2) NOT NULL,
+          CONSTRAINT PK_StudentMarks PRIMARY KEY CLUSTERED (AcademicYear, Term, GRNo, Subject)
+        )
+        """,
+    ]),
+    (10, "Admission test results", [
+        f"""
+        IF {_table_missing('AdmissionTestResults')}
+        CREATE TABLE [dbo].[AdmissionTestResults] (
+          RegNo                 VARCHAR(20) NOT NULL CONSTRAINT PK_AdmissionTestResults PRIMARY KEY,
+          Marks                 DECIMAL(6,2) NULL,
+          TotalMarks            DECIMAL(6,2) NULL,
+          Result                VARCHAR(10) NOT NULL,
+          Remarks               VARCHAR(200) NULL,
+          UpdatedAt             DATETIME NOT NULL CONSTRAINT DF_AdmissionTestResults_UpdatedAt DEFAULT GETDATE()
+        )
+        """,
+        f"IF {_index_missing('AdmissionTestResults', 'IX_AdmissionTestResults_Result')} "
+        "CREATE INDEX IX_AdmissionTestResults_Result ON AdmissionTestResults (Result, RegNo)",
+    ]),
+    (11, "Fee payments and admission queue", [
+        # One row per bank transaction; the key makes re-imported statements harmless
+        f"""
+        IF {_table_missing('FeePayments')}
+        CREATE TABLE [dbo].[FeePayments] (
+          TransactionID         VARCHAR(50) NOT NULL CONSTRAINT PK_FeePayments PRIMARY KEY,
+          VoucherNo             VARCHAR(20) NOT NULL,
+          RegNo                 VARCHAR(20) NOT NULL,
+          Amount                DECIMAL(12,2) NOT NULL,
+          PaymentDate           DATE NOT NULL,
+          RecordedAt            DATETIME NOT NULL CONSTRAINT DF_FeePayments_RecordedAt DEFAULT GETDATE()
+        )
+        """,
+        f"IF {_index_missing('FeePayments', 'IX_FeePayments_VoucherNo')} "
+        "CREATE INDEX IX_FeePayments_VoucherNo ON FeePayments (VoucherNo) INCLUDE (Amount, PaymentDate)",
+        f"IF {_index_missing('FeePayments', 'IX_FeePayments_PaymentDate')} "
+        "CREATE INDEX IX_FeePayments_PaymentDate ON FeePayments (PaymentDate)",
+        # Registrations whose admission fee is paid, waiting to be admitted
+        f"""
+        IF {_table_missing('AdmissionQueue')}
+        CREATE TABLE [dbo].[AdmissionQueue] (
+          RegNo                 VARCHAR(20) NOT NULL CONSTRAINT PK_AdmissionQueue PRIMARY KEY,
+          VoucherNo             VARCHAR(20) NOT NULL,
+          PaidOn                DATE NULL,
+          QueuedAt              DATETIME NOT NULL CONSTRAINT DF_AdmissionQueue_QueuedAt DEFAULT GETDATE()
+        )
+        """,
+    ]),
+    (12, "Student status history", [
+        # Written by the OUTPUT clause of the status UPDATE itself
+        f"""
+        IF {_table_missing('StudentStatusHistory')}
+        CREATE TABLE [dbo].[StudentStatusHistory] (
+          HistoryID             INT IDENTITY(1,1) NOT NULL CONSTRAINT PK_StudentStatusHistory PRIMARY KEY,
+          RegNo                 VARCHAR(20) NOT NULL,
+          GRNo                  VARCHAR(10) NULL,
+          OldIsActive           BIT NOT NULL,
+          NewIsActive           BIT NOT NULL,
+          Reason                VARCHAR(200) NULL,
+          ChangedAt             DATETIME NOT NULL CONSTRAINT DF_StudentStatusHistory_ChangedAt DEFAULT GETDATE(),
+          ChangedBy             VARCHAR(128) NOT NULL CONSTRAINT DF_StudentStatusHistory_ChangedBy DEFAULT SUSER_SNAME()
+        )
+        """,
+        f"IF {_index_missing('StudentStatusHistory', 'IX_StudentStatusHistory_RegNo')} "
+        "CREATE INDEX IX_StudentStatusHistory_RegNo ON StudentStatusHistory (RegNo, ChangedAt)",
+    ]),
+    (13, "Import checkpoints", [
+        # Written in the transaction of each committed chunk, so it never disagrees with the data
+        f"""
+        IF {_table_missing('ImportCheckpoints')}
+        CREATE TABLE [dbo].[ImportCheckpoints] (
+          FileHash              CHAR(64) NOT NULL CONSTRAINT PK_ImportCheckpoints PRIMARY KEY,
+          FilePath              VARCHAR(400) NOT NULL,
+          AcademicYear          VARCHAR(20) NOT NULL,
+          Duplicates            VARCHAR(10) NOT NULL,
+          LastRow               INT NOT NULL,
+          Inserted              INT NOT NULL,
+          Updated               INT NOT NULL,
+          Failed                INT NOT NULL,
+          Completed             BIT NOT NULL,
+          UpdatedAt             DATETIME NOT NULL CONSTRAINT DF_ImportCheckpoints_UpdatedAt DEFAULT GETDATE()
+        )
+        """,
+        f"IF {_index_missing('ImportCheckpoints', 'IX_ImportCheckpoints_FilePath')} "
+        "CREATE INDEX IX_ImportCheckpoints_FilePath ON ImportCheckpoints (FilePath) INCLUDE (Completed)",
+    ]),
+    (14, "Sibling discount policy", [
+        f"IF {_column_missing('FeePolicies', 'SecondChildDiscount')} "
+        "ALTER TABLE FeePolicies ADD SecondChildDiscount DECIMAL(5,2) NULL",
+        f"IF {_column_missing('FeePolicies', 'LaterChildDiscount')} "
+        "ALTER TABLE FeePolicies ADD LaterChildDiscount DECIMAL(5,2) NULL",
+        # The percents the program used to have built in, so existing bills do not change
+        """
+        INSERT INTO FeePolicies (PolicyType, ClassName, EffectiveFrom, SecondChildDiscount, LaterChildDiscount)
+        SELECT 'sibling', '', '2000-01-01', 10, 15
+        WHERE NOT EXISTS (SELECT 1 FROM FeePolicies WHERE PolicyType = 'sibling')
+        """,
+    ]),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+# One round trip; the ELSE branch is only compiled once the table exists
+_CURRENT_SCHEMA_VERSION_SQL = """
+    IF OBJECT_ID(N'[dbo].[SchemaVersion]', N'U') IS NULL
+        SELECT 0
+    ELSE
+        SELECT ISNULL(MAX(Version), 0) FROM [dbo].[SchemaVersion]
+"""
+
+def initialize_database():
+    """
+    Brings the database schema up to SCHEMA_VERSION by running any
+    migrations that have not been applied yet, each in its own transaction.
+    When the schema is already current this is a single query.
+    """
+    with db_session() as conn:
+        cursor = conn.cursor()
+        current = cursor.execute(_CURRENT_SCHEMA_VERSION_SQL).fetchone()[0]
+        if current >= SCHEMA_VERSION:
+            cursor.close()
+            return
+
+        # Only one copy of the program migrates at a time; the others wait here
+        cursor.execute("""
+            DECLARE @status INT;
+            EXEC @status = sp_getapplock @Resource = 'TFS_SchemaMigrations', @LockMode = 'Exclusive',
+                 @LockOwner = 'Session', @LockTimeout = 120000;
+            SELECT @status
+        """)
+        while cursor.description is None and cursor.nextset():
+            pass
+        status = cursor.fetchone()[0]
+        if status < 0:
+            cursor.close()
+            print(f"[ERROR] Could not lock the database for migration (sp_getapplock returned {status}). "
+                  "Another copy of the program may still be migrating; try again later.")
+            sys.exit(1)
+        try:
+            cursor.execute(f"""
+                IF {_table_missing('SchemaVersion')}
+                CREATE TABLE [dbo].[SchemaVersion] (
+                  Version               INT NOT NULL PRIMARY KEY,
+                  Name                  VARCHAR(200) NOT NULL,
+                  AppliedAt             DATETIME NOT NULL DEFAULT GETDATE()
+                )
+            """)
+            conn.commit()
+            current = cursor.execute(_CURRENT_SCHEMA_VERSION_SQL).fetchone()[0]
+
+            for (version, name, statements) in MIGRATIONS:
+                if version <= current:
+                    continue
+                print(f"[INFO] Applying database migration {version}: {name}")
+                try:
+                    for statement in statements:
+                        if callable(statement):
+                            statement(cursor)
+                        else:
+                            cursor.execute(statement)
+                    cursor.execute("INSERT INTO SchemaVersion (Version, Name) VALUES (?, ?)", version, name)
+                    conn.commit()
+                except (pyodbc.Error, RuntimeError) as e:
+                    conn.rollback()
+                    print(f"[ERROR] Database migration {version} ({name}) failed: {e}")
+                    sys.exit(1)
+        finally:
+            cursor.execute("EXEC sp_releaseapplock @Resource = 'TFS_SchemaMigrations', @LockOwner = 'Session'")
+            conn.commit()
+            cursor.close()
 
 ###############################################################################
 # 2) Minimal Helper Functions (DOB, CNIC, Phone, generate_registration_num)
 ###############################################################################
 
+def db_date(value):
+    """
+    A DATE column as a date. The {SQL SERVER} driver predates the DATE type
+    and returns it as a 'YYYY-MM-DD' string; None stays None.
+    """
+    if value is None or type(value) is date:
+        return value
+    if isinstance(value, datetime):
+        return value.date()
+    return date.fromisoformat(str(value)[:10])
+
 def format_dob(raw_dob):
     """
     If you want a strict 8-digit format (DDMMYYYY):
@@ -224,83 +1139,399 @@ def format_phone(raw_phone):
     # else store as is
     return raw_phone
 
-def generate_registration_number():
+###############################################################################
+# Column-wise (batch) versions of the helpers above
+###############################################################################
+#
+# Each takes a whole column (list of strings) and returns
+# (normalized_values, valid_mask). Output matches calling the single-value
+# function on every cell; valid_mask[i] is True when the cell was recognised
+# and rewritten into the canonical form (ISO date, 13-digit CNIC, +92-3xx mobile).
+# The pattern is compiled once, dates are checked against a days-per-month
+# table instead of strptime, and repeated DOB values are parsed once.
+
+_NON_DIGITS = re.compile(r'\D')
+
+# Days per month for a non-leap year, index 1..12
+_DAYS_IN_MONTH = (0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+def _dob_value(raw_dob):
+    digits = raw_dob if raw_dob.isdecimal() else _NON_DIGITS.sub('', raw_dob)
+    if len(digits) != 8:
+        return raw_dob, False
+    if not digits.isascii():
+        # Non-ASCII digits: leave the quirks of strptime to format_dob itself
+        formatted = format_dob(raw_dob)
+        return formatted, formatted != raw_dob
+    day = int(digits[:2])
+    month = int(digits[2:4])
+    year = int(digits[4:])
+    if not (1 <= month <= 12 and year >= 1 and day >= 1):
+        return raw_dob, False
+    leap = year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+    if day > _DAYS_IN_MONTH[month] + (1 if month == 2 and leap else 0):
+        return raw_dob, False
+    if year < 1000:
+        # keep strftime's exact formatting for odd years
+        return datetime(year, month, day).strftime("%Y-%m-%d"), True
+    return f"{digits[4:]}-{digits[2:4]}-{digits[:2]}", True
+
+def format_dob_column(values):
+    out = []
+    valid = []
+    table = {}  # raw value -> (normalized, ok); parents' DOBs and blanks repeat a lot
+    for raw in values:
+        result = table.get(raw)
+        if result is None:
+            result = table[raw] = _dob_value(raw)
+        out.append(result[0])
+        valid.append(result[1])
+    return out, valid
+
+def format_cnic_column(values):
+    sub = _NON_DIGITS.sub
+    out = []
+    valid = []
+    for raw in values:
+        digits = raw if raw.isdecimal() else sub('', raw)
+        if len(digits) == 13:
+            out.append(digits)
+            valid.append(True)
+        else:
+            out.append(raw)
+            valid.append(False)
+    return out, valid
+
+def format_phone_column(values):
+    sub = _NON_DIGITS.sub
+    out = []
+    valid = []
+    for raw in values:
+        digits = raw if raw.isdecimal() else sub('', raw)
+        if digits[:1] == '0':
+            digits = digits[1:]
+        if len(digits) == 10 and digits[0] == '3':
+            out.append("+92-" + digits)
+            valid.append(True)
+        else:
+            out.append(raw)
+            valid.append(False)
+    return out, valid
+
+def benchmark_normalizers(rows=100_000, seed=7):
     """
-    Example function that returns a dummy registration number or 
-    you can query the DB for the next available number.
+    Times format_dob/format_cnic/format_phone called cell by cell against
+    the column versions on synthetic columns of `rows` values.
     """
-    # In your older code, you used 'academic_year' to generate. 
-    # You can adapt that logic. For now, let's just return a placeholder.
     import random
-    return f"RN{random.randint(1000,9999)}"
+    rng = random.Random(seed)
+
+    def dob():
+        d, m, y = rng.randint(1, 31), rng.randint(1, 12), rng.randint(1970, 2022)
+        return rng.choice((f"{d:02d}-{m:02d}-{y}", f"{d}/{m}/{y}", f"{d:02d}{m:02d}{y}", str(y), ""))
+
+    def cnic():
+        n = f"{rng.randint(10000, 99999)}-{rng.randint(1000000, 9999999)}-{rng.randint(0, 9)}"
+        return rng.choice((n, n.replace("-", ""), n[:-2], ""))
+
+    def phone():
+        return rng.choice((f"03{rng.randint(0, 49):02d}-{rng.randint(1000000, 9999999)}",
+                           f"+92 3{rng.randint(0, 49):02d} {rng.randint(1000000, 9999999)}",
+                           f"021-{rng.randint(10000000, 99999999)}", ""))
+
+    columns = (
+        ("DOB", [dob() for _ in range(rows)], format_dob, format_dob_column),
+        ("CNIC", [cnic() for _ in range(rows)], format_cnic, format_cnic_column),
+        ("Phone", [phone() for _ in range(rows)], format_phone, format_phone_column),
+    )
+
+    print(f"\n--- Normalizer benchmark ({rows:,} rows per column) ---")
+    for (label, column, single_fn, column_fn) in columns:
+        started = time.perf_counter()
+        expected = [single_fn(v) for v in column]
+        single_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        got, valid = column_fn(column)
+        column_time = time.perf_counter() - started
+
+        assert got == expected, f"{label}: column version disagrees with {single_fn.__name__}"
+        print(f"  {label:<6} per-cell: {rows / single_time:>12,.0f} rows/s   "
+              f"column: {rows / column_time:>12,.0f} rows/s   "
+              f"speedup: {single_time / column_time:4.1f}x   valid: {sum(valid):,}")
+
+# StudentRegistration columns in spreadsheet order (A..BJ)
+STUDENT_REGISTRATION_COLUMNS = (
+    "FormNo", "IssueDate", "ValidTill", "ChildName", "ChildDOB", "ChildAge", "PlaceOfBirth", "Gender",
+    "Nationality", "Religion", "FormB_BirthCertNo", "ClassAppliedFor", "PresentAddress", "PermanentAddress",
+    "HomePhone1", "HomePhone2", "PreviousSchoolAttended", "ClassLastAttended", "SessionCompleted",
+    "ReasonForLeavingLastSchool", "FatherName", "FatherDOB", "FatherNationality", "FatherReligion",
+    "FatherCNIC", "FatherEmail", "FatherQualification", "FatherJobType", "FatherBusinessType",
+    "FatherOrganization", "FatherOfficeAddress", "FatherOfficePhone", "FatherMobile1", "FatherMobile2",
+    "FatherWhatsApp", "MotherName", "MotherDOB", "MotherNationality", "MotherReligion", "MotherCNIC",
+    "MotherEmail", "MotherQualification", "MotherJobType", "MotherBusinessType", "MotherOrganization",
+    "MotherOfficeAddress", "MotherOfficePhone", "MotherMobile1", "MotherMobile2", "MotherWhatsApp",
+    "ParentsMaritalStatus", "ChildBloodGroup", "ChildMedicalConditions", "ChildDisabilities",
+    "EmergencyContactName", "EmergencyContactRelation", "EmergencyContactPTCL", "EmergencyContactCell",
+    "OtherChildrenStudyingDetails", "SiblingsInSchoolDetails", "RelativesInSchoolDetails",
+    "RelativesWorkedInSchoolDetails",
+)
+REGISTRATION_COLUMN_COUNT = len(STUDENT_REGISTRATION_COLUMNS)  # 62
+
+DOB_COLUMNS = ("ChildDOB", "FatherDOB", "MotherDOB")
+CNIC_COLUMNS = ("FatherCNIC", "MotherCNIC")
+PHONE_COLUMNS = (
+    "HomePhone1", "HomePhone2", "FatherOfficePhone", "FatherMobile1", "FatherMobile2", "FatherWhatsApp",
+    "MotherOfficePhone", "MotherMobile1", "MotherMobile2", "MotherWhatsApp",
+    "EmergencyContactPTCL", "EmergencyContactCell",
+)
+
+# Positions of each kind of column, so rows can be normalized by index
+_REG_INDEX = {col: i for i, col in enumerate(STUDENT_REGISTRATION_COLUMNS)}
+DOB_COLUMN_INDEXES = tuple(_REG_INDEX[c] for c in DOB_COLUMNS)
+CNIC_COLUMN_INDEXES = tuple(_REG_INDEX[c] for c in CNIC_COLUMNS)
+PHONE_COLUMN_INDEXES = tuple(_REG_INDEX[c] for c in PHONE_COLUMNS)
+CHILD_NAME_INDEX = _REG_INDEX["ChildName"]
+FATHER_NAME_INDEX = _REG_INDEX["FatherName"]
+MOTHER_NAME_INDEX = _REG_INDEX["MotherName"]
+CHILD_DOB_INDEX = _REG_INDEX["ChildDOB"]
+FORM_B_INDEX = _REG_INDEX["FormB_BirthCertNo"]
+FATHER_CNIC_INDEX = _REG_INDEX["FatherCNIC"]
+MOTHER_CNIC_INDEX = _REG_INDEX["MotherCNIC"]
+
+def normalize_registration_rows(rows):
+    """
+    Strips the 62 spreadsheet cells of each row and applies the column-wise
+    format_dob / format_cnic / format_phone helpers to the matching columns.
+    Every row must have at least 62 cells. Returns tuples in
+    STUDENT_REGISTRATION_COLUMNS order.
+    """
+    if not rows:
+        return []
+    columns = [list(map(str.strip, column))
+               for column in zip(*(row[:REGISTRATION_COLUMN_COUNT] for row in rows))]
+    for i in DOB_COLUMN_INDEXES:
+        columns[i] = format_dob_column(columns[i])[0]
+    for i in CNIC_COLUMN_INDEXES:
+        columns[i] = format_cnic_column(columns[i])[0]
+    for i in PHONE_COLUMN_INDEXES:
+        columns[i] = format_phone_column(columns[i])[0]
+    return list(zip(*columns))
 
 ###############################################################################
 # Registration Number & GR Number Generation
 ###############################################################################
+#
+# Numbers come from the SequenceCounters table instead of a MAX() scan per
+# call. A process reserves a block of SEQUENCE_BLOCK_SIZE numbers with one
+# atomic UPDATE ... OUTPUT and then hands them out locally, so two clerks
+# (or two imports) never see the same number. Numbers left in a block when
+# the program exits are skipped, which leaves small gaps in the sequence.
+
+SEQUENCE_BLOCK_SIZE = 10
+GR_NUMBER_START = 1000  # first GR No when nobody has been admitted yet
+
+def reserve_sequence_block(cursor, name, count, seed):
+    """
+    Atomically reserves `count` consecutive numbers of sequence `name` and
+    returns the first one. Runs in the caller's transaction; the counter row
+    stays locked until the caller commits.
+    seed(cursor) gives the first number to use when the sequence does not
+    exist yet (e.g. one past the highest number already in the data).
+    """
+    reserve_sql = """
+        UPDATE SequenceCounters
+        SET NextValue = NextValue + ?
+        OUTPUT deleted.NextValue
+        WHERE SequenceName = ?
+    """
+    while True:
+        row = cursor.execute(reserve_sql, count, name).fetchone()
+        if row:
+            return row[0]
+
+        first = seed(cursor)
+        try:
+            cursor.execute(
+                "INSERT INTO SequenceCounters (SequenceName, NextValue) VALUES (?, ?)",
+                name, first + count,
+            )
+            return first
+        except pyodbc.IntegrityError:
+            # Another process created the counter first; take a block from it
+            continue
+
+class SequenceAllocator:
+    """
+    Process-local front end for SequenceCounters.
+    next_value() serves numbers from a locally reserved block and only goes
+    to the database when the block runs out. reserve() takes a contiguous
+    block of any size straight from the counter (for bulk work).
+    Thread safe.
+    """
+
+    def __init__(self, block_size=SEQUENCE_BLOCK_SIZE):
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._blocks = {}  # sequence name -> [next value, end (exclusive)]
+
+    def _reserve(self, name, count, seed):
+        with db_session() as conn:
+            cursor = conn.cursor()
+            first = reserve_sequence_block(cursor, name, count, seed)
+            conn.commit()
+            cursor.close()
+        return first
+
+    def next_value(self, name, seed):
+        with self._lock:
+            block = self._blocks.get(name)
+            if block is None or block[0] >= block[1]:
+                first = self._reserve(name, self.block_size, seed)
+                block = self._blocks[name] = [first, first + self.block_size]
+            value = block[0]
+            block[0] += 1
+            return value
+
+    def reserve(self, name, count, seed):
+        """
+        Returns range(first, first + count) reserved in one round trip.
+        """
+        if count <= 0:
+            return range(0)
+        first = self._reserve(name, count, seed)
+        return range(first, first + count)
+
+_sequences = SequenceAllocator()
+
+def _academic_base_year(academic_year):
+    # Suppose academic_year is "2024-2025" or "2025-2026" 
+    # For simplicity, we take the first 4 digits from "2025-2026" => "2025"
+    return academic_year.split('-')[0] if '-' in academic_year else academic_year
+
+def _registration_seed(base_year):
+    def seed(cursor):
+        # Only runs once per academic year, when its counter is created
+        row = cursor.execute(
+            "SELECT MAX(RegNo) FROM StudentRegistration WHERE RegNo LIKE ?", f"{base_year}%"
+        ).fetchone()
+        if row and row[0]:
+            # e.g. "20250007" => 8
+            return int(row[0][len(base_year):]) + 1
+        return 1
+    return seed
+
+def _gr_seed(cursor):
+    row = cursor.execute("SELECT MAX(GRNo) FROM StudentAdmitted").fetchone()
+    if row and row[0]:
+        return int(row[0]) + 1
+    return GR_NUMBER_START
+
+def _format_reg_no(base_year, index):
+    return f"{base_year}{str(index).zfill(4)}"  # e.g. "20250001"
 
 def generate_registration_number(academic_year):
     """
     Generate a new registration number (e.g., 20250001) 
     taking into account the year-based logic.
-    This is a simplistic approach; you might store the last used index in a table.
+    The per-year counter lives in SequenceCounters (see SequenceAllocator).
     """
-    # Suppose academic_year is "2024-2025" or "2025-2026" 
-    # Extract the first year or the second:
-    # For simplicity, let's assume we take the first 4 digits from "2025-2026" => "2025"
-    base_year = academic_year.split('-')[0] if '-' in academic_year else academic_year
-    
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    # Check the maximum RegNo that starts with base_year
-    # We'll store RegNo as string, e.g. "20250001"
-    query = f"""
-        SELECT MAX(RegNo) 
-        FROM StudentRegistration
-        WHERE RegNo LIKE '{base_year}%'
+    base_year = _academic_base_year(academic_year)
+    index = _sequences.next_value(f"RegNo:{base_year}", _registration_seed(base_year))
+    return _format_reg_no(base_year, index)
+
+ACADEMIC_YEAR_START_MONTH = 4  # new session starts in April
+
+def current_academic_year(today=None):
     """
-    cursor.execute(query)
-    row = cursor.fetchone()
-    
-    if row and row[0]:
-        last_reg_no = row[0]
-        # e.g., last_reg_no = "20250007"
-        # Extract the numeric part after the year
-        idx_part = last_reg_no[len(base_year):]  # e.g. "0007"
-        new_idx = int(idx_part) + 1
-    else:
-        new_idx = 1
-        
-    new_reg_no = f"{base_year}{str(new_idx).zfill(4)}"  # e.g. "20250001"
-    
-    conn.close()
-    return new_reg_no
+    e.g. "2025-2026" for any date from April 2025 to March 2026.
+    """
+    today = today or datetime.now()
+    start = today.year if today.month >= ACADEMIC_YEAR_START_MONTH else today.year - 1
+    return f"{start}-{start + 1}"
+
+def prompt_academic_year():
+    """
+    Asks for an academic year, defaulting to the current one. Returns None
+    if the input is not like "2025-2026" (or just "2025").
+    """
+    default = current_academic_year()
+    value = input(f"Enter academic year (Enter for {default}): ").strip() or default
+    if not re.fullmatch(r"\d{4}(-\d{4})?", value):
+        print("[ERROR] Academic year must look like 2025-2026.")
+        return None
+    return value
+
+def reserve_registration_numbers(academic_year, count):
+    """
+    Reserves `count` consecutive registration numbers in one round trip
+    (for bulk registrations). Returns them as a list of strings.
+    """
+    base_year = _academic_base_year(academic_year)
+    block = _sequences.reserve(f"RegNo:{base_year}", count, _registration_seed(base_year))
+    return [_format_reg_no(base_year, index) for index in block]
 
 def generate_gr_number():
     """
-    Generate a new GR No which is 4 digits, user can define the first GR No.
-    We'll keep track in a table or retrieve the last one used.
+    Generate a new GR No which is 4 digits, user can define the first GR No
+    (GR_NUMBER_START). The counter lives in SequenceCounters.
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    query = """
-        SELECT MAX(GRNo)
-        FROM StudentAdmitted
+    return str(_sequences.next_value("GRNo", _gr_seed)).zfill(4)
+
+def reserve_gr_numbers(count):
     """
-    cursor.execute(query)
-    row = cursor.fetchone()
-    
-    if row and row[0]:
-        # row[0] is something like "1001"
-        new_gr = int(row[0]) + 1
-    else:
-        # If no admissions yet, define your starting GR (e.g. 1000 or 1)
-        new_gr = 1000
-    
-    conn.close()
-    return str(new_gr).zfill(4)
+    Reserves `count` consecutive GR numbers in one round trip (bulk admissions).
+    """
+    return [str(n).zfill(4) for n in _sequences.reserve("GRNo", count, _gr_seed)]
+
+def _stress_worker(name, threads, per_thread, block_size):
+    """
+    One process of the allocator stress test: `threads` threads each draw
+    `per_thread` numbers (mixing next_value and small reserve calls) from a
+    fresh SequenceAllocator.
+    """
+    allocator = SequenceAllocator(block_size=block_size)
+    results = [[] for _ in range(threads)]
+
+    def draw(out):
+        seed = lambda cursor: 1
+        while len(out) < per_thread:
+            if len(out) % 7 == 0:
+                out.extend(allocator.reserve(name, 3, seed))
+            else:
+                out.append(allocator.next_value(name, seed))
+
+    workers = [threading.Thread(target=draw, args=(results[i],)) for i in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return [n for out in results for n in out]
+
+def stress_test_sequence_allocator(processes=4, threads=4, per_thread=250, block_size=SEQUENCE_BLOCK_SIZE):
+    """
+    Hammers one scratch sequence from several processes and threads at once
+    and checks that no number was handed out twice. Returns True on success.
+    """
+    name = f"StressTest:{os.getpid()}:{int(time.time())}"
+    print(f"\n--- Sequence allocator stress test ({processes} processes x {threads} threads) ---")
+    started = time.monotonic()
+    try:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            futures = [pool.submit(_stress_worker, name, threads, per_thread, block_size)
+                       for _ in range(processes)]
+            numbers = [n for f in futures for n in f.result()]
+    finally:
+        with db_session() as conn:
+            conn.cursor().execute("DELETE FROM SequenceCounters WHERE SequenceName = ?", name)
+            conn.commit()
+    elapsed = time.monotonic() - started
 
+    duplicates = len(numbers) - len(set(numbers))
+    print(f"  Numbers drawn: {len(numbers):,} in {elapsed:.2f}s ({len(numbers) / elapsed:,.0f}/s)")
+    print(f"  Duplicates: {duplicates}")
+    print("  PASS" if duplicates == 0 else "  FAIL")
+    return duplicates == 0
 
 ###############################################################################
 # Main Menu
@@ -326,6 +1557,8 @@ def main_menu():
         elif choice == "4":
             reports_menu()
         elif choice == "5":
+            save_student_indexes()
+            print_pool_stats()
             print("Exiting...")
             sys.exit(0)
         else:
@@ -379,8 +1612,12 @@ def register_student_menu():
         print("\n--- Register Student ---")
         print("1. Register New Student (Manual)")
         print("2. Register New Students (CSV)")
-        print("3. View Registered Students")
-        print("4. Back To Student Management")
+        print("3. Register New Students (Large CSV, Resumable)")
+        print("4. View Registered Students")
+        print("5. Search Students By Name")
+        print("6. Find Student By Phone Number")
+        print("7. Show Family (Siblings)")
+        print("8. Back To Student Management")
 
         choice = input("Enter your choice: ").strip()
 
@@ -389,8 +1626,16 @@ def register_student_menu():
         elif choice == "2":
             register_new_students_csv()
         elif choice == "3":
-            view_registered_students()
+            register_new_students_csv_streaming()
         elif choice == "4":
+            view_registered_students()
+        elif choice == "5":
+            search_students_by_name()
+        elif choice == "6":
+            find_students_by_phone()
+        elif choice == "7":
+            show_family()
+        elif choice == "8":
             return
         elif choice.lower() == 'esc':
             return
@@ -403,12 +1648,20 @@ def register_new_students_csv():
     Row 1 => sample row (skip)
     Row 2 => header row
     Row 3+ => data
-    Minimal validation. Everything is inserted.
+    Minimal validation. Students already registered (or repeated in the
+    file) are handled by the chosen duplicate policy; everything else is inserted.
+    Rows are sent to the DB in batches of BULK_BATCH_SIZE (see bulk_insert).
     """
     print("\n--- Register New Students (CSV) ---")
     file_path = input("Enter CSV path (or 'esc' to cancel): ").strip()
     if file_path.lower() == 'esc':
         return
+    academic_year = prompt_academic_year()
+    if not academic_year:
+        return
+    policy = prompt_duplicate_policy()
+    if not policy:
+        return
 
     try:
         with open(file_path, mode='r', newline='', encoding='utf-8') as f:
@@ -418,143 +1671,90 @@ def register_new_students_csv():
             _sample = next(reader, None)
             # read row 2 (header)
             header = next(reader, None)
-            if not header or len(header) < 62:
+            if not header or len(header) < REGISTRATION_COLUMN_COUNT:
                 print("[ERROR] No valid header row found. Expected 62 columns.")
                 return
 
-            conn = get_connection()
-            cursor = conn.cursor()
-
-            success_list = []
-            fail_list = []
-            row_num = 2  # we ended on row 2, so next is data row 3
-
-            for row in reader:
-                row_num += 1
-                if len(row) < 62:
-                    fail_list.append((row_num, "(Unknown)", f"Not enough columns: {len(row)}/62"))
-                    continue
-
-                # Extract columns (0..61)
-                # We'll apply minimal transformations on a few fields
-                colA  = row[0].strip()   # FormNo
-                colB  = row[1].strip()   # IssueDate
-                colC  = row[2].strip()   # ValidTill
-                colD  = row[3].strip()   # ChildName
-                colE  = format_dob(row[4].strip())  # ChildDOB
-                colF  = row[5].strip()   # ChildAge
-                colG  = row[6].strip()   # PlaceOfBirth
-                colH  = row[7].strip()   # Gender
-                colI  = row[8].strip()   # Nationality
-                colJ  = row[9].strip()   # Religion
-                colK  = row[10].strip()  # FormB_BirthCertNo
-                colL  = row[11].strip()  # ClassAppliedFor
-                colM  = row[12].strip()  # PresentAddress
-                colN  = row[13].strip()  # PermanentAddress
-                colO  = format_phone(row[14].strip()) # HomePhone1
-                colP  = format_phone(row[15].strip()) # HomePhone2
-                colQ  = row[16].strip()  # PreviousSchoolAttended
-                colR  = row[17].strip()  # ClassLastAttended
-                colS  = row[18].strip()  # SessionCompleted
-                colT  = row[19].strip()  # ReasonForLeavingLastSchool
-                colU  = row[20].strip()  # FatherName
-                colV  = format_dob(row[21].strip())  # FatherDOB
-                colW  = row[22].strip()  # FatherNationality
-                colX  = row[23].strip()  # FatherReligion
-                colY  = format_cnic(row[24].strip()) # FatherCNIC
-                colZ  = row[25].strip()  # FatherEmail
-                colAA = row[26].strip()  # FatherQualification
-                colAB = row[27].strip()  # FatherJobType
-                colAC = row[28].strip()  # FatherBusinessType
-                colAD = row[29].strip()  # FatherOrganization
-                colAE = row[30].strip()  # FatherOfficeAddress
-                colAF = format_phone(row[31].strip()) # FatherOfficePhone
-                colAG = format_phone(row[32].strip()) # FatherMobile1
-                colAH = format_phone(row[33].strip()) # FatherMobile2
-                colAI = format_phone(row[34].strip()) # FatherWhatsApp
-                colAJ = row[35].strip()  # MotherName
-                colAK = format_dob(row[36].strip()) # MotherDOB
-                colAL = row[37].strip()  # MotherNationality
-                colAM = row[38].strip()  # MotherReligion
-                colAN = format_cnic(row[39].strip()) # MotherCNIC
-                colAO = row[40].strip()  # MotherEmail
-                colAP = row[41].strip()  # MotherQualification
-                colAQ = row[42].strip()  # MotherJobType
-                colAR = row[43].strip()  # MotherBusinessType
-                colAS = row[44].strip()  # MotherOrganization
-                colAT = row[45].strip()  # MotherOfficeAddress
-                colAU = format_phone(row[46].strip()) # MotherOfficePhone
-                colAV = format_phone(row[47].strip()) # MotherMobile1
-                colAW = format_phone(row[48].strip()) # MotherMobile2
-                colAX = format_phone(row[49].strip()) # MotherWhatsApp
-                colAY = row[50].strip()  # ParentsMaritalStatus
-                colAZ = row[51].strip()  # ChildBloodGroup
-                colBA = row[52].strip()  # ChildMedicalConditions
-                colBB = row[53].strip()  # ChildDisabilities
-                colBC = row[54].strip()  # EmergencyContactName
-                colBD = row[55].strip()  # EmergencyContactRelation
-                colBE = format_phone(row[56].strip()) # EmergencyContactPTCL
-                colBF = format_phone(row[57].strip()) # EmergencyContactCell
-                colBG = row[58].strip()  # OtherChildrenStudyingDetails
-                colBH = row[59].strip()  # SiblingsInSchoolDetails
-                colBI = row[60].strip()  # RelativesInSchoolDetails
-                colBJ = row[61].strip()  # RelativesWorkedInSchoolDetails
-
-                # Minimal check: ChildName must not be empty
-                if not colD:
-                    fail_list.append((row_num, "(No ChildName)", "ChildName is empty (col D)"))
-                    continue
-
-                # Attempt insert
-                insert_sql = """
-                INSERT INTO StudentRegistration (
-                  FormNo, IssueDate, ValidTill, ChildName, ChildDOB, ChildAge, PlaceOfBirth, Gender,
-                  Nationality, Religion, FormB_BirthCertNo, ClassAppliedFor, PresentAddress, PermanentAddress,
-                  HomePhone1, HomePhone2, PreviousSchoolAttended, ClassLastAttended, SessionCompleted, ReasonForLeavingLastSchool,
-                  FatherName, FatherDOB, FatherNationality, FatherReligion, FatherCNIC, FatherEmail, FatherQualification,
-                  FatherJobType, FatherBusinessType, FatherOrganization, FatherOfficeAddress, FatherOfficePhone, FatherMobile1,
-                  FatherMobile2, FatherWhatsApp, MotherName, MotherDOB, MotherNationality, MotherReligion, MotherCNIC, MotherEmail,
-                  MotherQualification, MotherJobType, MotherBusinessType, MotherOrganization, MotherOfficeAddress, MotherOfficePhone,
-                  MotherMobile1, MotherMobile2, MotherWhatsApp, ParentsMaritalStatus, ChildBloodGroup, ChildMedicalConditions, ChildDisabilities,
-                  EmergencyContactName, EmergencyContactRelation, EmergencyContactPTCL, EmergencyContactCell, OtherChildrenStudyingDetails,
-                  SiblingsInSchoolDetails, RelativesInSchoolDetails, RelativesWorkedInSchoolDetails
-                )
-                VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
-                """
-
-                try:
-                    cursor.execute(insert_sql, (
-                        colA, colB, colC, colD, colE, colF, colG, colH,
-                        colI, colJ, colK, colL, colM, colN,
-                        colO, colP, colQ, colR, colS, colT,
-                        colU, colV, colW, colX, colY, colZ, colAA,
-                        colAB, colAC, colAD, colAE, colAF, colAG,
-                        colAH, colAI, colAJ, colAK, colAL, colAM, colAN, colAO,
-                        colAP, colAQ, colAR, colAS, colAT, colAU, colAV, colAW,
-                        colAX, colAY, colAZ, colBA, colBB,
-                        colBC, colBD, colBE, colBF, colBG,
-                        colBH, colBI, colBJ
-                    ))
-                    success_list.append((row_num, colD))
-                except Exception as ex:
-                    fail_list.append((row_num, colD, f"DB Insert Error: {ex}"))
-                    continue
-
-            conn.commit()
-            cursor.close()
-            conn.close()
-
+            with db_session() as conn:
+                cursor = conn.cursor()
+                dedup = RegistrationDeduplicator(policy)
+                dedup.load(conn)
+
+                success_list = []
+                fail_list = []
+                batch = []      # (row_num, values) waiting to be sent
+                updates = []    # (row_num, reg_no, values) overwriting registered students
+                flagged = {}    # row_num -> reason, for possible duplicates inserted anyway
+                row_num = 2  # last row read; data starts at row 3
+
+                new_students = []      # (reg_no, values) for the in-memory indexes
+                updated_students = []
+
+                def flush():
+                    inserted, failed = insert_registration_batch(cursor, batch, academic_year)
+                    for (rnum, reg_no, values) in inserted:
+                        success_list.append((rnum, reg_no, values[CHILD_NAME_INDEX]))
+                        new_students.append((reg_no, values))
+                        if rnum in flagged:
+                            fail_list.append((rnum, values[CHILD_NAME_INDEX],
+                                              f"Flagged: {flagged[rnum]}; inserted as RegNo {reg_no}"))
+                    fail_list.extend(failed)
+                    batch.clear()
+
+                def flush_updates():
+                    updated, failed = update_registration_batch(cursor, updates)
+                    for (rnum, reg_no, values) in updated:
+                        success_list.append((rnum, reg_no, values[CHILD_NAME_INDEX] + " (updated)"))
+                        updated_students.append((reg_no, values))
+                    fail_list.extend(failed)
+                    updates.clear()
+
+                for (row_num, values, problem) in iter_registration_rows(reader):
+                    if problem:
+                        fail_list.append((row_num,) + problem)
+                        continue
+
+                    action, detail = dedup.check(row_num, values)
+                    if action == "fail":
+                        fail_list.append((row_num, values[CHILD_NAME_INDEX], detail))
+                        continue
+                    if action == "update":
+                        updates.append((row_num, detail, values))
+                        if len(updates) >= BULK_BATCH_SIZE:
+                            flush_updates()
+                        continue
+                    if action == "flag":
+                        flagged[row_num] = detail
+
+                    batch.append((row_num, values))
+                    if len(batch) >= BULK_BATCH_SIZE:
+                        flush()
+
+                if batch:
+                    flush()
+                if updates:
+                    flush_updates()
+
+                conn.commit()
+                cursor.close()
+            note_new_registrations(new_students)
+            note_updated_registrations(updated_students)
+
+            success_list.sort()
+            fail_list.sort()
             total_rows = row_num - 2  # data rows
             success_count = len(success_list)
             fail_count = len(fail_list)
             print(f"\nCSV Import Complete. Rows read: {total_rows}")
-            print(f"Successfully inserted: {success_count}")
+            print(f"Successfully inserted: {len(new_students)}")
+            if updated_students:
+                print(f"Updated existing students: {len(updated_students)}")
             print(f"Failed: {fail_count}")
 
             if success_count > 0:
                 print("\n-- Success List --")
-                for (rnum, name) in success_list:
-                    print(f"  Spreadsheet Row {rnum}, Child: {name}")
+                for (rnum, reg_no, name) in success_list:
+                    print(f"  Spreadsheet Row {rnum}, RegNo: {reg_no}, Child: {name}")
 
             if fail_count > 0:
                 print("\n-- Fail List --")
@@ -571,56 +1771,544 @@ def register_new_students_csv():
     except Exception as e:
         print(f"[ERROR] An error occurred while processing the CSV: {e}")
 
-def register_new_student_manual():
+IMPORT_WORKERS = os.cpu_count() or 1  # processes normalizing rows
+IMPORT_CHUNK_ROWS = 1000              # rows handed to a worker at a time
+
+# Registration rows are stored with their RegNo and AcademicYear in front
+REGISTRATION_INSERT_COLUMNS = ("RegNo", "AcademicYear") + STUDENT_REGISTRATION_COLUMNS
+
+def insert_registration_batch(cursor, batch, academic_year):
     """
-    Prompts user for all 62 columns (A..BJ) and inserts into StudentRegistration.
-    Minimal validations. For large production usage, you'd likely do 
-    a more user-friendly approach, but here's the direct approach.
+    Gives every (row_num, values) in `batch` a registration number (one
+    reservation for the whole batch) and bulk inserts them, together with
+    their StudentContacts rows.
+    Returns (inserted, failed):
+      inserted: [(row_num, reg_no, values), ...]
+      failed:   [(row_num, child_name, reason), ...]
     """
-    print("\n-- Manual Student Registration (All 62 Fields) --")
-    # We'll store them in a list, in order, so we can do a single insert.
-    data = []
+    reg_nos = reserve_registration_numbers(academic_year, len(batch))
+    rows = [(pos, (reg_no, academic_year) + values)
+            for pos, ((_row_num, values), reg_no) in enumerate(zip(batch, reg_nos))]
+    ok_positions, failed_positions = bulk_insert(cursor, "StudentRegistration", REGISTRATION_INSERT_COLUMNS, rows)
+
+    inserted = [(batch[pos][0], reg_nos[pos], batch[pos][1]) for pos in ok_positions]
+    failed = [(batch[pos][0], batch[pos][1][CHILD_NAME_INDEX], f"DB Insert Error: {error}")
+              for (pos, error) in failed_positions]
+    write_student_contacts(cursor, [(reg_no, values) for (_row_num, reg_no, values) in inserted])
+    return inserted, failed
+
+def update_registration_batch(cursor, updates):
+    """
+    Overwrites registered students with re-imported sheet rows.
+    updates: [(row_num, reg_no, values), ...]. Their StudentContacts rows
+    are replaced in the same transaction. Returns (updated, failed) shaped
+    like insert_registration_batch's result.
+    """
+    assignments = ", ".join(f"{col} = ?" for col in STUDENT_REGISTRATION_COLUMNS)
+    sql = f"UPDATE StudentRegistration SET {assignments} WHERE RegNo = ?"
+    rows = [(pos, values + (reg_no,)) for pos, (_row_num, reg_no, values) in enumerate(updates)]
+    ok_positions, failed_positions = bulk_execute(cursor, "StudentRegistration", sql, rows)
+
+    updated = [updates[pos] for pos in ok_positions]
+    failed = [(updates[pos][0], updates[pos][2][CHILD_NAME_INDEX], f"DB Update Error: {error}")
+              for (pos, error) in failed_positions]
+    write_student_contacts(cursor, [(reg_no, values) for (_row_num, reg_no, values) in updated], replace=True)
+    return updated, failed
+
+# Duplicate detection. A sheet row is a duplicate when it shares a key with a
+# registered student or with an earlier row of the same file. The importers
+# load every key with one query, so each row is checked with dict lookups
+# instead of a round trip. What happens to duplicates is the policy:
+#   skip   - not imported; listed in the fail list
+#   update - the registered student is overwritten with the sheet row
+#   flag   - imported anyway; listed in the fail list as a possible duplicate
+
+DUPLICATE_POLICIES = ("skip", "update", "flag")
+DUPLICATE_POLICY = "skip"
+
+_DUPLICATE_KEY_NAMES = {
+    "B": "same Form B / Birth Certificate No",
+    "F": "same father CNIC, child name and DOB",
+}
 
-    # We'll define the prompts in a list of (column, prompt)
-    columns_prompts = [
-        ("FormNo", "Form No (A)"),
-        ("IssueDate", "Issue Date (B)"),
-        ("ValidTill", "Valid Till (C)"),
-        ("ChildName", "Child Name (D)"),
-        ("ChildDOB", "Date of Birth (E) [DDMMYYYY or any?]"),
-        ("ChildAge", "Age (F)"),
-        ("PlaceOfBirth", "Place of Birth (G)"),
-        ("Gender", "Gender (H) [M/F]?"),
-        ("Nationality", "Nationality (I)"),
-        ("Religion", "Religion (J)"),
-        ("FormB_BirthCertNo", "Form B No / Birth Cert No (K)"),
-        ("ClassAppliedFor", "Class Applied For (L)"),
-        ("PresentAddress", "Present Address (M)"),
-        ("PermanentAddress", "Permanent Address (N)"),
-        ("HomePhone1", "Home Phone 1 (O)"),
-        ("HomePhone2", "Home Phone 2 (P)"),
-        ("PreviousSchoolAttended", "Previous School Attended (Q)"),
-        ("ClassLastAttended", "Class Last Attended (R)"),
-        ("SessionCompleted", "Session Completed (S)"),
-        ("ReasonForLeavingLastSchool", "Reason for Leaving (T)"),
-        ("FatherName", "Father Name (U)"),
-        ("FatherDOB", "Father DOB (V) [DDMMYYYY or any?]"),
-        ("FatherNationality", "Father Nationality (W)"),
-        ("FatherReligion", "Father Religion (X)"),
-        ("FatherCNIC", "Father CNIC (Y)"),
-        ("FatherEmail", "Father Email (Z)"),
-        ("FatherQualification", "Father Qualification (AA)"),
-        ("FatherJobType", "Father Job Type (AB)"),
-        ("FatherBusinessType", "Father Business Type (AC)"),
-        ("FatherOrganization", "Father Organization (AD)"),
-        ("FatherOfficeAddress", "Father Office Address (AE)"),
-        ("FatherOfficePhone", "Father Office Phone (AF)"),
-        ("FatherMobile1", "Father Mobile 1 (AG)"),
-        ("FatherMobile2", "Father Mobile 2 (AH)"),
-        ("FatherWhatsApp", "Father WhatsApp (AI)"),
-        ("MotherName", "Mother Name (AJ)"),
-        ("MotherDOB", "Mother DOB (AK) [DDMMYYYY or any?]"),
-        ("MotherNationality", "Mother Nationality (AL)"),
+def registration_keys(form_b, father_cnic, child_name, child_dob):
+    """
+    Identity keys of one registration: ("B", Form B digits) and
+    ("F", father CNIC, child name, child DOB). A key is left out when any
+    of its parts is missing.
+    """
+    keys = []
+    form_b_digits = _NON_DIGITS.sub('', form_b or '')
+    if len(form_b_digits) >= 6:
+        keys.append(("B", form_b_digits))
+    cnic = _NON_DIGITS.sub('', father_cnic or '')
+    name = normalize_name(child_name)
+    dob = (child_dob or '').strip()
+    if len(cnic) == 13 and name and dob:
+        keys.append(("F", cnic, name, dob))
+    return keys
+
+class RegistrationDeduplicator:
+    """
+    The dedup stage of the registration importers. Call load() once, then
+    check() every normalized row in sheet order.
+    """
+
+    def __init__(self, policy=DUPLICATE_POLICY):
+        if policy not in DUPLICATE_POLICIES:
+            raise ValueError(f"Unknown duplicate policy: {policy}")
+        self.policy = policy
+        self.registered = {}  # key -> RegNo of the registered student
+        self.in_file = {}     # key -> spreadsheet row that used it first
+
+    def load(self, conn, batch_size=5000):
+        """
+        Reads the keys of every registered student in one query.
+        """
+        cursor = conn.cursor()
+        cursor.execute("SELECT RegNo, FormB_BirthCertNo, FatherCNIC, ChildName, ChildDOB FROM StudentRegistration")
+        students = 0
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for (reg_no, form_b, father_cnic, child_name, child_dob) in rows:
+                for key in registration_keys(form_b, father_cnic, child_name, child_dob):
+                    self.registered.setdefault(key, reg_no)
+            students += len(rows)
+        cursor.close()
+        return students
+
+    def check(self, row_num, values):
+        """
+        Returns (action, detail) for a normalized sheet row:
+          ("insert", None)   - new student
+          ("fail", reason)   - duplicate that is not imported
+          ("update", reg_no) - duplicate of reg_no, to be overwritten
+          ("flag", reason)   - duplicate to import anyway
+        A repeat of an earlier row in the same file is never an update; under
+        'update' it fails like under 'skip'.
+        """
+        keys = registration_keys(values[FORM_B_INDEX], values[FATHER_CNIC_INDEX],
+                                 values[CHILD_NAME_INDEX], values[CHILD_DOB_INDEX])
+        action, detail = "insert", None
+        for key in keys:
+            first_row = self.in_file.get(key)
+            if first_row is not None:
+                reason = f"Duplicate of row {first_row} in this file ({_DUPLICATE_KEY_NAMES[key[0]]})"
+                action, detail = ("flag", reason) if self.policy == "flag" else ("fail", reason)
+                break
+        else:
+            for key in keys:
+                reg_no = self.registered.get(key)
+                if reg_no is not None:
+                    if self.policy == "update":
+                        action, detail = "update", reg_no
+                    else:
+                        reason = f"Already registered as RegNo {reg_no} ({_DUPLICATE_KEY_NAMES[key[0]]})"
+                        action, detail = ("flag", reason) if self.policy == "flag" else ("fail", reason)
+                    break
+
+        if action != "fail":
+            for key in keys:
+                self.in_file.setdefault(key, row_num)
+        return action, detail
+
+def prompt_duplicate_policy():
+    """
+    Asks what to do with rows for students who are already registered.
+    Returns one of DUPLICATE_POLICIES, or None if the user cancelled.
+    """
+    answer = input(f"Duplicate students: (S)kip, (U)pdate existing or (F)lag and import? "
+                   f"(Enter for {DUPLICATE_POLICY}): ").strip().lower()
+    if answer == 'esc':
+        return None
+    return {"s": "skip", "u": "update", "f": "flag"}.get(answer[:1], DUPLICATE_POLICY)
+
+def check_registration_rows(rows):
+    """
+    Normalizes a list of raw sheet rows. Returns one (values, problem) pair per
+    row: (values, None) when the row is usable, or (None, (child_name, reason))
+    for the fail list.
+    """
+    results = [None] * len(rows)
+    usable_positions = []
+    usable_rows = []
+    for pos, row in enumerate(rows):
+        if len(row) < REGISTRATION_COLUMN_COUNT:
+            results[pos] = (None, ("(Unknown)", f"Not enough columns: {len(row)}/62"))
+        else:
+            usable_positions.append(pos)
+            usable_rows.append(row)
+
+    for pos, values in zip(usable_positions, normalize_registration_rows(usable_rows)):
+        # Minimal check: ChildName must not be empty
+        if not values[CHILD_NAME_INDEX]:
+            results[pos] = (None, ("(No ChildName)", "ChildName is empty (col D)"))
+        else:
+            results[pos] = (values, None)
+    return results
+
+def read_registration_chunks(reader, skip_through=2, chunk_rows=IMPORT_CHUNK_ROWS):
+    """
+    Yields lists of (row_num, raw_row) from a registration sheet reader that
+    is positioned after the header. row_num is the spreadsheet row (data
+    starts at row 3); rows up to and including `skip_through` are skipped.
+    """
+    chunk = []
+    row_num = 2
+    for row in reader:
+        row_num += 1
+        if row_num <= skip_through:
+            continue
+        chunk.append((row_num, row))
+        if len(chunk) >= chunk_rows:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _normalize_registration_chunk(chunk):
+    """
+    [(row_num, raw_row), ...] -> [(row_num, values, problem), ...]
+    Also used as the process pool worker.
+    """
+    checked = check_registration_rows([row for (_row_num, row) in chunk])
+    return [(row_num,) + result for ((row_num, _row), result) in zip(chunk, checked)]
+
+def iter_registration_rows(reader, skip_through=2):
+    """
+    Yields (row_num, values, problem) for each data row of a registration sheet.
+    row_num is the spreadsheet row (data starts at row 3). Rows up to and
+    including `skip_through` are read past without being normalized.
+    values is the normalized 62-tuple, or None when the row is rejected; then
+    problem is (child_name, reason) for the fail list.
+    Rows are normalized a chunk at a time with the column-wise helpers.
+    """
+    for chunk in read_registration_chunks(reader, skip_through):
+        yield from _normalize_registration_chunk(chunk)
+
+###############################################################################
+# 1.1.1 Large CSV import (streaming, committed in chunks, resumable)
+###############################################################################
+
+IMPORT_COMMIT_EVERY = 2000  # rows per committed chunk
+
+def iter_registration_rows_parallel(reader, skip_through=2, workers=IMPORT_WORKERS,
+                                    chunk_rows=IMPORT_CHUNK_ROWS):
+    """
+    Same output as iter_registration_rows, but the strip/format_* work runs
+    in a pool of `workers` processes:
+      reader (this process) -> chunks -> worker processes -> results in order
+    At most two chunks per worker are in flight, so memory stays bounded and
+    the caller (the single DB writer) sees rows in spreadsheet order.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = deque()
+        for chunk in read_registration_chunks(reader, skip_through, chunk_rows):
+            in_flight.append(pool.submit(_normalize_registration_chunk, chunk))
+            if len(in_flight) >= workers * 2:
+                yield from in_flight.popleft().result()
+        while in_flight:
+            yield from in_flight.popleft().result()
+
+def file_sha256(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+_CHECKPOINT_COLUMNS = {
+    "file": "FilePath", "academic_year": "AcademicYear", "duplicates": "Duplicates",
+    "last_row": "LastRow", "inserted": "Inserted", "updated": "Updated", "failed": "Failed",
+    "completed": "Completed",
+}
+
+def load_import_checkpoint(conn, file_hash):
+    """
+    The checkpoint dict of the import of the file with this SHA-256, or None.
+    """
+    row = conn.execute(
+        f"SELECT {', '.join(_CHECKPOINT_COLUMNS.values())} FROM ImportCheckpoints WHERE FileHash = ?",
+        file_hash).fetchone()
+    if row is None:
+        return None
+    checkpoint = dict(zip(_CHECKPOINT_COLUMNS, row))
+    checkpoint["sha256"] = file_hash
+    checkpoint["completed"] = bool(checkpoint["completed"])
+    return checkpoint
+
+def save_import_checkpoint(cursor, checkpoint):
+    """
+    Writes the checkpoint row on `cursor` without committing; the caller
+    commits it together with the rows it covers.
+    """
+    values = [checkpoint[field] for field in _CHECKPOINT_COLUMNS]
+    updated = cursor.execute(
+        f"UPDATE ImportCheckpoints SET {', '.join(f'{c} = ?' for c in _CHECKPOINT_COLUMNS.values())}, "
+        "UpdatedAt = GETDATE() WHERE FileHash = ?", *values, checkpoint["sha256"]).rowcount
+    if not updated:
+        cursor.execute(
+            f"INSERT INTO ImportCheckpoints (FileHash, {', '.join(_CHECKPOINT_COLUMNS.values())}) "
+            f"VALUES (?, {', '.join('?' for _ in _CHECKPOINT_COLUMNS)})", checkpoint["sha256"], *values)
+    # An unfinished import of an older version of the file is superseded by this one
+    cursor.execute("DELETE FROM ImportCheckpoints WHERE FilePath = ? AND FileHash <> ? AND Completed = 0",
+                   checkpoint["file"], checkpoint["sha256"])
+
+def import_registrations_streaming(file_path, academic_year=None, commit_every=IMPORT_COMMIT_EVERY,
+                                   resume=True, workers=IMPORT_WORKERS, duplicates=DUPLICATE_POLICY):
+    """
+    Imports a registration sheet without holding it in memory. Students are
+    registered for `academic_year` (default: the current one; a resumed
+    import keeps the year it was started with).
+    - With workers > 1 rows are normalized in a process pool
+      (iter_registration_rows_parallel); this process is the only DB writer.
+    - Duplicates of registered students or of earlier rows are handled by
+      the `duplicates` policy (see RegistrationDeduplicator); a resumed
+      import keeps the policy it was started with.
+    - Rows are sent with bulk_insert and committed every `commit_every` rows.
+    - Each commit also writes the last committed spreadsheet row to
+      ImportCheckpoints (keyed by the SHA-256 of the file) in the same
+      transaction, so the checkpoint always matches what was saved.
+    - With resume=True an existing checkpoint for the same file contents is
+      picked up and the import continues after its last committed row. If
+      an earlier import of this path stopped part way and the file has
+      changed since, it starts over; a 'flag' policy is then treated as
+      'skip' so the rows committed before are not registered twice.
+    - Failed rows go to <file>.failures.csv as each chunk is committed,
+      so memory use stays flat however big the file is.
+    Returns the final checkpoint dict (running totals included).
+    """
+    failures_path = file_path + ".failures.csv"
+    file_hash = file_sha256(file_path)
+
+    checkpoint = None
+    if resume:
+        with db_session() as conn:
+            checkpoint = load_import_checkpoint(conn, file_hash)
+            changed = checkpoint is None and conn.execute(
+                "SELECT COUNT(*) FROM ImportCheckpoints WHERE FilePath = ? AND Completed = 0",
+                os.path.abspath(file_path)).fetchone()[0]
+        if changed:
+            print("[WARNING] An earlier import of this file stopped part way and the file has changed since; "
+                  "starting over.")
+            if duplicates == "flag":
+                print("[WARNING] Students registered by the earlier run will be skipped, not flagged.")
+                duplicates = "skip"
+    if checkpoint and checkpoint["completed"]:
+        print(f"[INFO] This file was already imported completely (up to row {checkpoint['last_row']}).")
+        return checkpoint
+    if checkpoint:
+        print(f"[INFO] Resuming after spreadsheet row {checkpoint['last_row']}.")
+    else:
+        checkpoint = {
+            "file": os.path.abspath(file_path),
+            "sha256": file_hash,
+            "academic_year": academic_year or current_academic_year(),
+            "duplicates": duplicates,
+            "last_row": 2,  # header row; data starts at row 3
+            "inserted": 0,
+            "updated": 0,
+            "failed": 0,
+            "completed": False,
+        }
+
+    started = time.monotonic()
+    with open(file_path, mode='r', newline='', encoding='utf-8') as f, \
+         open(failures_path, mode='a' if checkpoint["last_row"] > 2 else 'w',
+              newline='', encoding='utf-8') as failures_file:
+        reader = csv.reader(f)
+        failures = csv.writer(failures_file)
+        if checkpoint["last_row"] == 2:
+            failures.writerow(["Row", "ChildName", "Reason"])
+
+        _sample = next(reader, None)
+        header = next(reader, None)
+        if not header or len(header) < REGISTRATION_COLUMN_COUNT:
+            raise ValueError("No valid header row found. Expected 62 columns.")
+
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            dedup = RegistrationDeduplicator(checkpoint["duplicates"])
+            dedup.load(conn)
+            batch = []          # (row_num, values) waiting to be sent
+            updates = []        # (row_num, reg_no, values) overwriting registered students
+            flagged = {}        # row_num -> reason, for possible duplicates inserted anyway
+            chunk_failures = [] # written out only once the chunk is committed
+            chunk_inserted = [] # (reg_no, values) for the in-memory indexes
+            chunk_updated = []
+            rows_in_chunk = 0
+            last_row = checkpoint["last_row"]
+
+            def flush():
+                inserted, failed = insert_registration_batch(cursor, batch, checkpoint["academic_year"])
+                for (rnum, reg_no, values) in inserted:
+                    chunk_inserted.append((reg_no, values))
+                    reason = flagged.pop(rnum, None)
+                    if reason:
+                        chunk_failures.append((rnum, values[CHILD_NAME_INDEX],
+                                               f"Flagged: {reason}; inserted as RegNo {reg_no}"))
+                chunk_failures.extend(failed)
+                flagged.clear()
+                batch.clear()
+
+            def flush_updates():
+                updated, failed = update_registration_batch(cursor, updates)
+                chunk_updated.extend((reg_no, values) for (_rnum, reg_no, values) in updated)
+                chunk_failures.extend(failed)
+                updates.clear()
+
+            def commit_chunk(completed=False):
+                nonlocal rows_in_chunk
+                if batch:
+                    flush()
+                if updates:
+                    flush_updates()
+                saved = dict(checkpoint, completed=completed, last_row=last_row,
+                             inserted=checkpoint["inserted"] + len(chunk_inserted),
+                             updated=checkpoint["updated"] + len(chunk_updated),
+                             failed=checkpoint["failed"] + len(chunk_failures))
+                save_import_checkpoint(cursor, saved)
+                conn.commit()
+                checkpoint.update(saved)
+                note_new_registrations(chunk_inserted)
+                note_updated_registrations(chunk_updated)
+                chunk_failures.sort()
+                failures.writerows(chunk_failures)
+                failures_file.flush()
+                chunk_failures.clear()
+                chunk_inserted.clear()
+                chunk_updated.clear()
+                rows_in_chunk = 0
+
+            if workers > 1:
+                rows = iter_registration_rows_parallel(reader, skip_through=checkpoint["last_row"], workers=workers)
+            else:
+                rows = iter_registration_rows(reader, skip_through=checkpoint["last_row"])
+
+            for (row_num, values, problem) in rows:
+                last_row = row_num
+                rows_in_chunk += 1
+                if problem:
+                    chunk_failures.append((row_num,) + problem)
+                else:
+                    action, detail = dedup.check(row_num, values)
+                    if action == "fail":
+                        chunk_failures.append((row_num, values[CHILD_NAME_INDEX], detail))
+                    elif action == "update":
+                        updates.append((row_num, detail, values))
+                        if len(updates) >= BULK_BATCH_SIZE:
+                            flush_updates()
+                    else:
+                        if action == "flag":
+                            flagged[row_num] = detail
+                        batch.append((row_num, values))
+                        if len(batch) >= BULK_BATCH_SIZE:
+                            flush()
+
+                if rows_in_chunk >= commit_every:
+                    commit_chunk()
+                    elapsed = time.monotonic() - started
+                    print(f"  ... committed through row {last_row} "
+                          f"({checkpoint['inserted']} inserted, {checkpoint['failed']} failed, {elapsed:.1f}s)")
+
+            commit_chunk(completed=True)
+        finally:
+            conn.close()
+
+    return checkpoint
+
+def register_new_students_csv_streaming():
+    """
+    Menu wrapper for import_registrations_streaming (large or interrupted files).
+    """
+    print("\n--- Register New Students (Large CSV, Resumable) ---")
+    file_path = input("Enter CSV path (or 'esc' to cancel): ").strip()
+    if file_path.lower() == 'esc':
+        return
+    academic_year = prompt_academic_year()
+    if not academic_year:
+        return
+    every = input(f"Commit every how many rows? (Enter for {IMPORT_COMMIT_EVERY}): ").strip()
+    commit_every = int(every) if every.isdigit() and int(every) > 0 else IMPORT_COMMIT_EVERY
+    procs = input(f"Worker processes for normalizing rows? (Enter for {IMPORT_WORKERS}): ").strip()
+    workers = int(procs) if procs.isdigit() and int(procs) > 0 else IMPORT_WORKERS
+    policy = prompt_duplicate_policy()
+    if not policy:
+        return
+
+    try:
+        result = import_registrations_streaming(file_path, academic_year=academic_year,
+                                                commit_every=commit_every, workers=workers,
+                                                duplicates=policy)
+    except FileNotFoundError:
+        print(f"[ERROR] File not found: {file_path}")
+        return
+    except Exception as e:
+        print(f"[ERROR] Import stopped: {e}")
+        print("[INFO] Run the import again on the same file to resume from the last checkpoint.")
+        return
+
+    print(f"\nCSV Import Complete. Last row: {result['last_row']}")
+    print(f"Successfully inserted: {result['inserted']}")
+    if result.get('updated'):
+        print(f"Updated existing students: {result['updated']}")
+    print(f"Failed: {result['failed']}")
+    if result['failed']:
+        print(f"Fail list written to: {file_path}.failures.csv")
+
+def register_new_student_manual():
+    """
+    Prompts user for all 62 columns (A..BJ) and inserts into StudentRegistration.
+    Minimal validations. For large production usage, you'd likely do 
+    a more user-friendly approach, but here's the direct approach.
+    """
+    print("\n-- Manual Student Registration (All 62 Fields) --")
+    # We'll store them in a list, in order, so we can do a single insert.
+    data = []
+
+    # We'll define the prompts in a list of (column, prompt)
+    columns_prompts = [
+        ("FormNo", "Form No (A)"),
+        ("IssueDate", "Issue Date (B)"),
+        ("ValidTill", "Valid Till (C)"),
+        ("ChildName", "Child Name (D)"),
+        ("ChildDOB", "Date of Birth (E) [DDMMYYYY or any?]"),
+        ("ChildAge", "Age (F)"),
+        ("PlaceOfBirth", "Place of Birth (G)"),
+        ("Gender", "Gender (H) [M/F]?"),
+        ("Nationality", "Nationality (I)"),
+        ("Religion", "Religion (J)"),
+        ("FormB_BirthCertNo", "Form B No / Birth Cert No (K)"),
+        ("ClassAppliedFor", "Class Applied For (L)"),
+        ("PresentAddress", "Present Address (M)"),
+        ("PermanentAddress", "Permanent Address (N)"),
+        ("HomePhone1", "Home Phone 1 (O)"),
+        ("HomePhone2", "Home Phone 2 (P)"),
+        ("PreviousSchoolAttended", "Previous School Attended (Q)"),
+        ("ClassLastAttended", "Class Last Attended (R)"),
+        ("SessionCompleted", "Session Completed (S)"),
+        ("ReasonForLeavingLastSchool", "Reason for Leaving (T)"),
+        ("FatherName", "Father Name (U)"),
+        ("FatherDOB", "Father DOB (V) [DDMMYYYY or any?]"),
+        ("FatherNationality", "Father Nationality (W)"),
+        ("FatherReligion", "Father Religion (X)"),
+        ("FatherCNIC", "Father CNIC (Y)"),
+        ("FatherEmail", "Father Email (Z)"),
+        ("FatherQualification", "Father Qualification (AA)"),
+        ("FatherJobType", "Father Job Type (AB)"),
+        ("FatherBusinessType", "Father Business Type (AC)"),
+        ("FatherOrganization", "Father Organization (AD)"),
+        ("FatherOfficeAddress", "Father Office Address (AE)"),
+        ("FatherOfficePhone", "Father Office Phone (AF)"),
+        ("FatherMobile1", "Father Mobile 1 (AG)"),
+        ("FatherMobile2", "Father Mobile 2 (AH)"),
+        ("FatherWhatsApp", "Father WhatsApp (AI)"),
+        ("MotherName", "Mother Name (AJ)"),
+        ("MotherDOB", "Mother DOB (AK) [DDMMYYYY or any?]"),
+        ("MotherNationality", "Mother Nationality (AL)"),
         ("MotherReligion", "Mother Religion (AM)"),
         ("MotherCNIC", "Mother CNIC (AN)"),
         ("MotherEmail", "Mother Email (AO)"),
@@ -650,14 +2338,11 @@ def register_new_student_manual():
     for (col, prompt_str) in columns_prompts:
         val = input(f"Enter {prompt_str}: ").strip()
         # Minimal transformations:
-        if col in ("ChildDOB", "FatherDOB", "MotherDOB"):
+        if col in DOB_COLUMNS:
             val = format_dob(val)
-        elif col in ("FatherCNIC", "MotherCNIC"):
+        elif col in CNIC_COLUMNS:
             val = format_cnic(val)
-        elif col in ("HomePhone1", "HomePhone2", "FatherOfficePhone", 
-                     "FatherMobile1", "FatherMobile2", "FatherWhatsApp",
-                     "MotherOfficePhone", "MotherMobile1", "MotherMobile2", 
-                     "MotherWhatsApp", "EmergencyContactPTCL", "EmergencyContactCell"):
+        elif col in PHONE_COLUMNS:
             val = format_phone(val)
         # else store as is
         data.append(val)
@@ -668,56 +2353,803 @@ def register_new_student_manual():
         print("[ERROR] Child Name is required!")
         return
 
+    academic_year = prompt_academic_year()
+    if not academic_year:
+        return
+
     # Insert into DB
-    conn = get_connection()
-    cursor = conn.cursor()
+    insert_sql = build_insert_sql("StudentRegistration", REGISTRATION_INSERT_COLUMNS)
+
+    with db_session() as conn:
+        cursor = conn.cursor()
+        try:
+            reg_no = generate_registration_number(academic_year)
+            cursor.execute(insert_sql, (reg_no, academic_year) + tuple(data))
+            write_student_contacts(cursor, [(reg_no, tuple(data))])
+            conn.commit()
+            note_new_registrations([(reg_no, tuple(data))])
+            print(f"[INFO] Student '{data[3]}' inserted successfully with RegNo {reg_no}.")
+        except Exception as ex:
+            print(f"[ERROR] Could not insert manual student: {ex}")
+            conn.rollback()
+        finally:
+            cursor.close()
+        
+def view_registered_students():
+    """
+    View registered students a page at a time, optionally only active or
+    inactive ones and/or one academic year.
+    """
+    print("\n--- View Registered Students ---")
+    filters = prompt_listing_filters(active_column="IsActive", year_column="AcademicYear")
+    if filters is None:
+        return
+    where, params = filters
 
-    insert_sql = """
-    INSERT INTO StudentRegistration (
-      FormNo, IssueDate, ValidTill, ChildName, ChildDOB, ChildAge, PlaceOfBirth, Gender,
-      Nationality, Religion, FormB_BirthCertNo, ClassAppliedFor, PresentAddress, PermanentAddress,
-      HomePhone1, HomePhone2, PreviousSchoolAttended, ClassLastAttended, SessionCompleted, ReasonForLeavingLastSchool,
-      FatherName, FatherDOB, FatherNationality, FatherReligion, FatherCNIC, FatherEmail, FatherQualification,
-      FatherJobType, FatherBusinessType, FatherOrganization, FatherOfficeAddress, FatherOfficePhone, FatherMobile1,
-      FatherMobile2, FatherWhatsApp, MotherName, MotherDOB, MotherNationality, MotherReligion, MotherCNIC, MotherEmail,
-      MotherQualification, MotherJobType, MotherBusinessType, MotherOrganization, MotherOfficeAddress, MotherOfficePhone,
-      MotherMobile1, MotherMobile2, MotherWhatsApp, ParentsMaritalStatus, ChildBloodGroup, ChildMedicalConditions, ChildDisabilities,
-      EmergencyContactName, EmergencyContactRelation, EmergencyContactPTCL, EmergencyContactCell, OtherChildrenStudyingDetails,
-      SiblingsInSchoolDetails, RelativesInSchoolDetails, RelativesWorkedInSchoolDetails
-    )
-    VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
+    query = """
+        SELECT TOP (?) StudentID, RegNo, ChildName, Gender, ChildDOB, FatherName, FatherCNIC,
+               FatherMobile1, IsActive
+        FROM StudentRegistration
     """
+    with db_session() as conn:
+        pages = iter_keyset_pages(conn, query, "StudentID", where, params)
+        browse_pages(
+            pages,
+            lambda row: (f"RegNo: {row[1]}, Name: {row[2]}, Gender: {row[3]}, DOB: {row[4]}, "
+                         f"Father: {row[5]}, CNIC: {row[6]}, Phone: {row[7]}, Active: {row[8]}"),
+            "Registered Students",
+            "No registered students found.",
+        )
 
-    try:
-        cursor.execute(insert_sql, tuple(data))
-        conn.commit()
-        print(f"[INFO] Student '{data[3]}' inserted successfully.")
-    except Exception as ex:
-        print(f"[ERROR] Could not insert manual student: {ex}")
-        conn.rollback()
 
-    cursor.close()
-    conn.close()
-        
-def view_registered_students():
+
+###############################################################################
+# 1.1.2 Student Name Search (in-memory trigram / prefix index)
+###############################################################################
+#
+# Front-desk search over ChildName, FatherName and MotherName that tolerates
+# partial and misspelled names. The index lives in memory: it is loaded from
+# a snapshot file at startup (then topped up with students registered since),
+# or built from StudentRegistration in one pass, and new registrations are
+# added as they are committed (note_new_registrations). The snapshot is
+# plain JSON under DATA_DIR; it holds student names, so keep it out of
+# version control and backups of the program folder.
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+NAME_INDEX_SNAPSHOT = os.path.join(DATA_DIR, "name_index.json")
+NAME_FIELDS = ("Child", "Father", "Mother")
+NAME_FIELD_WEIGHTS = (1.0, 0.85, 0.85)  # a hit on the child's own name ranks first
+NAME_WORD_MIN_SIMILARITY = 0.45         # how loosely a query word may match a name word
+NAME_WORD_MATCHES = 25                  # most similar name words tried per query word
+NAME_TYPO_SIMILARITY = 0.8              # one letter dropped/added/changed or two swapped
+
+_NAME_CLEAN = re.compile(r"[^a-z ]+")
+
+def normalize_name(name):
+    return " ".join(_NAME_CLEAN.sub(" ", (name or "").lower()).split())
+
+def word_trigrams(word):
     """
-    View all registered students (active or all).
+    Trigrams of a word, padded so the start counts double ("  a", " al", "ali", "li ").
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-    query = "SELECT RegNo, Name, Gender, DOB, FatherName, FatherCNIC, FatherPhone, IsActive FROM StudentRegistration"
-    cursor.execute(query)
-    rows = cursor.fetchall()
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def word_deletions(word):
+    """
+    The word with each single letter removed. Two words sharing a deletion
+    are one typo apart ("malik" and "mailk" both give "malk").
+    """
+    return {word[:i] + word[i + 1:] for i in range(len(word))} if len(word) > 3 else set()
+
+class NameSearchIndex:
+    """
+    Fuzzy index over students' names.
+    Each (student, name field) is an "entry". Names are split into words:
+    - words maps each distinct word to the set of entries containing it;
+    - word_grams maps a trigram to the distinct words containing it,
+      word_typos maps single-letter deletions back to words (typo matches),
+      and a sorted word list serves prefix lookups.
+    The vocabulary of distinct words is far smaller than the number of
+    students, so a query only does trigram matching against words, and then
+    intersects word -> entry sets. Entries must match every query word
+    (approximately); the score is the average word similarity times the
+    field weight.
+    """
+
+    SNAPSHOT_FORMAT = "tfs-name-index"
+    SNAPSHOT_VERSION = 4
+
+    def __init__(self):
+        self.students = {}          # RegNo -> (child, father, mother) as stored
+        self.entries = []           # entry id -> (RegNo, field index)
+        self.words = {}             # word -> set of entry ids
+        self.word_grams = defaultdict(set)  # trigram -> set of words
+        self.word_typos = defaultdict(set)  # word minus one letter -> set of words
+        self._sorted_words = None   # rebuilt lazily for prefix lookups
+        self.watermark = 0          # highest StudentID loaded from the database
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.students)
+
+    def add(self, reg_no, child_name, father_name, mother_name):
+        with self._lock:
+            if reg_no in self.students:
+                return
+            self.students[reg_no] = (child_name, father_name, mother_name)
+            for field, name in enumerate((child_name, father_name, mother_name)):
+                normalized = normalize_name(name)
+                if not normalized:
+                    continue
+                entry_id = len(self.entries)
+                self.entries.append((reg_no, field))
+                for word in normalized.split():
+                    members = self.words.get(word)
+                    if members is None:
+                        members = self.words[word] = set()
+                        for gram in word_trigrams(word):
+                            self.word_grams[gram].add(word)
+                        self.word_typos[word].add(word)
+                        for variant in word_deletions(word):
+                            self.word_typos[variant].add(word)
+                        self._sorted_words = None
+                    members.add(entry_id)
+
+    def update(self, reg_no, child_name, father_name, mother_name):
+        """
+        Re-indexes a student whose names may have changed. The old entries
+        are unlinked from their words; their slots in `entries` stay unused.
+        """
+        with self._lock:
+            old_names = self.students.pop(reg_no, None)
+            for name in old_names or ():
+                for word in normalize_name(name).split():
+                    members = self.words.get(word)
+                    if members:
+                        members.difference_update([e for e in members if self.entries[e][0] == reg_no])
+        self.add(reg_no, child_name, father_name, mother_name)
+
+    def _similar_words(self, query_word):
+        """
+        {name word: similarity 0..1} for the words closest to `query_word`:
+        trigram overlap (Dice), with words that start with it counted as strong matches.
+        """
+        query_grams = word_trigrams(query_word)
+        shared = Counter(chain.from_iterable(self.word_grams.get(gram, ()) for gram in query_grams))
+
+        # A word of n letters has n + 1 padded trigrams; even the shortest
+        # indexed words (2 letters) need this many shared ones to qualify.
+        lq = len(query_grams)
+        min_shared = NAME_WORD_MIN_SIMILARITY * (lq + 3) / 2
+        scores = {}
+        for word in [w for (w, count) in shared.items() if count >= min_shared]:
+            score = 2.0 * shared[word] / (lq + len(word) + 1)
+            if score >= NAME_WORD_MIN_SIMILARITY:
+                scores[word] = score
+
+        for variant in word_deletions(query_word) | {query_word}:
+            for word in self.word_typos.get(variant, ()):
+                if word != query_word:
+                    scores[word] = max(scores.get(word, 0.0), NAME_TYPO_SIMILARITY)
+
+        if self._sorted_words is None:
+            self._sorted_words = sorted(self.words)
+        words = self._sorted_words
+        i = bisect_left(words, query_word)
+        while i < len(words) and words[i].startswith(query_word):
+            scores[words[i]] = max(scores.get(words[i], 0.0), 0.9 if words[i] != query_word else 1.0)
+            i += 1
+
+        return dict(nlargest(NAME_WORD_MATCHES, scores.items(), key=lambda item: item[1]))
+
+    def search(self, query, limit=10):
+        """
+        Returns up to `limit` (score, RegNo, field name, (child, father, mother)),
+        best first. A score of 1.0 means every query word matched exactly on
+        the child's name.
+        """
+        query_words = list(dict.fromkeys(normalize_name(query).split()))
+        if not query_words:
+            return []
+
+        with self._lock:
+            matches = [self._similar_words(w) for w in query_words]
+            matches = [m for m in matches if m]  # words matching nothing are ignored
+            if not matches:
+                return []
+
+            # Start from the query word whose matching entries are fewest
+            sizes = [sum(len(self.words[w]) for w in m) for m in matches]
+            seed_pos = sizes.index(min(sizes))
+            seed = matches[seed_pos]
+            others = [sorted(m.items(), key=lambda item: -item[1])
+                      for pos, m in enumerate(matches) if pos != seed_pos]
+
+            candidates = {}
+            for word, score in seed.items():
+                for entry_id in self.words[word]:
+                    if score > candidates.get(entry_id, 0.0):
+                        candidates[entry_id] = score
+
+            best = {}  # RegNo -> (score, field)
+            for entry_id, total in candidates.items():
+                for ranked_words in others:
+                    for word, score in ranked_words:
+                        if entry_id in self.words[word]:
+                            total += score
+                            break
+                    else:
+                        break  # this entry lacks one of the query words
+                else:
+                    reg_no, field = self.entries[entry_id]
+                    score = total / len(query_words) * NAME_FIELD_WEIGHTS[field]
+                    if score > best.get(reg_no, (0.0,))[0]:
+                        best[reg_no] = (score, field)
+
+            top = nlargest(limit, best.items(), key=lambda item: item[1][0])
+            return [(score, reg_no, NAME_FIELDS[field], self.students[reg_no])
+                    for (reg_no, (score, field)) in top]
+
+    def load_from_db(self, conn, batch_size=5000):
+        """
+        Adds every student with StudentID above the watermark, streaming the
+        rows in batches.
+        """
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT StudentID, RegNo, ChildName, FatherName, MotherName FROM StudentRegistration "
+            "WHERE StudentID > ? ORDER BY StudentID",
+            self.watermark,
+        )
+        added = 0
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for (student_id, reg_no, child, father, mother) in rows:
+                self.add(reg_no, child, father, mother)
+                self.watermark = max(self.watermark, student_id)
+            added += len(rows)
+        cursor.close()
+        return added
+
+    def save_snapshot(self, path=NAME_INDEX_SNAPSHOT):
+        """
+        Writes the index as JSON. Trigrams and typo variants are left out;
+        they are rebuilt from the word list on load.
+        """
+        with self._lock:
+            state = {
+                "format": self.SNAPSHOT_FORMAT,
+                "version": self.SNAPSHOT_VERSION,
+                "watermark": self.watermark,
+                "students": self.students,
+                "entries": self.entries,
+                "words": {word: sorted(members) for (word, members) in self.words.items()},
+            }
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename, so a crash never leaves a half-written snapshot
+            tmp_path = path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f, separators=(",", ":"))
+            os.replace(tmp_path, path)
+
+    @classmethod
+    def load_snapshot(cls, path=NAME_INDEX_SNAPSHOT):
+        """
+        Returns the index saved at `path`, or None if there is no usable snapshot.
+        """
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"[WARNING] Ignoring unreadable name index snapshot: {e}")
+            return None
+        if (not isinstance(state, dict) or state.get("format") != cls.SNAPSHOT_FORMAT
+                or state.get("version") != cls.SNAPSHOT_VERSION):
+            return None
+        index = cls()
+        try:
+            index.watermark = int(state["watermark"])
+            index.students = {reg_no: tuple(names) for (reg_no, names) in state["students"].items()}
+            index.entries = [(reg_no, field) for (reg_no, field) in state["entries"]]
+            for (word, members) in state["words"].items():
+                index.words[word] = set(members)
+                for gram in word_trigrams(word):
+                    index.word_grams[gram].add(word)
+                index.word_typos[word].add(word)
+                for variant in word_deletions(word):
+                    index.word_typos[variant].add(word)
+        except (KeyError, TypeError, ValueError) as e:
+            print(f"[WARNING] Ignoring damaged name index snapshot: {e}")
+            return None
+        return index
+
+_name_index = None
+
+def load_name_index():
+    """
+    Loads the name index at startup: from the snapshot plus any students
+    registered since it was taken, or from scratch. Saves a fresh snapshot.
+    """
+    global _name_index
+    started = time.monotonic()
+    index = NameSearchIndex.load_snapshot() or NameSearchIndex()
+    with db_session() as conn:
+        added = index.load_from_db(conn)
+    _name_index = index
+    if added:
+        index.save_snapshot()
+    print(f"[INFO] Name search ready: {len(index):,} students ({time.monotonic() - started:.2f}s).")
+
+def get_name_index():
+    if _name_index is None:
+        load_name_index()
+    return _name_index
+
+def note_new_registrations(students):
+    """
+    Call after committing new StudentRegistration rows.
+    students: [(reg_no, values), ...] with values in STUDENT_REGISTRATION_COLUMNS order.
+    Keeps the in-memory student indexes up to date without reloading them.
+    """
+    if _name_index is not None:
+        for (reg_no, values) in students:
+            _name_index.add(reg_no, values[CHILD_NAME_INDEX], values[FATHER_NAME_INDEX], values[MOTHER_NAME_INDEX])
+    if _family_index is not None:
+        for (reg_no, values) in students:
+            _family_index.add(reg_no, values[FATHER_CNIC_INDEX], values[MOTHER_CNIC_INDEX])
+
+def note_updated_registrations(students):
+    """
+    Like note_new_registrations, for committed updates of existing students.
+    """
+    if _name_index is not None:
+        for (reg_no, values) in students:
+            _name_index.update(reg_no, values[CHILD_NAME_INDEX], values[FATHER_NAME_INDEX], values[MOTHER_NAME_INDEX])
+    if _family_index is not None:
+        for (reg_no, values) in students:
+            _family_index.update(reg_no, values[FATHER_CNIC_INDEX], values[MOTHER_CNIC_INDEX])
+
+def save_student_indexes():
+    if _name_index is not None:
+        _name_index.save_snapshot()
+
+def search_students_by_name():
+    print("\n--- Search Students By Name ---")
+    query = input("Enter child, father or mother name (partial or approximate, 'esc' to cancel): ").strip()
+    if not query or query.lower() == 'esc':
+        return
+    started = time.perf_counter()
+    results = get_name_index().search(query, limit=15)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if not results:
+        print(f"No students found matching '{query}'.")
+        return
+    print(f"\n--- Best matches for '{query}' ({elapsed_ms:.1f} ms) ---")
+    for (score, reg_no, field, (child, father, mother)) in results:
+        print(f"RegNo: {reg_no}, Child: {child}, Father: {father}, Mother: {mother}  "
+              f"[matched {field} name, score {score:.2f}]")
+
+def benchmark_name_search(students=100_000, queries=200, seed=11):
+    """
+    Builds the index over synthetic students and compares ranked fuzzy
+    queries with a LIKE '%x%'-style substring scan over the same names.
+    Queries are a child's full name; every other one has two letters
+    swapped. "found" counts queries whose student is in the top 10 (index)
+    or anywhere in the matches (scan).
+    """
+    import random
+    rng = random.Random(seed)
+    syllables = ["ah", "mad", "ali", "has", "san", "us", "man", "bi", "lal", "ham", "za", "zain", "fa", "ti",
+                 "ma", "ay", "sha", "ra", "hi", "sa", "na", "iq", "ba", "um", "air", "saad", "ta", "noor",
+                 "ee", "ab", "dul", "lah", "ib", "him", "yu", "suf", "kha", "di", "ja", "ray", "yan", "ri"]
+    surnames = ["khan", "ahmed", "malik", "sheikh", "qureshi", "siddiqui", "butt", "chaudhry", "raza", "abbasi",
+                "hashmi", "mirza", "baig", "javed", "iqbal", "farooq", "tariq", "aslam", "rehman", "shah"]
+
+    def person():
+        given = "".join(rng.choice(syllables) for _ in range(rng.randint(2, 3))).title()
+        middle = "".join(rng.choice(syllables) for _ in range(2)).title()
+        return f"{given} {middle} {rng.choice(surnames).title()}"
+
+    people = [(f"B{i:07d}", person(), person(), person()) for i in range(students)]
+
+    started = time.perf_counter()
+    index = NameSearchIndex()
+    for row in people:
+        index.add(*row)
+    build_time = time.perf_counter() - started
+
+    def misspell(text):
+        i = rng.randrange(2, len(text) - 1)
+        return text[:i - 1] + text[i] + text[i - 1] + text[i + 1:]  # swap two letters
+
+    cases = []
+    for n in range(queries):
+        target = rng.choice(people)
+        cases.append((misspell(target[1]) if n % 2 else target[1], target[0]))
+
+    started = time.perf_counter()
+    index_found = sum(1 for (text, reg_no) in cases if any(r[1] == reg_no for r in index.search(text)))
+    index_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    like_found = 0
+    for (text, reg_no) in cases:
+        needle = text.lower()
+        hits = [p[0] for p in people if needle in p[1].lower() or needle in p[2].lower() or needle in p[3].lower()]
+        like_found += reg_no in hits
+    like_time = time.perf_counter() - started
+
+    print(f"\n--- Name search benchmark ({students:,} students, {queries} queries) ---")
+    print(f"  Index build: {build_time:.2f}s, {len(index.words):,} distinct name words")
+    print(f"  Fuzzy index    : {index_time / queries * 1000:8.2f} ms/query   found {index_found}/{queries}")
+    print(f"  LIKE '%x%' scan: {like_time / queries * 1000:8.2f} ms/query   found {like_found}/{queries}")
+
+###############################################################################
+# 1.1.3 Phone Number Lookup (StudentContacts)
+###############################################################################
+#
+# Every phone column of a registration is copied into StudentContacts as
+# (PhoneNumber, RegNo, ContactRole), keyed by the number, so "who is calling?"
+# is one clustered index seek instead of an OR over twelve unindexed columns.
+# Rows are written in the same transaction as the student (see
+# insert_registration_batch); backfill-contacts fills in older students.
+
+CONTACT_BACKFILL_CHUNK = 5000  # students re-indexed per committed chunk
+
+def phone_lookup_key(raw_phone):
+    """
+    The form a number is stored and searched under in StudentContacts.
+    Mobiles get format_phone's +92-3xxxxxxxxx; other numbers (PTCL, office)
+    are reduced the same way: digits only, without the trunk 0 or the 92
+    country code. Returns None for blanks and anything too short to be a
+    phone number.
+    """
+    formatted = format_phone(raw_phone)
+    if formatted.startswith("+92-"):
+        return formatted
+    digits = _NON_DIGITS.sub('', raw_phone)
+    if digits.startswith('00'):
+        digits = digits[2:]
+    if digits.startswith('92') and len(digits) > 10:
+        digits = digits[2:]
+    elif digits.startswith('0'):
+        digits = digits[1:]
+    if len(digits) < 6 or len(digits) > 15:
+        return None
+    return "+92-" + digits
+
+def student_contact_rows(reg_no, values):
+    """
+    StudentContacts rows (PhoneNumber, RegNo, ContactRole) for one student;
+    values are in STUDENT_REGISTRATION_COLUMNS order. The same number under
+    two columns gives two rows, so the lookup can say who it belongs to.
+    """
+    rows = set()
+    for (role, i) in zip(PHONE_COLUMNS, PHONE_COLUMN_INDEXES):
+        number = phone_lookup_key(values[i] or "")
+        if number:
+            rows.add((number, reg_no, role))
+    return rows
+
+def write_student_contacts(cursor, students, replace=False):
+    """
+    Writes the StudentContacts rows of students [(reg_no, values), ...] in
+    the caller's transaction. With replace=True the students' existing rows
+    are deleted first (for students whose phone columns were updated).
+    """
+    if replace:
+        reg_nos = [(reg_no,) for (reg_no, _values) in students]
+        if reg_nos:
+            cursor.fast_executemany = True
+            cursor.executemany("DELETE FROM StudentContacts WHERE RegNo = ?", reg_nos)
+    rows = []
+    for (reg_no, values) in students:
+        rows.extend(student_contact_rows(reg_no, values))
     if not rows:
-        print("No registered students found.")
-    else:
-        print("\n--- Registered Students ---")
-        for row in rows:
-            print(f"RegNo: {row[0]}, Name: {row[1]}, Gender: {row[2]}, DOB: {row[3]}, "
-                  f"Father: {row[4]}, CNIC: {row[5]}, Phone: {row[6]}, Active: {row[7]}")
-    conn.close()
+        return
+    _inserted, failed = bulk_insert(cursor, "StudentContacts", ("PhoneNumber", "RegNo", "ContactRole"),
+                                    [(row, row) for row in rows])
+    for ((number, reg_no, role), error) in failed:
+        print(f"[WARNING] Could not index {role} {number} of {reg_no}: {error}")
+
+def backfill_student_contacts(chunk_size=CONTACT_BACKFILL_CHUNK):
+    """
+    Rebuilds StudentContacts from StudentRegistration, chunk by chunk in
+    StudentID order. Each chunk replaces its students' rows and commits, so
+    the command can be stopped and re-run safely.
+    """
+    initialize_database()  # StudentContacts comes from migration 4
+    select_sql = (f"SELECT TOP (?) StudentID, RegNo, {', '.join(PHONE_COLUMNS)} "
+                  "FROM StudentRegistration WHERE StudentID > ? ORDER BY StudentID")
+    started = time.monotonic()
+    students = 0
+    numbers = 0
+    last_id = 0
+    with db_session() as conn:
+        cursor = conn.cursor()
+        while True:
+            chunk = cursor.execute(select_sql, chunk_size, last_id).fetchall()
+            if not chunk:
+                break
+            cursor.execute("DELETE FROM StudentContacts WHERE RegNo IN "
+                           "(SELECT RegNo FROM StudentRegistration WHERE StudentID > ? AND StudentID <= ?)",
+                           last_id, chunk[-1][0])
+            rows = set()
+            for row in chunk:
+                for (role, raw) in zip(PHONE_COLUMNS, row[2:]):
+                    number = phone_lookup_key(raw or "")
+                    if number:
+                        rows.add((number, row[1], role))
+            if rows:
+                _inserted, failed = bulk_insert(cursor, "StudentContacts", ("PhoneNumber", "RegNo", "ContactRole"),
+                                                [(r, r) for r in rows])
+                for ((number, reg_no, role), error) in failed:
+                    print(f"[WARNING] Could not index {role} {number} of {reg_no}: {error}")
+            conn.commit()
+            students += len(chunk)
+            numbers += len(rows)
+            last_id = chunk[-1][0]
+            print(f"  ... {students:,} students, {numbers:,} numbers ({time.monotonic() - started:.1f}s)")
+        cursor.close()
+    print(f"[INFO] StudentContacts rebuilt: {numbers:,} numbers for {students:,} students.")
+
+def find_students_by_phone():
+    print("\n--- Find Student By Phone Number ---")
+    raw = input("Enter any phone number (mobile, PTCL, office; 'esc' to cancel): ").strip()
+    if not raw or raw.lower() == 'esc':
+        return
+    number = phone_lookup_key(raw)
+    if number is None:
+        print(f"[ERROR] '{raw}' does not look like a phone number.")
+        return
+
+    with db_session() as conn:
+        started = time.perf_counter()
+        rows = conn.execute("""
+            SELECT C.ContactRole, R.RegNo, R.ChildName, R.FatherName, R.MotherName,
+                   R.ClassAppliedFor, R.AcademicYear, R.IsActive
+            FROM StudentContacts C
+            JOIN StudentRegistration R ON R.RegNo = C.RegNo
+            WHERE C.PhoneNumber = ?
+            ORDER BY R.RegNo, C.ContactRole
+        """, number).fetchall()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+    if not rows:
+        print(f"No student has {number} on record.")
+        return
+    print(f"\n--- Students with {number} ({elapsed_ms:.1f} ms) ---")
+    for (role, reg_no, child, father, mother, class_name, year, active) in rows:
+        print(f"RegNo: {reg_no}, Child: {child}, Father: {father}, Mother: {mother}, "
+              f"Class: {class_name}, Year: {year}, Active: {active}  [{role}]")
+
+###############################################################################
+# 1.1.4 Families (siblings grouped by parent CNIC)
+###############################################################################
+#
+# Students who share a father or mother CNIC are siblings, and so are their
+# siblings' siblings (half-siblings link two families into one). FamilyIndex
+# is a union-find over parent CNICs: built in one pass over
+# StudentRegistration at startup and extended as students are registered, so
+# grouping a fee roster by family is a dict lookup per student.
+
+# Sibling discounts are a fee policy ("sibling", see FEE_POLICY_FIELDS): the
+# first child of a family pays in full, the second gets the second-child
+# percent off and the third and later the later-child percent.
+
+def family_cnic(raw_cnic):
+    """
+    A parent CNIC usable as a family key (13 digits), or None for blanks,
+    malformed values and placeholders such as 0000000000000.
+    """
+    digits = _NON_DIGITS.sub('', raw_cnic or '')
+    if len(digits) != 13 or len(set(digits)) == 1:
+        return None
+    return digits
+
+class FamilyIndex:
+
+    def __init__(self):
+        self.student_cnics = {}  # RegNo -> (father CNIC, mother CNIC), normalized
+        self._parent = {}        # union-find: CNIC -> parent CNIC
+        self._members = {}       # root CNIC -> set of RegNos
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._members)
+
+    def _find(self, cnic):
+        parent = self._parent
+        while parent[cnic] != cnic:
+            parent[cnic] = parent[parent[cnic]]  # path halving
+            cnic = parent[cnic]
+        return cnic
+
+    def _link(self, cnics):
+        """
+        Unions the given CNICs; returns the root of their family.
+        """
+        root = None
+        for cnic in cnics:
+            if cnic not in self._parent:
+                self._parent[cnic] = cnic
+                self._members[cnic] = set()
+            other = self._find(cnic)
+            if root is None or other == root:
+                root = other
+                continue
+            # Union by size: the smaller family joins the larger one
+            if len(self._members[other]) > len(self._members[root]):
+                root, other = other, root
+            self._parent[other] = root
+            self._members[root] |= self._members.pop(other)
+        return root
+
+    def _add_locked(self, reg_no, father_cnic, mother_cnic):
+        cnics = (family_cnic(father_cnic), family_cnic(mother_cnic))
+        self.student_cnics[reg_no] = cnics
+        root = self._link([c for c in cnics if c])
+        if root is not None:
+            self._members[root].add(reg_no)
+
+    def add(self, reg_no, father_cnic, mother_cnic):
+        with self._lock:
+            if reg_no not in self.student_cnics:
+                self._add_locked(reg_no, father_cnic, mother_cnic)
+
+    def update(self, reg_no, father_cnic, mother_cnic):
+        """
+        Records new parent CNICs for a student. A changed CNIC can split a
+        family, which union-find cannot undo, so the groups are then rebuilt
+        from the CNICs already in memory.
+        """
+        with self._lock:
+            cnics = (family_cnic(father_cnic), family_cnic(mother_cnic))
+            old = self.student_cnics.get(reg_no)
+            if old == cnics:
+                return
+            if old is None or (set(old) - {None}) <= (set(cnics) - {None}):
+                self._add_locked(reg_no, father_cnic, mother_cnic)  # new, or only gained a parent CNIC
+            else:
+                self.student_cnics[reg_no] = cnics
+                self._rebuild_locked()
+
+    def _rebuild_locked(self):
+        students = self.student_cnics
+        self.student_cnics = {}
+        self._parent = {}
+        self._members = {}
+        for reg_no, (father, mother) in students.items():
+            self._add_locked(reg_no, father, mother)
+
+    def _root_of(self, reg_no=None, cnic=None):
+        if reg_no is not None:
+            cnic = next((c for c in self.student_cnics.get(reg_no, ()) if c), None)
+        else:
+            cnic = family_cnic(cnic)
+        return self._find(cnic) if cnic in self._parent else None
+
+    def family(self, reg_no=None, cnic=None):
+        """
+        (RegNos, parent CNICs) of the family of a student or of a parent CNIC.
+        Both are empty when nothing is known about it.
+        """
+        with self._lock:
+            root = self._root_of(reg_no, cnic)
+            if root is None:
+                return set(), set()
+            members = set(self._members[root])
+            cnics = {c for r in members for c in self.student_cnics[r] if c}
+            return members, cnics
+
+    def group_families(self, reg_nos):
+        """
+        Splits `reg_nos` into lists of siblings (students with no known
+        family are a list of one). Only students within `reg_nos` are grouped.
+        """
+        groups = defaultdict(list)
+        with self._lock:
+            for reg_no in reg_nos:
+                root = self._root_of(reg_no)
+                groups[root if root is not None else ("single", reg_no)].append(reg_no)
+        return list(groups.values())
+
+    def sibling_discounts(self, reg_nos, percents, order_key=None):
+        """
+        {RegNo: discount percent} for the students in `reg_nos` (e.g. the
+        active roster being billed). Only siblings within `reg_nos` count.
+        Within a family students are ranked by order_key(reg_no) (default:
+        RegNo, i.e. registration order; the voucher run passes date of birth
+        so the eldest pays in full). The child at position i gets
+        percents[i], the last percent applying to everyone after it.
+        """
+        discounts = {}
+        last = len(percents) - 1
+        for members in self.group_families(reg_nos):
+            members.sort(key=order_key)
+            for position, reg_no in enumerate(members):
+                discounts[reg_no] = percents[min(position, last)]
+        return discounts
+
+    def load_from_db(self, conn, batch_size=5000):
+        cursor = conn.cursor()
+        cursor.execute("SELECT RegNo, FatherCNIC, MotherCNIC FROM StudentRegistration")
+        added = 0
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            with self._lock:
+                for (reg_no, father_cnic, mother_cnic) in rows:
+                    if reg_no not in self.student_cnics:
+                        self._add_locked(reg_no, father_cnic, mother_cnic)
+            added += len(rows)
+        cursor.close()
+        return added
+
+_family_index = None
+
+def load_family_index():
+    global _family_index
+    started = time.monotonic()
+    index = FamilyIndex()
+    with db_session() as conn:
+        students = index.load_from_db(conn)
+    _family_index = index
+    print(f"[INFO] Family index ready: {students:,} students in {len(index):,} families "
+          f"({time.monotonic() - started:.2f}s).")
+
+def get_family_index():
+    if _family_index is None:
+        load_family_index()
+    return _family_index
+
+def show_family():
+    print("\n--- Show Family ---")
+    key = input("Enter a student's RegNo or a parent's CNIC ('esc' to cancel): ").strip()
+    if not key or key.lower() == 'esc':
+        return
 
+    index = get_family_index()
+    if family_cnic(key):
+        members, cnics = index.family(cnic=key)
+        cnics.add(family_cnic(key))
+    else:
+        members, cnics = index.family(reg_no=key)
+        if not members:
+            members = {key}  # no usable parent CNIC; show the student alone
+
+    # One query: the known members by RegNo plus anyone else on the parents' CNICs
+    members = sorted(members)
+    cnics = sorted(cnics)
+    conditions = []
+    if members:
+        conditions.append(f"RegNo IN ({', '.join('?' for _ in members)})")
+    if cnics:
+        marks = ', '.join('?' for _ in cnics)
+        conditions.append(f"FatherCNIC IN ({marks})")
+        conditions.append(f"MotherCNIC IN ({marks})")
+    with db_session() as conn:
+        rows = conn.execute(f"""
+            SELECT RegNo, ChildName, ChildDOB, Gender, ClassAppliedFor, FatherName, FatherCNIC,
+                   MotherName, MotherCNIC, IsActive
+            FROM StudentRegistration
+            WHERE {' OR '.join(conditions)}
+            ORDER BY ChildDOB, RegNo
+        """, *members, *cnics, *cnics).fetchall()
 
+    if not rows:
+        print(f"No students found for '{key}'.")
+        return
+    print(f"\n--- Family ({len(rows)} children) ---")
+    for (reg_no, child, dob, gender, class_name, father, father_cnic, mother, mother_cnic, active) in rows:
+        print(f"RegNo: {reg_no}, Child: {child}, DOB: {dob}, Gender: {gender}, Class: {class_name}, "
+              f"Father: {father} ({father_cnic}), Mother: {mother} ({mother_cnic}), Active: {active}")
 
 ###############################################################################
 # 1.2 Admission Test Result
@@ -751,19 +3183,252 @@ def update_admission_test_result():
     Manually update test results for a single student (RegNo).
     If pass, auto-generate admission fee voucher.
     """
-    print("\n[INFO] Update Admission Test Results - NOT IMPLEMENTED (Placeholder)")
+    print("\n--- Update Admission Test Result ---")
+    reg_no = input("Enter RegNo ('esc' to cancel): ").strip()
+    if not reg_no or reg_no.lower() == 'esc':
+        return
+    marks = input("Marks obtained (Enter if absent/not marked): ").strip()
+    total = input(f"Total marks (Enter for {ADMISSION_TEST_TOTAL_MARKS}): ").strip() or str(ADMISSION_TEST_TOTAL_MARKS)
+    result = input(f"Result (P)ass/(F)ail/(A)bsent (Enter to decide by marks, pass at "
+                   f"{ADMISSION_PASS_PERCENT}%): ").strip()
+    remarks = input("Remarks (optional): ").strip()
+    try:
+        summary = apply_admission_test_results([(1, reg_no, marks, total, result, remarks)])
+    except Exception as e:
+        print(f"[ERROR] Could not update the result: {e}")
+        return
+    print_admission_test_summary(summary)
 
 def update_admission_test_result_bulk():
     """
     Bulk update from CSV/Excel.
+    Columns: RegNo, Marks, TotalMarks, Result (P/F/A or blank), Remarks;
+    row 1 is the header. Blank TotalMarks means ADMISSION_TEST_TOTAL_MARKS
+    and a blank Result is decided by the marks.
     """
-    print("\n[INFO] Update Admission Test Results In Bulk - NOT IMPLEMENTED (Placeholder)")
+    print("\n--- Update Admission Test Results (CSV) ---")
+    file_path = input("Enter CSV path (or 'esc' to cancel): ").strip()
+    if file_path.lower() == 'esc':
+        return
+    try:
+        with open(file_path, mode='r', newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            next(reader, None)  # header
+            rows = []
+            for row_num, row in enumerate(reader, start=2):
+                if not any(cell.strip() for cell in row):
+                    continue
+                cells = [cell.strip() for cell in row[:5]] + [""] * (5 - len(row[:5]))
+                rows.append((row_num, *cells))
+        summary = apply_admission_test_results(rows)
+    except FileNotFoundError:
+        print(f"[ERROR] File not found: {file_path}")
+        return
+    except Exception as e:
+        print(f"[ERROR] An error occurred while processing the CSV: {e}")
+        return
+    print_admission_test_summary(summary)
 
 def view_admission_test_results():
     """
     View results for all or filtered by pass/fail, etc.
     """
-    print("\n[INFO] View Admission Test Results - NOT IMPLEMENTED (Placeholder)")
+    print("\n--- View Admission Test Results ---")
+    choice = input("Show (P)assed, (F)ailed, (A)bsent or Enter for all: ").strip().lower()
+    if choice == 'esc':
+        return
+    where = []
+    params = []
+    result = {"p": "pass", "f": "fail", "a": "absent"}.get(choice[:1])
+    if result:
+        where.append("T.Result = ?")
+        params.append(result)
+
+    query = """
+        SELECT TOP (?) T.RegNo, R.ChildName, R.ClassAppliedFor, T.Marks, T.TotalMarks, T.Result, T.Remarks
+        FROM AdmissionTestResults T
+        JOIN StudentRegistration R ON R.RegNo = T.RegNo
+    """
+    with db_session() as conn:
+        pages = iter_keyset_pages(conn, query, "T.RegNo", where, params)
+        browse_pages(
+            pages,
+            lambda row: (f"RegNo: {row[0]}, Name: {row[1]}, Class: {row[2]}, Marks: {row[3]}/{row[4]}, "
+                         f"Result: {row[5]}" + (f", Remarks: {row[6]}" if row[6] else "")),
+            "Admission Test Results",
+            "No admission test results found.",
+        )
+
+# Results are applied in one transaction: the rows are staged in
+# #TestResults, checked and decided in SQL, written to AdmissionTestResults
+# with one UPDATE join plus one INSERT ... SELECT, and every pass without an
+# admission voucher gets one from a single INSERT ... SELECT numbered from a
+# reserved block. Re-applying the same file changes nothing.
+
+ADMISSION_PASS_PERCENT = 40      # pass mark when the sheet gives no result
+ADMISSION_TEST_TOTAL_MARKS = 100  # total marks when the sheet leaves it blank
+ADMISSION_FEE_DUE_DAYS = 14      # admission vouchers are due this many days after the result
+
+_TEST_RESULT_SQL = {
+    "create": """
+        CREATE TABLE #TestResults (
+          RowNum                INT NOT NULL PRIMARY KEY,
+          RegNo                 VARCHAR(100) NOT NULL,
+          MarksText             VARCHAR(100) NULL,
+          TotalText             VARCHAR(100) NULL,
+          ResultText            VARCHAR(100) NULL,
+          Remarks               VARCHAR(200) NULL,
+          Marks                 DECIMAL(6,2) NULL,
+          TotalMarks            DECIMAL(6,2) NULL,
+          Result                VARCHAR(10) NULL,
+          Outcome               VARCHAR(20) NULL
+        )
+    """,
+    # Parse and decide; anything left without a Result is invalid
+    "decide": """
+        UPDATE #TestResults SET
+            Marks = TRY_CAST(NULLIF(MarksText, '') AS DECIMAL(6,2)),
+            TotalMarks = TRY_CAST(NULLIF(TotalText, '') AS DECIMAL(6,2));
+
+        UPDATE #TestResults SET Result = CASE
+            WHEN UPPER(LEFT(ResultText, 1)) = 'P' THEN 'pass'
+            WHEN UPPER(LEFT(ResultText, 1)) = 'F' THEN 'fail'
+            WHEN UPPER(LEFT(ResultText, 1)) = 'A' THEN 'absent'
+            WHEN ISNULL(ResultText, '') <> '' THEN NULL
+            WHEN Marks IS NULL AND ISNULL(MarksText, '') = '' THEN 'absent'
+            WHEN Marks IS NOT NULL AND TotalMarks > 0 AND Marks <= TotalMarks THEN
+                CASE WHEN Marks * 100 / TotalMarks >= ? THEN 'pass' ELSE 'fail' END
+        END;
+
+        UPDATE #TestResults SET Outcome = 'invalid'
+        WHERE Result IS NULL
+           OR (ISNULL(MarksText, '') <> '' AND Marks IS NULL)
+           OR (ISNULL(TotalText, '') <> '' AND TotalMarks IS NULL);
+
+        UPDATE S SET Outcome = 'unmatched'
+        FROM #TestResults S
+        WHERE S.Outcome IS NULL
+          AND NOT EXISTS (SELECT 1 FROM StudentRegistration R WHERE R.RegNo = S.RegNo);
+
+        UPDATE S SET Outcome = 'duplicate'
+        FROM #TestResults S
+        JOIN (SELECT RowNum, ROW_NUMBER() OVER (PARTITION BY RegNo ORDER BY RowNum DESC) AS Latest
+              FROM #TestResults WHERE Outcome IS NULL) D ON D.RowNum = S.RowNum
+        WHERE D.Latest > 1;
+    """,
+    "apply": """
+        UPDATE T SET Marks = S.Marks, TotalMarks = S.TotalMarks, Result = S.Result,
+                     Remarks = NULLIF(S.Remarks, ''), UpdatedAt = GETDATE()
+        FROM AdmissionTestResults T
+        JOIN #TestResults S ON S.RegNo = T.RegNo
+        WHERE S.Outcome IS NULL;
+
+        INSERT INTO AdmissionTestResults (RegNo, Marks, TotalMarks, Result, Remarks)
+        SELECT S.RegNo, S.Marks, S.TotalMarks, S.Result, NULLIF(S.Remarks, '')
+        FROM #TestResults S
+        WHERE S.Outcome IS NULL
+          AND NOT EXISTS (SELECT 1 FROM AdmissionTestResults T WHERE T.RegNo = S.RegNo);
+
+        UPDATE #TestResults SET Outcome = Result WHERE Outcome IS NULL;
+
+        -- A student marked failed/absent after passing loses an unpaid admission
+        -- voucher; passing again brings it back
+        UPDATE V SET Status = CASE S.Outcome WHEN 'pass' THEN 'unpaid' ELSE 'cancelled' END
+        FROM FeeVouchers V
+        JOIN #TestResults S ON S.RegNo = V.RegNo
+        WHERE V.VoucherType = 'admission'
+          AND ((S.Outcome IN ('fail', 'absent') AND V.Status = 'unpaid')
+               OR (S.Outcome = 'pass' AND V.Status = 'cancelled'));
+    """,
+    "needing_vouchers": """
+        SELECT COUNT(*) FROM #TestResults S
+        WHERE S.Outcome = 'pass'
+          AND NOT EXISTS (SELECT 1 FROM FeeVouchers V
+                          WHERE V.RegNo = S.RegNo AND V.VoucherType = 'admission')
+    """,
+    "vouchers": """
+        INSERT INTO FeeVouchers (VoucherNo, RegNo, VoucherType, BillingMonth, ClassName,
+                                 AdmissionFee, SecurityDeposit, TotalAmount, DueDate)
+        SELECT CAST(CAST(? AS BIGINT) + ROW_NUMBER() OVER (ORDER BY S.RegNo) - 1 AS VARCHAR(20)),
+               S.RegNo, 'admission', ?, R.ClassAppliedFor, ?, ?, ?, ?
+        FROM #TestResults S
+        JOIN StudentRegistration R ON R.RegNo = S.RegNo
+        WHERE S.Outcome = 'pass'
+          AND NOT EXISTS (SELECT 1 FROM FeeVouchers V
+                          WHERE V.RegNo = S.RegNo AND V.VoucherType = 'admission')
+    """,
+    "outcomes": "SELECT RowNum, RegNo, Outcome FROM #TestResults ORDER BY RowNum",
+}
+
+def apply_admission_test_results(rows):
+    """
+    rows: [(row_num, RegNo, marks, total marks, result, remarks)] as text.
+    Records the results and creates an admission fee voucher for every pass
+    that has none, all in one transaction. Returns a summary dict:
+    counts per outcome (pass/fail/absent/invalid/unmatched/duplicate), the
+    unmatched and invalid rows, vouchers created and a warning when no
+    admission fee policy is defined (results are still recorded).
+    """
+    staged = [(row_num, (row_num, reg_no[:100], marks[:100], (total or str(ADMISSION_TEST_TOTAL_MARKS))[:100],
+                         result[:100], remarks[:200]))
+              for (row_num, reg_no, marks, total, result, remarks) in rows if reg_no]
+    summary = {"counts": Counter(), "unmatched": [], "invalid": [], "vouchers": 0, "warning": None}
+    if not staged:
+        return summary
+
+    today = date.today()
+    billing_month = today.replace(day=1)
+    policy = fee_policy_cache.snapshot(today).admission
+
+    with db_session() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(_TEST_RESULT_SQL["create"])
+            bulk_insert(cursor, "#TestResults",
+                        ("RowNum", "RegNo", "MarksText", "TotalText", "ResultText", "Remarks"), staged)
+            execute_batch(cursor, _TEST_RESULT_SQL["decide"], ADMISSION_PASS_PERCENT)
+            execute_batch(cursor, _TEST_RESULT_SQL["apply"])
+
+            needed = cursor.execute(_TEST_RESULT_SQL["needing_vouchers"]).fetchone()[0]
+            if needed and policy is None:
+                summary["warning"] = ("No admission fee policy is defined, so no vouchers were created. "
+                                      "Add one and apply the results again.")
+            elif needed:
+                first = reserve_voucher_numbers(cursor, billing_month, needed)[0]
+                fee, deposit = policy["admission_fee"], policy["security_deposit"]
+                cursor.execute(_TEST_RESULT_SQL["vouchers"], int(first), billing_month,
+                               fee, deposit, fee + deposit, today + timedelta(days=ADMISSION_FEE_DUE_DAYS))
+                summary["vouchers"] = needed
+
+            for (row_num, reg_no, outcome) in cursor.execute(_TEST_RESULT_SQL["outcomes"]).fetchall():
+                summary["counts"][outcome] += 1
+                if outcome in ("unmatched", "invalid"):
+                    summary[outcome].append((row_num, reg_no))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.execute("IF OBJECT_ID('tempdb..#TestResults') IS NOT NULL DROP TABLE #TestResults")
+            conn.commit()
+            cursor.close()
+    return summary
+
+def print_admission_test_summary(summary):
+    counts = summary["counts"]
+    print(f"\n[INFO] Results recorded: {counts['pass']} passed, {counts['fail']} failed, "
+          f"{counts['absent']} absent.")
+    print(f"[INFO] Admission fee vouchers created: {summary['vouchers']}")
+    if counts["duplicate"]:
+        print(f"[WARNING] {counts['duplicate']} rows repeated a RegNo; the last row for each was used.")
+    for (row_num, reg_no) in summary["invalid"]:
+        print(f"[WARNING] Row {row_num}: RegNo {reg_no} has invalid marks or result. Skipped.")
+    if summary["unmatched"]:
+        print(f"[WARNING] {len(summary['unmatched'])} RegNos are not registered:")
+        for (row_num, reg_no) in summary["unmatched"]:
+            print(f"  Row {row_num}: {reg_no}")
+    if summary["warning"]:
+        print(f"[WARNING] {summary['warning']}")
 
 
 ###############################################################################
@@ -797,17 +3462,376 @@ def print_admission_fee_voucher():
     """
     Print Admission Fee Voucher for a given RegNo or a range.
     """
-    print("\n[INFO] Print Admission Fee Voucher - NOT IMPLEMENTED (Placeholder)")
+    print("\n--- Print Admission Fee Voucher ---")
+    key = input("Enter a RegNo, a range (first-last), or Enter for all unpaid ('esc' to cancel): ").strip()
+    if key.lower() == 'esc':
+        return
+    where = ["V.VoucherType = 'admission'"]
+    params = []
+    if not key:
+        where.append("V.Status = 'unpaid'")
+    elif "-" in key.strip("-"):
+        (first, last) = [part.strip() for part in key.split("-", 1)]
+        where.append("V.RegNo BETWEEN ? AND ?")
+        params += [first, last]
+    else:
+        where.append("V.RegNo = ?")
+        params.append(key)
+    print_documents("voucher", fetch_voucher_documents, where, params, combined=bool(key))
 
 def update_fee_status_bulk():
     """
     When fee is paid, student becomes eligible for admission.
+    Reconciles a bank statement CSV against the outstanding vouchers (see
+    reconcile_bank_statement); paid admission vouchers queue the student
+    for admission.
     """
-    print("\n[INFO] Update Fee Status In Bulk - NOT IMPLEMENTED (Placeholder)")
-
-def view_fee_status():
-    print("\n[INFO] View Fee Status - NOT IMPLEMENTED (Placeholder)")
-
+    print("\n--- Update Fee Status From Bank Statement ---")
+    file_path = input("Enter statement CSV path (or 'esc' to cancel): ").strip()
+    if not file_path or file_path.lower() == 'esc':
+        return
+    try:
+        summary = reconcile_bank_statement(file_path)
+    except FileNotFoundError:
+        print(f"[ERROR] File not found: {file_path}")
+        return
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        return
+    except Exception as e:
+        print(f"[ERROR] Reconciliation failed, nothing was recorded: {e}")
+        return
+    print_reconciliation_summary(summary)
+
+def view_fee_status():
+    """
+    Admission vouchers with their payment status, for one RegNo or by status.
+    """
+    print("\n--- View Fee Status ---")
+    key = input("Enter a RegNo, or (U)npaid/(P)aid/(Q)ueued for admission, Enter for all: ").strip()
+    if key.lower() == 'esc':
+        return
+    where = ["V.VoucherType = 'admission'"]
+    params = []
+    status = {"u": "unpaid", "p": "paid"}.get(key.lower()) if len(key) == 1 else None
+    if status == "unpaid":
+        where.append("V.Status IN ('unpaid', 'partial')")
+    elif status:
+        where.append("V.Status = ?")
+        params.append(status)
+    elif key.lower() == "q":
+        where.append("Q.RegNo IS NOT NULL")
+    elif key:
+        where.append("V.RegNo = ?")
+        params.append(key)
+
+    query = """
+        SELECT TOP (?) V.VoucherNo, V.RegNo, R.ChildName, V.TotalAmount, ISNULL(V.PaidAmount, 0), V.Status,
+               V.PaidOn, CASE WHEN A.GRNo IS NOT NULL THEN 'admitted (GR ' + A.GRNo + ')'
+                              WHEN Q.RegNo IS NOT NULL THEN 'queued' ELSE '-' END
+        FROM FeeVouchers V
+        JOIN StudentRegistration R ON R.RegNo = V.RegNo
+        LEFT JOIN AdmissionQueue Q ON Q.RegNo = V.RegNo
+        LEFT JOIN StudentAdmitted A ON A.RegNo = V.RegNo
+    """
+    with db_session() as conn:
+        pages = iter_keyset_pages(conn, query, "V.VoucherNo", where, params)
+        browse_pages(
+            pages,
+            lambda row: (f"Voucher: {row[0]}, RegNo: {row[1]}, Name: {row[2]}, Total: {row[3]}, Paid: {row[4]}, "
+                         f"Status: {row[5]}" + (f" on {row[6]}" if row[6] else "") + f", Admission: {row[7]}"),
+            "Admission Fee Status",
+            "No admission vouchers found.",
+        )
+
+
+###############################################################################
+# 1.3.1 Bank statement reconciliation
+###############################################################################
+#
+# The statement is read twice. The first pass only collects the transaction
+# IDs, which are looked up in FeePayments so lines recorded by an earlier run
+# are skipped however old they are. The second pass reads one line at a
+# time and matches it in memory against
+# the outstanding vouchers, which are loaded once into two dicts: by voucher
+# number, and by (RegNo, amount due) for lines that only quote the RegNo.
+# Matched payments are then written in one transaction: staged in
+# #BankPayments, inserted into FeePayments (keyed by the bank's transaction
+# ID, so a re-imported statement records nothing twice), rolled up onto the
+# vouchers with one UPDATE join, and paid admission vouchers put the student
+# in AdmissionQueue. Lines that cannot be applied go to an exceptions CSV.
+
+RECONCILE_LOOKUP_CHUNK = 500  # transaction IDs per FeePayments lookup
+
+# Accepted header names (lower case) for the columns the engine needs. All
+# other columns are searched for a voucher number or RegNo.
+BANK_STATEMENT_COLUMNS = {
+    "transaction_id": ("transaction id", "transactionid", "txn id", "tran id", "transaction ref", "reference no"),
+    "date": ("date", "transaction date", "txn date", "value date", "posting date"),
+    "amount": ("amount", "credit", "credit amount", "deposit"),
+}
+BANK_DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%d-%b-%Y", "%d %b %Y")
+
+VOUCHER_NO_PATTERN = re.compile(r"(?<!\d)(\d{11})(?!\d)")  # YYYYMM + 5 digits
+REG_NO_PATTERN = re.compile(r"(?<!\d)(\d{8})(?!\d)")       # year + 4 digits
+
+def parse_bank_date(text):
+    text = (text or "").strip()
+    for fmt in BANK_DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+def bank_statement_columns(header):
+    """
+    Positions of the transaction ID, date and amount columns in a statement
+    header, plus the positions of the remaining (free text) columns.
+    Raises ValueError naming any column it cannot find.
+    """
+    names = [cell.strip().lower() for cell in header]
+    positions = {}
+    for (field, aliases) in BANK_STATEMENT_COLUMNS.items():
+        found = [i for (i, name) in enumerate(names) if name in aliases]
+        if found:
+            positions[field] = found[0]
+    missing = [field for field in BANK_STATEMENT_COLUMNS if field not in positions]
+    if missing:
+        raise ValueError(f"Statement header has no {', '.join(missing)} column (header: {', '.join(header)}).")
+    positions["text"] = [i for i in range(len(names)) if i not in positions.values()]
+    return positions
+
+class OutstandingVouchers:
+    """
+    The unpaid and part-paid vouchers, indexed for matching statement lines.
+    Amounts still due are updated as lines are matched, so a second payment
+    for the same voucher in one statement is caught.
+    """
+    def __init__(self, rows):
+        # rows: (VoucherNo, RegNo, VoucherType, TotalAmount, PaidAmount) ordered by BillingMonth
+        self.due = {}
+        self.reg_no = {}
+        self.by_reg_amount = defaultdict(deque)
+        for (voucher_no, reg_no, _type, total, paid) in rows:
+            due = total - (paid or 0)
+            self.due[voucher_no] = due
+            self.reg_no[voucher_no] = reg_no
+            self.by_reg_amount[(reg_no, due)].append(voucher_no)
+
+    @classmethod
+    def load(cls, conn):
+        return cls(conn.execute("""
+            SELECT VoucherNo, RegNo, VoucherType, TotalAmount, PaidAmount
+            FROM FeeVouchers
+            WHERE Status IN ('unpaid', 'partial')
+            ORDER BY BillingMonth, VoucherNo
+        """).fetchall())
+
+    def match(self, amount, text):
+        """
+        (voucher_no, reason) for a payment of `amount` whose free text is
+        `text`. voucher_no is None when nothing outstanding matches; reason
+        is None for a clean match and explains anything else.
+        """
+        quoted = VOUCHER_NO_PATTERN.findall(text)
+        for voucher_no in quoted:
+            due = self.due.get(voucher_no)
+            if due is None:
+                continue
+            if due <= 0:
+                return (None, f"voucher {voucher_no} already paid in this statement (duplicate payment)")
+            self.due[voucher_no] = due - amount
+            return (voucher_no, f"overpayment of {amount - due} on voucher {voucher_no}" if amount > due else None)
+
+        for reg_no in REG_NO_PATTERN.findall(text):
+            candidates = self.by_reg_amount.get((reg_no, amount))
+            while candidates:
+                voucher_no = candidates.popleft()
+                if self.due[voucher_no] == amount:
+                    self.due[voucher_no] = Decimal("0.00")
+                    return (voucher_no, None)
+
+        if quoted:
+            return (None, f"voucher {quoted[0]} is not outstanding (already paid, cancelled or unknown)")
+        return (None, "no outstanding voucher matches the voucher number or RegNo and amount")
+
+def _statement_transaction_ids(file_path):
+    with open(file_path, mode='r', newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            raise ValueError("The statement is empty.")
+        position = bank_statement_columns(header)["transaction_id"]
+        return {row[position].strip() for row in reader
+                if len(row) > position and 0 < len(row[position].strip()) <= 50}
+
+def _recorded_transaction_ids(conn, transaction_ids, chunk_size=RECONCILE_LOOKUP_CHUNK):
+    """
+    The subset of `transaction_ids` already in FeePayments, looked up by
+    key one chunk at a time.
+    """
+    pending = sorted(transaction_ids)
+    recorded = set()
+    for start in range(0, len(pending), chunk_size):
+        chunk = pending[start:start + chunk_size]
+        recorded.update(row[0] for row in conn.execute(
+            f"SELECT TransactionID FROM FeePayments WHERE TransactionID IN ({', '.join('?' for _ in chunk)})",
+            *chunk).fetchall())
+    return recorded
+
+_RECONCILE_SQL = {
+    "create": """
+        CREATE TABLE #BankPayments (
+          TransactionID         VARCHAR(50) NOT NULL PRIMARY KEY,
+          VoucherNo             VARCHAR(20) NOT NULL,
+          RegNo                 VARCHAR(20) NOT NULL,
+          Amount                DECIMAL(12,2) NOT NULL,
+          PaymentDate           DATE NOT NULL
+        )
+    """,
+    "record": """
+        INSERT INTO FeePayments (TransactionID, VoucherNo, RegNo, Amount, PaymentDate)
+        SELECT B.TransactionID, B.VoucherNo, B.RegNo, B.Amount, B.PaymentDate
+        FROM #BankPayments B
+        WHERE NOT EXISTS (SELECT 1 FROM FeePayments P WHERE P.TransactionID = B.TransactionID)
+    """,
+    # Totals are recomputed from FeePayments, so applying a payment twice cannot double count
+    "vouchers": """
+        UPDATE V SET PaidAmount = P.Paid, PaidOn = P.LastPaid,
+                     Status = CASE WHEN P.Paid >= V.TotalAmount THEN 'paid' ELSE 'partial' END
+        FROM FeeVouchers V
+        JOIN (SELECT VoucherNo, SUM(Amount) AS Paid, MAX(PaymentDate) AS LastPaid
+              FROM FeePayments
+              WHERE VoucherNo IN (SELECT VoucherNo FROM #BankPayments)
+              GROUP BY VoucherNo) P ON P.VoucherNo = V.VoucherNo
+        WHERE V.Status <> 'cancelled'
+    """,
+    "queue": """
+        INSERT INTO AdmissionQueue (RegNo, VoucherNo, PaidOn)
+        SELECT V.RegNo, V.VoucherNo, V.PaidOn
+        FROM FeeVouchers V
+        WHERE V.VoucherNo IN (SELECT VoucherNo FROM #BankPayments)
+          AND V.VoucherType = 'admission' AND V.Status = 'paid'
+          AND NOT EXISTS (SELECT 1 FROM AdmissionQueue Q WHERE Q.RegNo = V.RegNo)
+          AND NOT EXISTS (SELECT 1 FROM StudentAdmitted A WHERE A.RegNo = V.RegNo)
+    """,
+}
+
+def reconcile_bank_statement(file_path, exceptions_path=None):
+    """
+    Applies the credits in a bank statement CSV to the outstanding fee
+    vouchers. Safe to run again on the same (or an overlapping) statement.
+    Lines that were not applied, or were applied with a remark (e.g. an
+    overpayment), are written to `exceptions_path` (default:
+    <statement>_exceptions.csv) with the reason.
+    Returns a summary dict: lines, credits, matched, recorded (new payments),
+    already_recorded, vouchers_paid, queued, exceptions, exceptions_path and
+    seconds.
+    """
+    initialize_database()  # FeePayments and AdmissionQueue come from migration 11
+    started = time.perf_counter()
+    exceptions_path = exceptions_path or f"{os.path.splitext(file_path)[0]}_exceptions.csv"
+    summary = {"lines": 0, "credits": 0, "matched": 0, "recorded": 0, "already_recorded": 0,
+               "vouchers_paid": 0, "queued": 0, "exceptions": 0, "exceptions_path": exceptions_path}
+
+    with db_session() as conn:
+        outstanding = OutstandingVouchers.load(conn)
+        recorded = _recorded_transaction_ids(conn, _statement_transaction_ids(file_path))
+
+        payments = []
+        seen = set()
+        with open(file_path, mode='r', newline='', encoding='utf-8-sig') as f, \
+                open(exceptions_path, mode='w', newline='', encoding='utf-8') as out:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                raise ValueError("The statement is empty.")
+            columns = bank_statement_columns(header)
+            exceptions = csv.writer(out)
+            exceptions.writerow(["Row", "Reason"] + header)
+
+            def exception(row_num, row, reason):
+                exceptions.writerow([row_num, reason] + row)
+                summary["exceptions"] += 1
+
+            for (row_num, row) in enumerate(reader, start=2):
+                if not any(cell.strip() for cell in row):
+                    continue
+                summary["lines"] += 1
+                row += [""] * (len(header) - len(row))
+                amount_text = row[columns["amount"]].strip()
+                if amount_text.startswith("-") or (amount_text.startswith("(") and amount_text.endswith(")")):
+                    continue  # debit
+                amount = parse_amount(amount_text, blank=Decimal("0.00"))
+                if amount is None:
+                    exception(row_num, row, "invalid amount")
+                    continue
+                if amount == 0:
+                    continue  # blank or zero line
+                summary["credits"] += 1
+
+                txn_id = row[columns["transaction_id"]].strip()
+                if not txn_id or len(txn_id) > 50:
+                    exception(row_num, row, "missing or invalid transaction ID")
+                    continue
+                if txn_id in seen:
+                    exception(row_num, row, "transaction ID repeated in the statement")
+                    continue
+                seen.add(txn_id)
+                if txn_id in recorded:
+                    summary["already_recorded"] += 1
+                    continue
+                payment_date = parse_bank_date(row[columns["date"]])
+                if payment_date is None:
+                    exception(row_num, row, "invalid date")
+                    continue
+
+                voucher_no, reason = outstanding.match(amount, " ".join(row[i] for i in columns["text"]))
+                if reason:
+                    exception(row_num, row, reason)
+                if voucher_no:
+                    payments.append((row_num, (txn_id, voucher_no, outstanding.reg_no[voucher_no],
+                                               amount, payment_date)))
+        summary["matched"] = len(payments)
+
+        cursor = conn.cursor()
+        try:
+            cursor.execute(_RECONCILE_SQL["create"])
+            _done, failed = bulk_insert(cursor, "#BankPayments",
+                                        ("TransactionID", "VoucherNo", "RegNo", "Amount", "PaymentDate"), payments)
+            if failed:
+                raise ValueError(f"Could not stage statement row {failed[0][0]}: {failed[0][1]}")
+            summary["recorded"] = cursor.execute(_RECONCILE_SQL["record"]).rowcount
+            summary["already_recorded"] += len(payments) - summary["recorded"]
+            cursor.execute(_RECONCILE_SQL["vouchers"])
+            summary["vouchers_paid"] = cursor.execute("""
+                SELECT COUNT(*) FROM FeeVouchers
+                WHERE Status = 'paid' AND VoucherNo IN (SELECT VoucherNo FROM #BankPayments)
+            """).fetchone()[0]
+            summary["queued"] = cursor.execute(_RECONCILE_SQL["queue"]).rowcount
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.execute("IF OBJECT_ID('tempdb..#BankPayments') IS NOT NULL DROP TABLE #BankPayments")
+            conn.commit()
+            cursor.close()
+
+    summary["seconds"] = time.perf_counter() - started
+    return summary
+
+def print_reconciliation_summary(summary):
+    print(f"\n[INFO] {summary['lines']:,} statement lines read, {summary['credits']:,} credits, "
+          f"{summary['matched']:,} matched to vouchers in {summary['seconds']:.2f}s.")
+    print(f"[INFO] {summary['recorded']:,} payments recorded, {summary['vouchers_paid']:,} vouchers now fully paid.")
+    if summary['already_recorded']:
+        print(f"[INFO] {summary['already_recorded']:,} transactions were already recorded and were skipped.")
+    print(f"[INFO] {summary['queued']:,} students queued for admission.")
+    if summary['exceptions']:
+        print(f"[WARNING] {summary['exceptions']:,} lines need attention; see {summary['exceptions_path']}")
+
 
 ###############################################################################
 # 1.4 Student Admission
@@ -817,16 +3841,19 @@ def student_admission_menu():
     while True:
         print("\n--- Student Admission ---")
         print("1. Admit Student (Manually)")
-        print("2. View Admitted Students (Should Give Option To View Admissions Per Year As Well)")
-        print("3. Back To Student Management")
+        print("2. Admit All Fee-Paid Students")
+        print("3. View Admitted Students (Should Give Option To View Admissions Per Year As Well)")
+        print("4. Back To Student Management")
 
         choice = input("Enter your choice: ").strip()
 
         if choice == "1":
             admit_student_manually()
         elif choice == "2":
-            view_admitted_students()
+            admit_paid_students()
         elif choice == "3":
+            view_admitted_students()
+        elif choice == "4":
             return
         elif choice.lower() == 'esc':
             return
@@ -837,10 +3864,205 @@ def admit_student_manually():
     """
     After the admission fee is paid, generate GR No and move from registration to admitted table.
     """
-    print("\n[INFO] Admit Student (Manual) - NOT IMPLEMENTED (Placeholder)")
+    print("\n--- Admit Student ---")
+    reg_no = input("Enter RegNo ('esc' to cancel): ").strip()
+    if not reg_no or reg_no.lower() == 'esc':
+        return
+    with db_session() as conn:
+        row = conn.execute("""
+            SELECT R.ChildName, R.ClassAppliedFor, A.GRNo,
+                   CASE WHEN EXISTS (SELECT 1 FROM AdmissionQueue Q WHERE Q.RegNo = R.RegNo)
+                          OR EXISTS (SELECT 1 FROM FeeVouchers V WHERE V.RegNo = R.RegNo
+                                     AND V.VoucherType = 'admission' AND V.Status = 'paid')
+                        THEN 1 ELSE 0 END
+            FROM StudentRegistration R
+            LEFT JOIN StudentAdmitted A ON A.RegNo = R.RegNo
+            WHERE R.RegNo = ?
+        """, reg_no).fetchone()
+    if row is None:
+        print(f"[ERROR] RegNo {reg_no} is not registered.")
+        return
+    (name, class_name, gr_no, paid) = row
+    if gr_no:
+        print(f"[INFO] {name} is already admitted with GR No {gr_no}.")
+        return
+    print(f"Student: {name}, Class Applied For: {class_name}")
+    if not paid:
+        confirm = input("[WARNING] The admission fee is not recorded as paid. Admit anyway? (y/N): ")
+        if confirm.strip().lower() != 'y':
+            return
+    academic_year = prompt_academic_year()
+    if academic_year is None:
+        return
+    try:
+        summary = admit_registrations(academic_year, [reg_no])
+    except Exception as e:
+        print(f"[ERROR] Could not admit the student: {e}")
+        return
+    print_admission_summary(summary)
+
+def admit_paid_students():
+    """
+    Admits everyone in the admission queue (admission fee paid) at once.
+    """
+    print("\n--- Admit All Fee-Paid Students ---")
+    with db_session() as conn:
+        waiting = conn.execute("""
+            SELECT COUNT(*) FROM AdmissionQueue Q
+            WHERE NOT EXISTS (SELECT 1 FROM StudentAdmitted A WHERE A.RegNo = Q.RegNo)
+        """).fetchone()[0]
+    if not waiting:
+        print("[INFO] No fee-paid students are waiting for admission.")
+        return
+    academic_year = prompt_academic_year()
+    if academic_year is None:
+        return
+    if input(f"Admit {waiting} students for {academic_year}? (y/N): ").strip().lower() != 'y':
+        return
+    try:
+        summary = admit_registrations(academic_year)
+    except Exception as e:
+        print(f"[ERROR] Admission failed, nobody was admitted: {e}")
+        return
+    print_admission_summary(summary)
+
+def _browse_admitted_students(title, where, params):
+    """
+    Pages through admitted students (keyset on GRNo) with the given filters.
+    Shared by the admitted/active/inactive student views.
+    """
+    query = """
+        SELECT TOP (?) A.GRNo, A.RegNo, R.ChildName, R.FatherName, A.ClassName, A.Section,
+               A.AcademicYear, R.IsActive
+        FROM StudentAdmitted A
+        JOIN StudentRegistration R ON R.RegNo = A.RegNo
+    """
+    with db_session() as conn:
+        pages = iter_keyset_pages(conn, query, "A.GRNo", where, params)
+        browse_pages(
+            pages,
+            lambda row: (f"GRNo: {row[0]}, RegNo: {row[1]}, Name: {row[2]}, Father: {row[3]}, "
+                         f"Class: {row[4] or '-'}, Section: {row[5] or '-'}, Year: {row[6]}, "
+                         f"Active: {'Yes' if row[7] else 'No'}"),
+            title,
+            f"No {title.lower()} found.",
+        )
 
 def view_admitted_students():
-    print("\n[INFO] View Admitted Students - NOT IMPLEMENTED (Placeholder)")
+    """
+    Admitted students, optionally for one admission year and/or status.
+    """
+    print("\n--- View Admitted Students ---")
+    filters = prompt_listing_filters(active_column="R.IsActive", year_column="A.AcademicYear")
+    if filters is None:
+        return
+    where, params = filters
+    _browse_admitted_students("Admitted Students", where, params)
+
+
+
+###############################################################################
+# 1.4.1 Bulk admission
+###############################################################################
+#
+# Admission is one transaction however many students it covers: the
+# registrations to admit are collected in #Admit, a contiguous block of GR
+# numbers is reserved from SequenceCounters in the same transaction, and one
+# INSERT ... SELECT numbers the students into that block by RegNo (so the
+# same intake always gets the same GR order). The admission vouchers get
+# their GR No and the students leave AdmissionQueue in the same commit.
+
+_ADMISSION_SQL = {
+    "create": "CREATE TABLE #Admit (RegNo VARCHAR(20) NOT NULL PRIMARY KEY)",
+    "from_queue": """
+        INSERT INTO #Admit (RegNo)
+        SELECT Q.RegNo FROM AdmissionQueue Q
+        JOIN StudentRegistration R ON R.RegNo = Q.RegNo
+        WHERE NOT EXISTS (SELECT 1 FROM StudentAdmitted A WHERE A.RegNo = Q.RegNo)
+    """,
+    # Requested RegNos that are unknown or already admitted
+    "not_admissible": """
+        DELETE X
+        OUTPUT deleted.RegNo, A.GRNo
+        FROM #Admit X
+        LEFT JOIN StudentAdmitted A ON A.RegNo = X.RegNo
+        WHERE A.RegNo IS NOT NULL
+           OR NOT EXISTS (SELECT 1 FROM StudentRegistration R WHERE R.RegNo = X.RegNo)
+    """,
+    "admit": """
+        INSERT INTO StudentAdmitted (GRNo, RegNo, AcademicYear, ClassName, Section, AdmissionDate)
+        OUTPUT inserted.GRNo, inserted.RegNo, inserted.ClassName
+        SELECT FORMAT(? + ROW_NUMBER() OVER (ORDER BY R.RegNo) - 1, '0000'),
+               R.RegNo, ?, R.ClassAppliedFor, NULL, ?
+        FROM #Admit X
+        JOIN StudentRegistration R ON R.RegNo = X.RegNo
+    """,
+    "vouchers": """
+        UPDATE V SET GRNo = A.GRNo
+        FROM FeeVouchers V
+        JOIN #Admit X ON X.RegNo = V.RegNo
+        JOIN StudentAdmitted A ON A.RegNo = V.RegNo
+        WHERE V.GRNo IS NULL
+    """,
+    "dequeue": "DELETE Q FROM AdmissionQueue Q JOIN #Admit X ON X.RegNo = Q.RegNo",
+}
+
+def admit_registrations(academic_year, reg_nos=None, admission_date=None):
+    """
+    Admits the registrations `reg_nos` (default: everyone waiting in
+    AdmissionQueue) into StudentAdmitted for `academic_year`, in one
+    transaction. Returns a summary dict: admitted ([(GRNo, RegNo, class)] in
+    GR order), skipped ([(RegNo, reason)]) and seconds.
+    """
+    started = time.perf_counter()
+    admission_date = admission_date or date.today()
+    summary = {"admitted": [], "skipped": [], "seconds": 0.0}
+
+    with db_session() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(_ADMISSION_SQL["create"])
+            if reg_nos is None:
+                cursor.execute(_ADMISSION_SQL["from_queue"])
+            else:
+                requested = list(dict.fromkeys(reg_no.strip() for reg_no in reg_nos if reg_no.strip()))
+                _done, failed = bulk_insert(cursor, "#Admit", ("RegNo",),
+                                            [(reg_no, (reg_no,)) for reg_no in requested])
+                summary["skipped"].extend(failed)
+                for (reg_no, gr_no) in cursor.execute(_ADMISSION_SQL["not_admissible"]).fetchall():
+                    summary["skipped"].append(
+                        (reg_no, f"already admitted (GR No {gr_no})" if gr_no else "not registered"))
+
+            count = cursor.execute("SELECT COUNT(*) FROM #Admit").fetchone()[0]
+            if count:
+                first = reserve_sequence_block(cursor, "GRNo", count, _gr_seed)
+                admitted = cursor.execute(_ADMISSION_SQL["admit"], first, academic_year, admission_date).fetchall()
+                summary["admitted"] = sorted((tuple(row) for row in admitted), key=lambda row: int(row[0]))
+                cursor.execute(_ADMISSION_SQL["vouchers"])
+                cursor.execute(_ADMISSION_SQL["dequeue"])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.execute("IF OBJECT_ID('tempdb..#Admit') IS NOT NULL DROP TABLE #Admit")
+            conn.commit()
+            cursor.close()
+
+    summary["seconds"] = time.perf_counter() - started
+    return summary
+
+def print_admission_summary(summary):
+    admitted = summary["admitted"]
+    for (gr_no, reg_no, class_name) in admitted[:LIST_PAGE_SIZE]:
+        print(f"GR No: {gr_no}, RegNo: {reg_no}, Class: {class_name}")
+    if len(admitted) > LIST_PAGE_SIZE:
+        print(f"... and {len(admitted) - LIST_PAGE_SIZE} more.")
+    if admitted:
+        print(f"\n[INFO] {len(admitted)} students admitted (GR No {admitted[0][0]} to {admitted[-1][0]}) "
+              f"in {summary['seconds']:.2f}s.")
+    for (reg_no, reason) in summary["skipped"]:
+        print(f"[WARNING] RegNo {reg_no} skipped: {reason}")
 
 
 ###############################################################################
@@ -852,7 +4074,8 @@ def assigning_classes_menu():
         print("\n--- Assigning Section For Class ---")
         print("1. Assign Section Manually")
         print("2. Assign Section In Bulk (CSV)")
-        print("3. Back To Student Management")
+        print("3. Auto-Assign Sections (Balanced)")
+        print("4. Back To Student Management")
 
         choice = input("Enter your choice: ").strip()
 
@@ -861,6 +4084,8 @@ def assigning_classes_menu():
         elif choice == "2":
             assign_section_bulk()
         elif choice == "3":
+            assign_sections_auto()
+        elif choice == "4":
             return
         elif choice.lower() == 'esc':
             return
@@ -868,10 +4093,396 @@ def assigning_classes_menu():
             print("Invalid choice. Please try again.")
 
 def assign_section_manually():
-    print("\n[INFO] Assign Section Manually - NOT IMPLEMENTED (Placeholder)")
+    print("\n--- Assign Section Manually ---")
+    gr_no = input("Enter GR No ('esc' to cancel): ").strip()
+    if not gr_no or gr_no.lower() == 'esc':
+        return
+    with db_session() as conn:
+        row = conn.execute("""
+            SELECT R.ChildName, A.ClassName, A.Section
+            FROM StudentAdmitted A
+            JOIN StudentRegistration R ON R.RegNo = A.RegNo
+            WHERE A.GRNo = ?
+        """, gr_no).fetchone()
+    if row is None:
+        print(f"[ERROR] No admitted student with GR No {gr_no}.")
+        return
+    print(f"Student: {row[0]}, Class: {row[1]}, Section: {row[2] or '-'}")
+    section = input("Enter Section (e.g., 'A'): ").strip().upper()
+    if not section or section == 'ESC':
+        return
+    try:
+        summary = apply_section_assignments([(1, gr_no, section)])
+    except Exception as e:
+        print(f"[ERROR] Could not assign the section: {e}")
+        return
+    if summary["updated"]:
+        print(f"[INFO] {row[0]} (GR No {gr_no}) assigned to {row[1]} section {section}.")
+    for (_tag, error) in summary["failed"]:
+        print(f"[ERROR] Could not assign the section: {error}")
 
 def assign_section_bulk():
-    print("\n[INFO] Assign Section In Bulk (CSV) - NOT IMPLEMENTED (Placeholder)")
+    """
+    Sections from a CSV with GRNo and Section columns (found by header, else
+    the first two columns of a file without a header row). A plan exported
+    by Auto-Assign can be edited and loaded back here.
+    """
+    print("\n--- Assign Section In Bulk (CSV) ---")
+    file_path = input("Enter CSV path (or 'esc' to cancel): ").strip()
+    if file_path.lower() == 'esc':
+        return
+    try:
+        with open(file_path, mode='r', newline='', encoding='utf-8-sig') as f:
+            reader = csv.reader(f)
+            first = next(reader, [])
+            header = [cell.strip().lower() for cell in first]
+            gr_col = next((i for (i, name) in enumerate(header) if name in ("grno", "gr no", "gr_no")), None)
+            section_col = next((i for (i, name) in enumerate(header) if name == "section"), None)
+            # Without a recognised header name the first row is data, not a header
+            lines = enumerate(reader, start=2)
+            if gr_col is None and section_col is None:
+                lines = chain([(1, first)], lines)
+            gr_col = 0 if gr_col is None else gr_col
+            section_col = 1 if section_col is None else section_col
+            rows = [(row_num, row[gr_col].strip(), row[section_col].strip().upper())
+                    for (row_num, row) in lines
+                    if len(row) > max(gr_col, section_col) and row[gr_col].strip()]
+    except FileNotFoundError:
+        print(f"[ERROR] File not found: {file_path}")
+        return
+    except Exception as e:
+        print(f"[ERROR] An error occurred while reading the CSV: {e}")
+        return
+    try:
+        summary = apply_section_assignments(rows)
+    except Exception as e:
+        print(f"[ERROR] No sections were assigned: {e}")
+        return
+    print_section_assignment_summary(summary)
+
+def assign_sections_auto():
+    """
+    Splits the students of one class (or every class) of an academic year
+    into balanced sections; see plan_sections.
+    """
+    print("\n--- Auto-Assign Sections ---")
+    academic_year = prompt_academic_year()
+    if academic_year is None:
+        return
+    class_name = input("Class (Enter for every class): ").strip()
+    if class_name.lower() == 'esc':
+        return
+    capacity = input(f"Section capacity (Enter for {SECTION_CAPACITY}): ").strip()
+    if capacity and not (capacity.isdigit() and int(capacity) >= 1):
+        print("[ERROR] Capacity must be a whole number of at least 1.")
+        return
+    capacity = int(capacity or SECTION_CAPACITY)
+    siblings = "together" if input("Siblings in the same class: keep (A)part or (T)ogether? [A]: "
+                                   ).strip().lower().startswith("t") else "apart"
+    reassign = input("Re-plan students who already have a section? (y/N): ").strip().lower() == 'y'
+
+    try:
+        plans = plan_class_sections(academic_year, class_name or None, capacity, siblings, reassign)
+    except Exception as e:
+        print(f"[ERROR] Could not plan the sections: {e}")
+        return
+    if not plans:
+        print("[INFO] No active admitted students found.")
+        return
+    changes = []
+    for (cls, (assignment, report)) in plans.items():
+        print_section_report(cls, report)
+        changes.extend((gr_no, cls, section) for (gr_no, section) in sorted(assignment.items()))
+    if not changes:
+        print("[INFO] Every student already has a section.")
+        return
+
+    action = input(f"\n{len(changes)} students to place. (A)pply, (E)xport to CSV for editing, or (C)ancel: "
+                   ).strip().lower()
+    if action.startswith("a"):
+        try:
+            summary = apply_section_assignments([(gr_no, gr_no, section) for (gr_no, _cls, section) in changes])
+        except Exception as e:
+            print(f"[ERROR] No sections were assigned: {e}")
+            return
+        print_section_assignment_summary(summary)
+    elif action.startswith("e"):
+        path = input("CSV path to write: ").strip()
+        if not path:
+            return
+        with open(path, mode='w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(["GRNo", "ClassName", "Section"])
+            writer.writerows(changes)
+        print(f"[INFO] Plan written to {path}. Edit it and load it with 'Assign Section In Bulk (CSV)'.")
+
+
+###############################################################################
+# 1.5.1 Section balancing
+###############################################################################
+#
+# A class is split greedily, one student (or, with siblings kept together,
+# one family) at a time, into the section where it costs least. The cost of
+# a section is how full it would be relative to its fair share on each
+# count: students, students of this gender, and students from this prior
+# school, so sizes, gender ratios and cohorts all even out together. A
+# sibling already in the section adds SIBLING_WEIGHT (or takes it off when
+# siblings are kept together) and going over capacity adds OVER_CAPACITY_WEIGHT
+# per student. Big families and big cohorts are placed first, while every
+# section still has room. That is O(students x sections) per class.
+
+SECTION_CAPACITY = 35
+SECTION_NAMES = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+SIBLING_WEIGHT = 10
+SIBLING_POLICIES = ("apart", "together")
+OVER_CAPACITY_WEIGHT = 1000
+
+def section_names(count, existing=()):
+    """
+    `count` section names: the sections already in use first, then the
+    next unused letters.
+    """
+    names = sorted(set(existing))
+    candidates = chain(SECTION_NAMES, (a + b for a in SECTION_NAMES for b in SECTION_NAMES))  # ..., Z, AA, AB, ...
+    for name in candidates:
+        if len(names) >= count:
+            break
+        if name not in names:
+            names.append(name)
+    return names or [SECTION_NAMES[0]]
+
+def plan_sections(students, sections, capacity=SECTION_CAPACITY, siblings="apart", families=None):
+    """
+    students: [(GRNo, RegNo, Gender, PreviousSchool, Section)] of one class.
+    Students whose Section is one of `sections` stay where they are (and
+    count towards the balance); the others are placed.
+    families: a FamilyIndex (default: the loaded one) to find siblings.
+    Returns ({GRNo: section} for the placed students, report) where report
+    has per-section size / genders / largest cohort, plus sibling_clashes
+    (siblings sharing a section when kept apart, or families split when kept
+    together), over_capacity and seconds.
+    """
+    started = time.perf_counter()
+    families = families or get_family_index()
+    sections = list(sections)
+    size = Counter()
+    genders = defaultdict(Counter)
+    schools = defaultdict(Counter)
+    kin = defaultdict(Counter)  # section -> family -> students
+
+    family_of = {}
+    for (number, members) in enumerate(families.group_families([s[1] for s in students])):
+        for reg_no in members:
+            family_of[reg_no] = number
+    info = {}
+    for (gr_no, reg_no, gender, school, section) in students:
+        info[gr_no] = ((gender or "").strip()[:1].upper() or "?", " ".join((school or "").lower().split()) or None,
+                       family_of[reg_no])
+
+    def place(gr_no, section):
+        gender, school, family = info[gr_no]
+        size[section] += 1
+        genders[section][gender] += 1
+        if school:
+            schools[section][school] += 1
+        kin[section][family] += 1
+
+    pending = []
+    for student in students:
+        if student[4] in sections:
+            place(student[0], student[4])
+        else:
+            pending.append(student[0])
+
+    # Fair shares per section (never below one, so small groups still spread)
+    count = len(sections)
+    gender_share = {g: max(n / count, 1) for (g, n) in Counter(info[s][0] for s in info).items()}
+    school_share = {c: max(n / count, 1) for (c, n) in Counter(info[s][1] for s in info if info[s][1]).items()}
+    size_share = max(len(info) / count, 1)
+    direction = -1 if siblings == "together" else 1
+
+    if siblings == "together":
+        units = defaultdict(list)
+        for gr_no in pending:
+            units[info[gr_no][2]].append(gr_no)
+        units = list(units.values())
+    else:
+        units = [[gr_no] for gr_no in pending]
+    cohort_size = Counter(info[s][1] for s in info if info[s][1])
+    units.sort(key=lambda unit: (-len(unit), -max(cohort_size.get(info[g][1], 0) for g in unit), unit[0]))
+
+    def cost(section, unit):
+        n = len(unit)
+        total = (size[section] + n) / size_share
+        total += OVER_CAPACITY_WEIGHT * max(0, size[section] + n - capacity)
+        for gr_no in unit:
+            gender, school, family = info[gr_no]
+            total += (genders[section][gender] + 1) / gender_share[gender]
+            if school:
+                total += (schools[section][school] + 1) / school_share[school]
+            total += direction * SIBLING_WEIGHT * kin[section][family]
+        return total
+
+    assignment = {}
+    for unit in units:
+        best = min(sections, key=lambda section: cost(section, unit))
+        for gr_no in unit:
+            place(gr_no, best)
+            assignment[gr_no] = best
+
+    if siblings == "together":
+        clashes = sum(1 for family in set(f for (_g, _s, f) in info.values())
+                      if sum(1 for section in sections if kin[section][family]) > 1)
+    else:
+        clashes = sum(n - 1 for section in sections for n in kin[section].values() if n > 1)
+    report = {
+        "sections": {section: {"size": size[section], "genders": dict(genders[section]),
+                               "largest_cohort": max(schools[section].values(), default=0)}
+                     for section in sections},
+        "sibling_clashes": clashes,
+        "siblings": siblings,
+        "over_capacity": sum(max(0, size[section] - capacity) for section in sections),
+        "placed": len(assignment),
+        "seconds": time.perf_counter() - started,
+    }
+    return assignment, report
+
+_SECTION_ROSTER_SQL = """
+    SELECT A.ClassName, A.GRNo, A.RegNo, R.Gender, R.PreviousSchoolAttended, A.Section
+    FROM StudentAdmitted A
+    JOIN StudentRegistration R ON R.RegNo = A.RegNo
+    WHERE A.AcademicYear = ? AND R.IsActive = 1
+"""
+
+def plan_class_sections(academic_year, class_name=None, capacity=SECTION_CAPACITY, siblings="apart",
+                        reassign=False):
+    """
+    Plans the sections of one class (or every class) of `academic_year`
+    from a single roster query. Each class gets enough sections for
+    `capacity`, reusing the section names it already has. With reassign,
+    existing sections are ignored and everyone is placed again.
+    Returns {class name: (assignment, report)} (see plan_sections).
+    Raises ValueError if capacity is below 1.
+    """
+    if capacity < 1:
+        raise ValueError(f"Section capacity must be at least 1, not {capacity}.")
+    sql = _SECTION_ROSTER_SQL
+    params = [academic_year]
+    if class_name:
+        sql += " AND A.ClassName = ?"
+        params.append(class_name)
+    with db_session() as conn:
+        roster = conn.execute(sql + " ORDER BY A.ClassName, A.GRNo", *params).fetchall()
+
+    by_class = defaultdict(list)
+    names = {}
+    for (cls, gr_no, reg_no, gender, school, section) in roster:
+        key = class_key(cls)
+        names.setdefault(key, cls)
+        by_class[key].append((gr_no, reg_no, gender, school, None if reassign else (section or None)))
+
+    families = get_family_index()
+    plans = {}
+    for (key, students) in sorted(by_class.items()):
+        existing = [s[4] for s in students if s[4]]
+        count = max(-(-len(students) // capacity), len(set(existing)))
+        sections = section_names(count, existing)
+        plans[names[key]] = plan_sections(students, sections, capacity, siblings, families)
+    return plans
+
+def print_section_report(class_name, report):
+    print(f"\n{class_name}: {report['placed']} students placed in {report['seconds'] * 1000:.1f} ms")
+    for (section, stats) in report["sections"].items():
+        genders = ", ".join(f"{g}: {n}" for (g, n) in sorted(stats["genders"].items()))
+        print(f"  Section {section}: {stats['size']} students ({genders}), "
+              f"largest prior-school group {stats['largest_cohort']}")
+    if report["sibling_clashes"]:
+        what = "families split" if report["siblings"] == "together" else "siblings sharing a section"
+        print(f"  [WARNING] {report['sibling_clashes']} {what}.")
+    if report["over_capacity"]:
+        print(f"  [WARNING] {report['over_capacity']} students over capacity.")
+
+_SECTION_UPDATE_SQL = {
+    "create": "CREATE TABLE #SectionPlan (GRNo VARCHAR(10) NOT NULL PRIMARY KEY, Section VARCHAR(10) NOT NULL)",
+    "update": """
+        UPDATE A SET Section = P.Section
+        FROM StudentAdmitted A
+        JOIN #SectionPlan P ON P.GRNo = A.GRNo
+    """,
+    "unmatched": """
+        SELECT P.GRNo FROM #SectionPlan P
+        WHERE NOT EXISTS (SELECT 1 FROM StudentAdmitted A WHERE A.GRNo = P.GRNo)
+    """,
+}
+
+def apply_section_assignments(rows):
+    """
+    rows: [(tag, GRNo, Section)]. Stages them in #SectionPlan and sets every
+    section with one UPDATE join, in one transaction. A GRNo given twice
+    keeps its last section. Returns a summary dict: updated, unmatched
+    ([(tag, GRNo)]), failed ([(tag, error)]).
+    """
+    summary = {"updated": 0, "unmatched": [], "failed": []}
+    latest = {}
+    for (tag, gr_no, section) in rows:
+        if not section or len(section) > 10:
+            summary["failed"].append((tag, f"invalid section '{section}' for GR No {gr_no}"))
+            continue
+        latest[gr_no] = (tag, (gr_no, section))
+    if not latest:
+        return summary
+    tags = {gr_no: tag for (gr_no, (tag, _params)) in latest.items()}
+
+    with db_session() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(_SECTION_UPDATE_SQL["create"])
+            _done, failed = bulk_insert(cursor, "#SectionPlan", ("GRNo", "Section"), list(latest.values()))
+            summary["failed"].extend(failed)
+            summary["updated"] = cursor.execute(_SECTION_UPDATE_SQL["update"]).rowcount
+            summary["unmatched"] = [(tags[row[0]], row[0])
+                                    for row in cursor.execute(_SECTION_UPDATE_SQL["unmatched"]).fetchall()]
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.execute("IF OBJECT_ID('tempdb..#SectionPlan') IS NOT NULL DROP TABLE #SectionPlan")
+            conn.commit()
+            cursor.close()
+    return summary
+
+def print_section_assignment_summary(summary):
+    print(f"\n[INFO] Sections updated for {summary['updated']} students.")
+    for (tag, gr_no) in summary["unmatched"]:
+        print(f"[WARNING] Row {tag}: no admitted student with GR No {gr_no}.")
+    for (tag, error) in summary["failed"]:
+        print(f"[ERROR] Row {tag}: {error}")
+
+def benchmark_section_planner(students=1500, capacity=SECTION_CAPACITY, seed=3):
+    """
+    Plans one synthetic class of `students` (about a third with a sibling
+    in the class, 40 feeder schools) and prints the time and the balance.
+    """
+    import random
+    rng = random.Random(seed)
+    families = FamilyIndex()
+    roster = []
+    for i in range(students):
+        family = rng.randrange(int(students * 0.8))
+        reg_no = f"B{i:07d}"
+        families.add(reg_no, f"{family:013d}", None)
+        school = f"School {rng.randrange(40)}" if rng.random() < 0.7 else ""
+        roster.append((f"{i:05d}", reg_no, rng.choice("MF"), school, None))
+    sections = section_names(-(-students // capacity))
+    for siblings in SIBLING_POLICIES:
+        _assignment, report = plan_sections(roster, sections, capacity, siblings, families)
+        sizes = [stats["size"] for stats in report["sections"].values()]
+        boys = [stats["genders"].get("M", 0) for stats in report["sections"].values()]
+        print(f"Siblings {siblings}: {students:,} students into {len(sections)} sections in "
+              f"{report['seconds'] * 1000:.1f} ms; sizes {min(sizes)}-{max(sizes)}, boys {min(boys)}-{max(boys)}, "
+              f"largest cohort {max(s['largest_cohort'] for s in report['sections'].values())}, "
+              f"sibling clashes {report['sibling_clashes']}")
 
 
 ###############################################################################
@@ -908,19 +4519,192 @@ def status_of_students_menu():
             print("Invalid choice. Please try again.")
 
 def manage_active_inactive_single():
-    print("\n[INFO] Manage Active/Inactive (Single) - NOT IMPLEMENTED (Placeholder)")
+    print("\n--- Manage Active/Inactive ---")
+    student_id = input("Enter RegNo or GR No ('esc' to cancel): ").strip()
+    if not student_id or student_id.lower() == 'esc':
+        return
+    with db_session() as conn:
+        row = conn.execute("""
+            SELECT TOP 1 R.RegNo, A.GRNo, R.ChildName, R.IsActive,
+                   (SELECT TOP 1 CONCAT(H.Reason, ' (', CONVERT(VARCHAR(10), H.ChangedAt, 120), ')')
+                    FROM StudentStatusHistory H WHERE H.RegNo = R.RegNo ORDER BY H.ChangedAt DESC)
+            FROM StudentRegistration R
+            LEFT JOIN StudentAdmitted A ON A.RegNo = R.RegNo
+            WHERE R.RegNo = ? OR A.GRNo = ?
+            ORDER BY CASE WHEN R.RegNo = ? THEN 0 ELSE 1 END
+        """, student_id, student_id, student_id).fetchone()
+    if row is None:
+        print(f"[ERROR] No student with RegNo or GR No {student_id}.")
+        return
+    (reg_no, gr_no, name, is_active, last_change) = row
+    print(f"Student: {name}, RegNo: {reg_no}, GR No: {gr_no or '-'}, "
+          f"Status: {'Active' if is_active else 'Inactive'}" + (f", last change: {last_change}" if last_change else ""))
+    action = "Inactivate" if is_active else "Reactivate"
+    if input(f"{action} this student? (y/N): ").strip().lower() != 'y':
+        return
+    reason = input("Reason (optional): ").strip()
+    report_status_change([(1, reg_no)], not is_active, reason)
+
+def report_status_change(ids, active, reason):
+    """
+    Menu wrapper for change_student_status: prints the summary, or the
+    error if nothing was changed.
+    """
+    try:
+        summary = change_student_status(ids, active, reason)
+    except Exception as e:
+        print(f"[ERROR] No status was changed: {e}")
+        return
+    print_status_change_summary(summary, active)
 
 def inactivate_students_bulk():
-    print("\n[INFO] Inactivate Students In Bulk (CSV) - NOT IMPLEMENTED (Placeholder)")
+    """
+    Inactivates the students listed in a CSV (RegNo or GR No in the first column).
+    """
+    print("\n--- Inactivate Students In Bulk (CSV) ---")
+    ids = prompt_student_ids(allow_list=False)
+    if ids is None:
+        return
+    reason = input("Reason (Enter for 'Left school'): ").strip() or "Left school"
+    report_status_change(ids, False, reason)
 
 def reactivate_inactive_students():
-    print("\n[INFO] Reactivate Inactive Students - NOT IMPLEMENTED (Placeholder)")
+    print("\n--- Reactivate Inactive Students ---")
+    ids = prompt_student_ids(allow_list=True)
+    if ids is None:
+        return
+    reason = input("Reason (optional): ").strip()
+    report_status_change(ids, True, reason)
+
+STUDENT_ID_HEADERS = ("regno", "reg no", "reg_no", "grno", "gr no", "gr_no", "id", "student id")
+
+def prompt_student_ids(allow_list):
+    """
+    [(row, RegNo or GR No)] from a CSV path (first column; a first row
+    naming the column, e.g. RegNo or GRNo, is skipped as a header) or, with allow_list, typed in separated by commas. None if
+    cancelled or the file cannot be read.
+    """
+    prompt = "Enter RegNos/GR Nos separated by commas, or a CSV path" if allow_list else "Enter CSV path"
+    text = input(f"{prompt} ('esc' to cancel): ").strip()
+    if not text or text.lower() == 'esc':
+        return None
+    if allow_list and not os.path.exists(text):
+        return [(n, part.strip()) for (n, part) in enumerate(text.split(","), start=1) if part.strip()]
+    try:
+        with open(text, mode='r', newline='', encoding='utf-8-sig') as f:
+            ids = [(row_num, row[0].strip()) for (row_num, row) in enumerate(csv.reader(f), start=1)
+                   if row and row[0].strip()]
+    except OSError as e:
+        print(f"[ERROR] Could not read {text}: {e}")
+        return None
+    # Legacy RegNos start with a letter (L0000012), so only a known label marks a header
+    if ids and ids[0][0] == 1 and ids[0][1].lower() in STUDENT_ID_HEADERS:
+        ids = ids[1:]
+    return ids
 
 def view_active_students():
-    print("\n[INFO] View Active Students - NOT IMPLEMENTED (Placeholder)")
+    print("\n--- View Active Students ---")
+    filters = prompt_listing_filters(year_column="A.AcademicYear")
+    if filters is None:
+        return
+    where, params = filters
+    _browse_admitted_students("Active Students", where + ["R.IsActive = 1"], params)
 
 def view_inactive_students():
-    print("\n[INFO] View Inactive Students - NOT IMPLEMENTED (Placeholder)")
+    print("\n--- View Inactive Students ---")
+    filters = prompt_listing_filters(year_column="A.AcademicYear")
+    if filters is None:
+        return
+    where, params = filters
+    _browse_admitted_students("Inactive Students", where + ["R.IsActive = 0"], params)
+
+
+###############################################################################
+# 1.6.1 Bulk status changes
+###############################################################################
+#
+# The IDs are array-bound into #StatusChange, resolved to RegNos (a RegNo or
+# a GR No is accepted) with one joined UPDATE, and the status is set with
+# one more joined UPDATE whose OUTPUT clause writes StudentStatusHistory,
+# all in one transaction.
+
+_STATUS_CHANGE_SQL = {
+    "create": """
+        CREATE TABLE #StatusChange (
+          RowNum                INT NOT NULL PRIMARY KEY,
+          StudentID             VARCHAR(50) NOT NULL,
+          RegNo                 VARCHAR(20) NULL
+        )
+    """,
+    "resolve": """
+        UPDATE S SET RegNo = COALESCE(R.RegNo, A.RegNo)
+        FROM #StatusChange S
+        LEFT JOIN StudentRegistration R ON R.RegNo = S.StudentID
+        LEFT JOIN StudentAdmitted A ON A.GRNo = S.StudentID
+    """,
+    "apply": """
+        UPDATE R SET IsActive = ?
+        OUTPUT inserted.RegNo, A.GRNo, deleted.IsActive, inserted.IsActive, ?
+        INTO StudentStatusHistory (RegNo, GRNo, OldIsActive, NewIsActive, Reason)
+        FROM StudentRegistration R
+        JOIN (SELECT DISTINCT RegNo FROM #StatusChange WHERE RegNo IS NOT NULL) S ON S.RegNo = R.RegNo
+        LEFT JOIN StudentAdmitted A ON A.RegNo = R.RegNo
+        WHERE R.IsActive <> ?
+    """,
+    "counts": """
+        SELECT COUNT(DISTINCT RegNo), SUM(CASE WHEN RegNo IS NULL THEN 1 ELSE 0 END) FROM #StatusChange
+    """,
+    "unmatched": "SELECT RowNum, StudentID FROM #StatusChange WHERE RegNo IS NULL ORDER BY RowNum",
+}
+
+def change_student_status(ids, active, reason=""):
+    """
+    ids: [(tag, RegNo or GR No)]. Sets IsActive for all of them in one
+    transaction and records each actual change in StudentStatusHistory.
+    Returns a summary dict: matched (distinct students), changed,
+    unchanged (already in that status), unmatched ([(tag, id)]), failed.
+    """
+    summary = {"matched": 0, "changed": 0, "unchanged": 0, "unmatched": [], "failed": []}
+    rows = [(tag, (n, student_id[:50])) for (n, (tag, student_id)) in enumerate(ids)]
+    if not rows:
+        return summary
+    tags = [tag for (tag, _id) in ids]
+    active = 1 if active else 0
+
+    with db_session() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(_STATUS_CHANGE_SQL["create"])
+            _done, failed = bulk_insert(cursor, "#StatusChange", ("RowNum", "StudentID"), rows)
+            summary["failed"] = failed
+            cursor.execute(_STATUS_CHANGE_SQL["resolve"])
+            summary["changed"] = cursor.execute(_STATUS_CHANGE_SQL["apply"], active, reason[:200] or None,
+                                                active).rowcount
+            summary["matched"] = cursor.execute(_STATUS_CHANGE_SQL["counts"]).fetchone()[0]
+            summary["unchanged"] = summary["matched"] - summary["changed"]
+            summary["unmatched"] = [(tags[n], student_id)
+                                    for (n, student_id) in cursor.execute(_STATUS_CHANGE_SQL["unmatched"]).fetchall()]
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.execute("IF OBJECT_ID('tempdb..#StatusChange') IS NOT NULL DROP TABLE #StatusChange")
+            conn.commit()
+            cursor.close()
+    return summary
+
+def print_status_change_summary(summary, active):
+    status = "reactivated" if active else "inactivated"
+    print(f"\n[INFO] {summary['changed']} students {status}.")
+    if summary["unchanged"]:
+        print(f"[INFO] {summary['unchanged']} were already {'active' if active else 'inactive'}.")
+    if summary["unmatched"]:
+        print(f"[WARNING] {len(summary['unmatched'])} IDs did not match any student:")
+        for (tag, student_id) in summary["unmatched"]:
+            print(f"  Row {tag}: {student_id}")
+    for (tag, error) in summary["failed"]:
+        print(f"[ERROR] Row {tag}: {error}")
 
 
 ###############################################################################
@@ -983,11 +4767,9 @@ def view_teachers_menu():
             print("Invalid choice. Please try again.")
 
 def view_all_teachers():
-    conn = get_connection()
-    cursor = conn.cursor()
     query = "SELECT ID, Name, CNIC, IsClassTeacher, Subjects FROM Teachers"
-    cursor.execute(query)
-    rows = cursor.fetchall()
+    with db_session() as conn:
+        rows = conn.execute(query).fetchall()
     if not rows:
         print("No teachers found.")
     else:
@@ -999,21 +4781,18 @@ def view_all_teachers():
             is_ct = "Yes" if row[3] else "No"
             subjects = row[4]
             print(f"ID: {teacher_id}, Name: {name}, CNIC: {cnic}, ClassTeacher: {is_ct}, Subjects: {subjects}")
-    conn.close()
 
 def view_all_class_teachers():
     """
     Lists all teachers where IsClassTeacher = 1 (i.e., True).
     """
-    conn = get_connection()
-    cursor = conn.cursor()
     query = """
         SELECT ID, Name, CNIC, Subjects
         FROM Teachers
         WHERE IsClassTeacher = 1
     """
-    cursor.execute(query)
-    rows = cursor.fetchall()
+    with db_session() as conn:
+        rows = conn.execute(query).fetchall()
     if not rows:
         print("\nNo class teachers found.\n")
     else:
@@ -1024,31 +4803,24 @@ def view_all_class_teachers():
             cnic = row[2]
             subjects = row[3]
             print(f"ID: {teacher_id}, Name: {name}, CNIC: {cnic}, Subjects: {subjects}")
-    conn.close()
 
 def view_teachers_by_subject():
     """
-    Asks user for a subject keyword (e.g., 'Math') and
-    lists all teachers whose 'Subjects' column includes that keyword.
+    Asks user for a subject (e.g., 'Math') and lists all teachers who
+    teach exactly that subject (not case-sensitive), via TeacherSubjects.
     """
     subject_search = input("\nEnter the subject you want to search for: ").strip()
     if not subject_search:
         print("[ERROR] Subject cannot be empty.")
         return
 
-    conn = get_connection()
-    cursor = conn.cursor()
-    query = """
-        SELECT ID, Name, CNIC, IsClassTeacher, Subjects
-        FROM Teachers
-        WHERE Subjects LIKE ?
-    """
-    # Use parameter binding for safety, adding wildcards
-    cursor.execute(query, f"%{subject_search}%")
-    rows = cursor.fetchall()
+    rows = _teacher_subjects.teachers_for(subject_search)
 
     if not rows:
         print(f"\nNo teachers found for subject '{subject_search}'.\n")
+        known = _teacher_subjects.subjects()
+        if known:
+            print("Subjects on record: " + ", ".join(known))
     else:
         print(f"\n--- Teachers who teach '{subject_search}' ---")
         for row in rows:
@@ -1058,7 +4830,6 @@ def view_teachers_by_subject():
             is_ct = "Yes" if row[3] else "No"
             subjects = row[4]
             print(f"ID: {teacher_id}, Name: {name}, CNIC: {cnic}, ClassTeacher: {is_ct}, Subjects: {subjects}")
-    conn.close()
 
 def view_teachers_by_class():
     """
@@ -1072,9 +4843,6 @@ def view_teachers_by_class():
 
     section = input("Enter the section to search (or press Enter to skip): ").strip()
 
-    conn = get_connection()
-    cursor = conn.cursor()
-
     if section:
         query = """
             SELECT T.ID, T.Name, T.CNIC, T.IsClassTeacher, T.Subjects, TC.ClassName, TC.Section
@@ -1082,7 +4850,7 @@ def view_teachers_by_class():
             JOIN TeacherClasses TC ON T.ID = TC.TeacherID
             WHERE TC.ClassName = ? AND TC.Section = ?
         """
-        cursor.execute(query, (class_name, section))
+        params = (class_name, section)
     else:
         query = """
             SELECT T.ID, T.Name, T.CNIC, T.IsClassTeacher, T.Subjects, TC.ClassName, TC.Section
@@ -1090,9 +4858,10 @@ def view_teachers_by_class():
             JOIN TeacherClasses TC ON T.ID = TC.TeacherID
             WHERE TC.ClassName = ?
         """
-        cursor.execute(query, (class_name,))
+        params = (class_name,)
 
-    rows = cursor.fetchall()
+    with db_session() as conn:
+        rows = conn.execute(query, params).fetchall()
     if not rows:
         msg_sec = f" and section '{section}'" if section else ""
         print(f"\nNo teachers found for class '{class_name}'{msg_sec}.\n")
@@ -1112,7 +4881,6 @@ def view_teachers_by_class():
                 f"ClassTeacher: {is_ct}, Subjects: {subjects}, "
                 f"Class: {class_assigned}, Section: {sec_assigned}"
             )
-    conn.close()
 
 def add_teacher_manual():
     """
@@ -1153,35 +4921,38 @@ def add_teacher_manual():
         return
 
     # Insert into database
-    conn = get_connection()
-    cursor = conn.cursor()
-
     insert_stmt = """
         INSERT INTO Teachers (Name, CNIC, IsClassTeacher, Subjects)
+        OUTPUT inserted.ID
         VALUES (?, ?, ?, ?)
     """
 
-    try:
-        cursor.execute(insert_stmt, (name, cnic, int(is_class_teacher), subjects))
-        conn.commit()
-        print(f"[INFO] Teacher '{name}' added successfully.")
-    except pyodbc.IntegrityError as e:
-        # If there's a unique constraint on CNIC, handle it
-        print(f"[ERROR] Could not add teacher. Possible duplicate CNIC '{cnic}'. {e}")
-        conn.rollback()
-    except Exception as e:
-        print(f"[ERROR] Could not add teacher: {e}")
-        conn.rollback()
-    finally:
-        conn.close()
+    with db_session() as conn:
+        cursor = conn.cursor()
+        try:
+            teacher_id = cursor.execute(insert_stmt, (name, cnic, int(is_class_teacher), subjects)).fetchone()[0]
+            write_teacher_subjects(cursor, teacher_id, split_subjects(subjects))
+            conn.commit()
+            invalidate_teacher_caches()
+            print(f"[INFO] Teacher '{name}' added successfully.")
+        except pyodbc.IntegrityError as e:
+            # If there's a unique constraint on CNIC, handle it
+            print(f"[ERROR] Could not add teacher. Possible duplicate CNIC '{cnic}'. {e}")
+            conn.rollback()
+        except Exception as e:
+            print(f"[ERROR] Could not add teacher: {e}")
+            conn.rollback()
+        finally:
+            cursor.close()
 
 def add_teachers_csv():
     """
-    Bulk add teachers from a CSV file.
+    Bulk add or update teachers from a CSV file (see import_teachers_csv).
     Expected CSV columns (in order):
     Name, CNIC, IsClassTeacher (Y/N), Subjects (comma-separated)
     Example row:
         "Ali Khan","4210112345671","Y","Math,English"
+    A teacher whose CNIC is already on record is updated from the file.
     """
     print("\n--- Add Teachers (CSV) ---")
     file_path = input("Enter the CSV file path (type 'esc' to cancel): ").strip()
@@ -1189,65 +4960,150 @@ def add_teachers_csv():
         return
 
     try:
-        with open(file_path, mode='r', encoding='utf-8') as f:
-            reader = csv.reader(f)
-            header = next(reader, None)  # If your CSV has no header, comment this out
-
-            conn = get_connection()
-            cursor = conn.cursor()
-
-            success_count = 0
-            row_num = 1
-
-            for row in reader:
-                row_num += 1
-                if len(row) < 4:
-                    print(f"[WARNING] Row {row_num} has insufficient columns. Skipping.")
-                    continue
-
-                name, cnic_raw, class_teacher_flag, subjects = row
-
-                name = name.strip()
-                if not name:
-                    print(f"[WARNING] Empty teacher name at row {row_num}. Skipping.")
-                    continue
-
-                cnic = format_cnic(cnic_raw.strip())
-                if cnic is None:
-                    print(f"[WARNING] Invalid CNIC at row {row_num}. Skipping.")
-                    continue
-
-                class_teacher_flag = class_teacher_flag.strip().upper()
-                if class_teacher_flag not in ['Y','N']:
-                    print(f"[WARNING] Invalid IsClassTeacher flag at row {row_num}. Must be Y or N. Skipping.")
-                    continue
-                is_class_teacher = True if class_teacher_flag == 'Y' else False
-
-                subjects = subjects.strip() if subjects else ""
-
-                insert_stmt = """
-                    INSERT INTO Teachers (Name, CNIC, IsClassTeacher, Subjects)
-                    VALUES (?, ?, ?, ?)
-                """
+        outcomes = import_teachers_csv(file_path)
+    except FileNotFoundError:
+        print(f"[ERROR] File not found: {file_path}")
+        return
+    except Exception as e:
+        print(f"[ERROR] An error occurred while processing the CSV file: {e}")
+        return
 
-                try:
-                    cursor.execute(insert_stmt, (name, cnic, int(is_class_teacher), subjects))
-                    success_count += 1
-                except pyodbc.IntegrityError as e:
-                    print(f"[ERROR] Duplicate CNIC '{cnic}' at row {row_num}. Skipping. {e}")
-                except Exception as e:
-                    print(f"[ERROR] Could not insert teacher at row {row_num}: {e}")
+    counts = Counter(outcome for (_row, _name, _cnic, outcome, _error) in outcomes)
+    for (row_num, name, cnic, outcome, error) in outcomes:
+        if outcome == "failed":
+            print(f"[WARNING] Row {row_num} ('{name}', CNIC '{cnic}'): {error}. Skipping.")
+        elif outcome != "unchanged":
+            print(f"  Row {row_num}: {name} ({cnic}) {outcome}")
+    print(f"[INFO] CSV Import Complete. Added {counts['inserted']}, updated {counts['updated']}, "
+          f"unchanged {counts['unchanged']}, failed {counts['failed']}.")
+
+# Teacher CSV rows are staged in a temp table, checked with a few set-based
+# UPDATEs and applied with one MERGE on CNIC; the outcome of every row is
+# written back to the staging table and read out at the end.
+_TEACHER_IMPORT_SQL = {
+    "create": """
+        CREATE TABLE #TeacherImport (
+          RowNum                INT NOT NULL PRIMARY KEY,
+          ColumnCount           INT NOT NULL,
+          Name                  NVARCHAR(1000) NULL,
+          CNIC                  VARCHAR(1000) NULL,
+          ClassTeacherFlag      VARCHAR(1000) NULL,
+          Subjects              VARCHAR(1000) NULL,
+          TeacherID             INT NULL,
+          Outcome               VARCHAR(10) NULL,
+          Error                 VARCHAR(200) NULL
+        )
+    """,
+    "validate": """
+        UPDATE #TeacherImport SET Error = CASE
+            WHEN ColumnCount < 4 THEN 'Insufficient columns'
+            WHEN Name IS NULL OR Name = '' THEN 'Empty teacher name'
+            WHEN LEN(Name) > 100 THEN 'Name longer than 100 characters'
+            WHEN CNIC IS NULL OR CNIC NOT LIKE REPLICATE('[0-9]', 13) THEN 'Invalid CNIC'
+            WHEN UPPER(ClassTeacherFlag) NOT IN ('Y', 'N') OR ClassTeacherFlag IS NULL
+                THEN 'Invalid IsClassTeacher flag (must be Y or N)'
+            WHEN LEN(Subjects) > 500 THEN 'Subjects longer than 500 characters'
+        END
+    """,
+    "repeats": """
+        UPDATE S SET Error = 'CNIC repeated in this file (first at row ' + CAST(D.FirstRow AS VARCHAR(10)) + ')'
+        FROM #TeacherImport S
+        JOIN (SELECT RowNum, MIN(RowNum) OVER (PARTITION BY CNIC) AS FirstRow
+              FROM #TeacherImport WHERE Error IS NULL) D ON D.RowNum = S.RowNum
+        WHERE D.FirstRow <> S.RowNum
+    """,
+    "merge": """
+        DECLARE @changes TABLE (RowNum INT NOT NULL, Action NVARCHAR(10) NOT NULL, TeacherID INT NOT NULL);
+        MERGE Teachers AS T
+        USING (SELECT RowNum, Name, CNIC,
+                      CASE WHEN UPPER(ClassTeacherFlag) = 'Y' THEN 1 ELSE 0 END AS IsClassTeacher,
+                      ISNULL(Subjects, '') AS Subjects
+               FROM #TeacherImport WHERE Error IS NULL) AS S
+        ON T.CNIC = S.CNIC
+        -- Binary compares, so a fix that only changes letter case counts as a change
+        WHEN MATCHED AND (T.Name <> S.Name COLLATE Latin1_General_BIN2
+                          OR T.IsClassTeacher <> S.IsClassTeacher
+                          OR ISNULL(T.Subjects, '') <> S.Subjects COLLATE Latin1_General_BIN2) THEN
+            UPDATE SET Name = S.Name, IsClassTeacher = S.IsClassTeacher, Subjects = S.Subjects
+        WHEN NOT MATCHED BY TARGET THEN
+            INSERT (Name, CNIC, IsClassTeacher, Subjects) VALUES (S.Name, S.CNIC, S.IsClassTeacher, S.Subjects)
+        OUTPUT S.RowNum, $action, inserted.ID INTO @changes;
+
+        UPDATE S SET Outcome = CASE C.Action WHEN 'INSERT' THEN 'inserted' ELSE 'updated' END,
+                     TeacherID = C.TeacherID
+        FROM #TeacherImport S JOIN @changes C ON C.RowNum = S.RowNum;
+
+        UPDATE S SET Outcome = 'unchanged', TeacherID = T.ID
+        FROM #TeacherImport S JOIN Teachers T ON T.CNIC = S.CNIC
+        WHERE S.Error IS NULL AND S.Outcome IS NULL;
+
+        UPDATE #TeacherImport SET Outcome = 'failed' WHERE Error IS NOT NULL;
+    """,
+    "subjects": """
+        DELETE TS FROM TeacherSubjects TS
+        JOIN #TeacherImport S ON S.TeacherID = TS.TeacherID
+        WHERE S.Outcome IN ('inserted', 'updated');
+
+        INSERT INTO TeacherSubjects (Subject, TeacherID)
+        SELECT DISTINCT LEFT(LTRIM(RTRIM(X.value)), 100), S.TeacherID
+        FROM #TeacherImport S
+        CROSS APPLY STRING_SPLIT(S.Subjects, ',') X
+        WHERE S.Outcome IN ('inserted', 'updated') AND LTRIM(RTRIM(X.value)) <> '';
+    """,
+    "outcomes": "SELECT RowNum, Name, CNIC, Outcome, Error FROM #TeacherImport ORDER BY RowNum",
+}
 
+def import_teachers_csv(file_path):
+    """
+    Adds new teachers and updates existing ones (matched by CNIC) from a
+    teacher CSV in a single transaction:
+      1. the rows are bulk loaded into a #TeacherImport staging table
+         (CNIC normalized with format_cnic, subjects with split_subjects);
+      2. bad rows and CNICs repeated in the file are marked in SQL;
+      3. one MERGE inserts/updates the good rows and TeacherSubjects is
+         rewritten for them.
+    Returns [(row_num, name, cnic, outcome, error)] in file order, where
+    outcome is 'inserted', 'updated', 'unchanged' or 'failed'.
+    """
+    staged = []
+    with open(file_path, mode='r', newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader, None)  # header
+        for row_num, row in enumerate(reader, start=2):
+            if not any(cell.strip() for cell in row):
+                continue
+            cells = [cell.strip()[:1000] for cell in row[:4]] + [None] * (4 - len(row[:4]))
+            (name, cnic_raw, flag, subjects) = cells
+            cnic = format_cnic(cnic_raw) if cnic_raw is not None else None
+            subjects = ", ".join(split_subjects(subjects))[:1000] if subjects is not None else None
+            staged.append((row_num, (row_num, len(row), name, cnic, flag, subjects)))
+
+    if not staged:
+        return []
+
+    with db_session() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(_TEACHER_IMPORT_SQL["create"])
+            _loaded, failed = bulk_insert(
+                cursor, "#TeacherImport",
+                ("RowNum", "ColumnCount", "Name", "CNIC", "ClassTeacherFlag", "Subjects"), staged)
+            for (row_num, error) in failed:
+                print(f"[WARNING] Row {row_num} could not be staged: {error}")
+            for step in ("validate", "repeats", "merge", "subjects"):
+                execute_batch(cursor, _TEACHER_IMPORT_SQL[step])
+            outcomes = [tuple(row) for row in cursor.execute(_TEACHER_IMPORT_SQL["outcomes"]).fetchall()]
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.execute("IF OBJECT_ID('tempdb..#TeacherImport') IS NOT NULL DROP TABLE #TeacherImport")
             conn.commit()
             cursor.close()
-            conn.close()
 
-            print(f"[INFO] CSV Import Complete. Successfully added {success_count} teachers.")
-
-    except FileNotFoundError:
-        print(f"[ERROR] File not found: {file_path}")
-    except Exception as e:
-        print(f"[ERROR] An error occurred while processing the CSV file: {e}")
+    invalidate_teacher_caches()
+    return outcomes
 
 
 def assign_roles_to_teachers():
@@ -1261,27 +5117,9 @@ def assign_roles_to_teachers():
     if teacher_id_or_cnic.lower() == 'esc':
         return
 
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    # Try searching by numeric ID first
-    teacher = None
-    try:
-        teacher_id_int = int(teacher_id_or_cnic)
-        cursor.execute("SELECT ID, Name, CNIC, IsClassTeacher, Subjects FROM Teachers WHERE ID = ?", teacher_id_int)
-        teacher = cursor.fetchone()
-    except ValueError:
-        # If not an integer, assume it's a CNIC
-        pass
-
-    if not teacher:
-        # If teacher not found by ID, try searching by CNIC
-        cursor.execute("SELECT ID, Name, CNIC, IsClassTeacher, Subjects FROM Teachers WHERE CNIC = ?", teacher_id_or_cnic)
-        teacher = cursor.fetchone()
-
+    teacher = _teachers.resolve(teacher_id_or_cnic)
     if not teacher:
         print("[ERROR] Teacher not found.")
-        conn.close()
         return
 
     teacher_id = teacher[0]
@@ -1295,11 +5133,9 @@ def assign_roles_to_teachers():
     # Prompt new role
     new_role = input("Assign role: (C)lass Teacher or (S)ubject Teacher? (type 'esc' to cancel) ").strip().upper()
     if new_role.lower() == 'esc':
-        conn.close()
         return
     if new_role not in ['C','S']:
         print("[ERROR] Invalid choice. Must be 'C' or 'S'.")
-        conn.close()
         return
 
     if new_role == 'C':
@@ -1309,15 +5145,15 @@ def assign_roles_to_teachers():
         # Subject teacher only
         update_sql = "UPDATE Teachers SET IsClassTeacher = 0 WHERE ID = ?"
 
-    try:
-        cursor.execute(update_sql, teacher_id)
-        conn.commit()
-        print(f"[INFO] Role updated successfully for teacher ID {teacher_id}. IsClassTeacher={new_role=='C'}")
-    except Exception as e:
-        print(f"[ERROR] Could not update role: {e}")
-        conn.rollback()
-
-    conn.close()
+    with db_session() as conn:
+        try:
+            conn.execute(update_sql, teacher_id)
+            conn.commit()
+            invalidate_teacher_caches(teacher_id)
+            print(f"[INFO] Role updated successfully for teacher ID {teacher_id}. IsClassTeacher={new_role=='C'}")
+        except Exception as e:
+            print(f"[ERROR] Could not update role: {e}")
+            conn.rollback()
 
 
 def assign_classes_to_teachers():
@@ -1330,27 +5166,9 @@ def assign_classes_to_teachers():
     if teacher_id_or_cnic.lower() == 'esc':
         return
 
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    # Try searching by numeric ID first
-    teacher = None
-    try:
-        teacher_id_int = int(teacher_id_or_cnic)
-        cursor.execute("SELECT ID, Name, CNIC FROM Teachers WHERE ID = ?", teacher_id_int)
-        teacher = cursor.fetchone()
-    except ValueError:
-        # Not an integer, assume CNIC
-        pass
-
-    if not teacher:
-        # If teacher not found by ID, try CNIC
-        cursor.execute("SELECT ID, Name, CNIC FROM Teachers WHERE CNIC = ?", teacher_id_or_cnic)
-        teacher = cursor.fetchone()
-
+    teacher = _teachers.resolve(teacher_id_or_cnic)
     if not teacher:
         print("[ERROR] Teacher not found.")
-        conn.close()
         return
 
     teacher_id = teacher[0]
@@ -1361,13 +5179,11 @@ def assign_classes_to_teachers():
     class_name = input("Enter Class Name (e.g., 'Class 1'): ").strip()
     if not class_name:
         print("[ERROR] Class name cannot be empty.")
-        conn.close()
         return
 
     section = input("Enter Section (e.g., 'A'): ").strip()
     if not section:
         print("[ERROR] Section cannot be empty.")
-        conn.close()
         return
 
     # Insert into TeacherClasses
@@ -1375,15 +5191,277 @@ def assign_classes_to_teachers():
         INSERT INTO TeacherClasses (TeacherID, ClassName, Section)
         VALUES (?, ?, ?)
     """
-    try:
-        cursor.execute(insert_sql, (teacher_id, class_name, section))
-        conn.commit()
-        print(f"[INFO] Class '{class_name}' Section '{section}' assigned to teacher ID {teacher_id} successfully.")
-    except Exception as e:
-        print(f"[ERROR] Could not assign class: {e}")
-        conn.rollback()
+    with db_session() as conn:
+        try:
+            conn.execute(insert_sql, (teacher_id, class_name, section))
+            conn.commit()
+            print(f"[INFO] Class '{class_name}' Section '{section}' assigned to teacher ID {teacher_id} successfully.")
+        except Exception as e:
+            print(f"[ERROR] Could not assign class: {e}")
+            conn.rollback()
 
-    conn.close()
+###############################################################################
+# 2.1 Teacher lookups (subjects, ID/CNIC resolver)
+###############################################################################
+#
+# Subjects live in TeacherSubjects, one row per (Subject, TeacherID), so
+# "who teaches Art?" is an index seek on the exact subject instead of a
+# LIKE '%Art%' scan that also matches "Arts & Crafts". Teachers.Subjects is
+# kept as the text shown on screen.
+
+def split_subjects(subjects):
+    """
+    "Math, english ,Math" -> ["Math", "english"]: trimmed, blanks dropped,
+    repeats (ignoring case) removed, first spelling kept.
+    """
+    seen = set()
+    result = []
+    for subject in (subjects or "").split(","):
+        subject = " ".join(subject.split())[:100]
+        if subject and subject.lower() not in seen:
+            seen.add(subject.lower())
+            result.append(subject)
+    return result
+
+def write_teacher_subjects(cursor, teacher_id, subjects):
+    """
+    Replaces a teacher's TeacherSubjects rows, in the caller's transaction.
+    Raises ValueError naming the subjects that could not be written, so the
+    caller rolls back instead of committing a partial list.
+    """
+    cursor.execute("DELETE FROM TeacherSubjects WHERE TeacherID = ?", teacher_id)
+    if subjects:
+        _done, failed = bulk_insert(cursor, "TeacherSubjects", ("Subject", "TeacherID"),
+                                    [(subject, (subject, teacher_id)) for subject in subjects])
+        if failed:
+            raise ValueError("Could not save subject(s) "
+                             + ", ".join(f"'{subject}' ({error})" for (subject, error) in failed))
+
+TEACHER_CACHE_CHECK_SECONDS = 60  # how stale the teacher caches may get before they re-check the tables
+
+class TeacherDataVersion:
+    """
+    A cheap fingerprint of Teachers and TeacherSubjects (row counts and
+    CHECKSUM_AGG), so the teacher caches notice changes made by other
+    sessions. It is read again at most every TEACHER_CACHE_CHECK_SECONDS,
+    or on the next call after expire().
+    """
+
+    def __init__(self):
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def expire(self):
+        with self._lock:
+            self._checked_at = 0.0
+
+    def current(self):
+        with self._lock:
+            if (self._version is None
+                    or time.monotonic() - self._checked_at >= TEACHER_CACHE_CHECK_SECONDS):
+                with db_session() as conn:
+                    sql = """
+                        SELECT (SELECT COUNT_BIG(*) FROM Teachers),
+                               (SELECT CHECKSUM_AGG(BINARY_CHECKSUM(*)) FROM Teachers),
+                               (SELECT COUNT_BIG(*) FROM TeacherSubjects),
+                               (SELECT CHECKSUM_AGG(BINARY_CHECKSUM(*)) FROM TeacherSubjects)
+                    """
+                    self._version = tuple(conn.prepared(sql).execute(sql).fetchall()[0])
+                self._checked_at = time.monotonic()
+            return self._version
+
+_teacher_data_version = TeacherDataVersion()
+
+class TeacherSubjectCache:
+    """
+    Read-through cache for the teacher screens: subject -> teacher rows
+    (ID, Name, CNIC, IsClassTeacher, Subjects). A subject is looked up in
+    the database once and then served from memory until the next write to
+    Teachers or TeacherSubjects calls invalidate(), or until
+    TeacherDataVersion sees a change made elsewhere.
+    """
+
+    def __init__(self):
+        self._by_subject = {}   # lower-cased subject -> tuple of teacher rows
+        self._subjects = None   # sorted subject names on record
+        self._version = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        with self._lock:
+            self._by_subject.clear()
+            self._subjects = None
+
+    def _check_version(self):
+        version = _teacher_data_version.current()
+        with self._lock:
+            if version != self._version:
+                self._by_subject.clear()
+                self._subjects = None
+                self._version = version
+
+    def teachers_for(self, subject):
+        key = " ".join(subject.split()).lower()
+        self._check_version()
+        with self._lock:
+            rows = self._by_subject.get(key)
+        if rows is None:
+            with db_session() as conn:
+                rows = tuple(conn.execute("""
+                    SELECT T.ID, T.Name, T.CNIC, T.IsClassTeacher, T.Subjects
+                    FROM TeacherSubjects TS
+                    JOIN Teachers T ON T.ID = TS.TeacherID
+                    WHERE TS.Subject = ?  -- the default collation ignores case
+                    ORDER BY T.Name
+                """, key).fetchall())
+            with self._lock:
+                self._by_subject[key] = rows
+        return rows
+
+    def subjects(self):
+        self._check_version()
+        with self._lock:
+            subjects = self._subjects
+        if subjects is None:
+            with db_session() as conn:
+                subjects = [row[0] for row in conn.execute(
+                    "SELECT MIN(Subject) FROM TeacherSubjects GROUP BY Subject ORDER BY MIN(Subject)").fetchall()]
+            with self._lock:
+                self._subjects = subjects
+        return subjects
+
+_teacher_subjects = TeacherSubjectCache()
+
+TEACHER_CACHE_SIZE = 256  # teacher records kept by the resolver
+
+_TEACHER_COLUMNS = "ID, Name, CNIC, IsClassTeacher, Subjects"
+
+class TeacherResolver:
+    """
+    Finds teachers by whatever the user typed: an ID or a CNIC (dashes
+    optional, normalized with format_cnic). One query checks both, and the
+    last TEACHER_CACHE_SIZE records are kept in an LRU keyed by ID and by
+    CNIC. Rows are (ID, Name, CNIC, IsClassTeacher, Subjects). The LRU is
+    emptied when TeacherDataVersion sees a change made by another session.
+    """
+
+    def __init__(self, capacity=TEACHER_CACHE_SIZE):
+        self.capacity = capacity
+        self._cache = OrderedDict()  # ("id", int) / ("cnic", str) -> row
+        self._version = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _keys(identifier):
+        """
+        The cache keys an identifier could match, ID first.
+        """
+        identifier = identifier.strip()
+        keys = []
+        if identifier.isdigit() and len(identifier) <= 9:
+            keys.append(("id", int(identifier)))
+        keys.append(("cnic", format_cnic(identifier)))
+        return keys
+
+    def _remember_locked(self, row):
+        for key in (("id", row[0]), ("cnic", row[2])):
+            self._cache[key] = row
+            self._cache.move_to_end(key)
+        while len(self._cache) > self.capacity:
+            self._cache.popitem(last=False)
+
+    def _cached(self, keys):
+        version = _teacher_data_version.current()
+        with self._lock:
+            if version != self._version:
+                self._cache.clear()
+                self._version = version
+            for key in keys:
+                row = self._cache.get(key)
+                if row is not None:
+                    self._cache.move_to_end(key)
+                    return row
+        return None
+
+    def resolve(self, identifier):
+        """
+        The teacher row for an ID or CNIC, or None. A match on ID wins.
+        """
+        keys = self._keys(identifier)
+        row = self._cached(keys)
+        if row is not None:
+            return row
+        teacher_id = keys[0][1] if keys[0][0] == "id" else None
+        cnic = keys[-1][1]
+        with db_session() as conn:
+            sql = f"SELECT {_TEACHER_COLUMNS} FROM Teachers WHERE ID = ? OR CNIC = ?"
+            rows = conn.prepared(sql).execute(sql, teacher_id, cnic).fetchall()
+        if not rows:
+            return None
+        rows.sort(key=lambda r: r[0] != teacher_id)
+        row = tuple(rows[0])
+        with self._lock:
+            self._remember_locked(row)
+        return row
+
+    def resolve_many(self, identifiers, chunk_size=500):
+        """
+        {identifier: row or None} for many IDs/CNICs; cache misses are
+        looked up together, one query per chunk_size identifiers.
+        """
+        result = {}
+        missing = {}  # identifier -> keys
+        for identifier in identifiers:
+            keys = self._keys(identifier)
+            row = self._cached(keys)
+            result[identifier] = row
+            if row is None:
+                missing[identifier] = keys
+
+        pending = list(missing.items())
+        if pending:
+            with db_session() as conn:
+                for start in range(0, len(pending), chunk_size):
+                    chunk = pending[start:start + chunk_size]
+                    ids = sorted({k[1] for (_i, keys) in chunk for k in keys if k[0] == "id"})
+                    cnics = sorted({k[1] for (_i, keys) in chunk for k in keys if k[0] == "cnic"})
+                    conditions = [f"CNIC IN ({', '.join('?' for _ in cnics)})"]
+                    if ids:
+                        conditions.insert(0, f"ID IN ({', '.join('?' for _ in ids)})")
+                    rows = conn.execute(f"SELECT {_TEACHER_COLUMNS} FROM Teachers WHERE {' OR '.join(conditions)}",
+                                        *ids, *cnics).fetchall()
+                    found = {}
+                    with self._lock:
+                        for row in rows:
+                            row = tuple(row)
+                            self._remember_locked(row)
+                            found[("id", row[0])] = row
+                            found[("cnic", row[2])] = row
+                    for (identifier, keys) in chunk:
+                        result[identifier] = next((found[k] for k in keys if k in found), None)
+        return result
+
+    def invalidate(self, teacher_id=None):
+        """
+        Forgets one teacher (after an update) or, with no ID, everyone.
+        """
+        with self._lock:
+            if teacher_id is None:
+                self._cache.clear()
+                return
+            for key in [k for (k, row) in self._cache.items() if row[0] == teacher_id]:
+                del self._cache[key]
+
+_teachers = TeacherResolver()
+
+def invalidate_teacher_caches(teacher_id=None):
+    """
+    Call after committing a change to Teachers or TeacherSubjects.
+    """
+    _teachers.invalidate(teacher_id)
+    _teacher_subjects.invalidate()
+    _teacher_data_version.expire()
 
 ###############################################################################
 # 3. Fee Management
@@ -1433,8 +5511,9 @@ def update_modify_policy():
     print("1. Registration Policy")
     print("2. Admission Policy")
     print("3. General Policy (Class Wise)")
+    print("4. Sibling Discount Policy")
     
-    choice = input("Select Policy to Modify (1-3): ").strip()
+    choice = input("Select Policy to Modify (1-4): ").strip()
 
     if choice == "1":
         add_registration_policy()
@@ -1442,6 +5521,8 @@ def update_modify_policy():
         add_admission_policy()
     elif choice == "3":
         add_general_policy()
+    elif choice == "4":
+        add_sibling_policy()
     else:
         print("\n[ERROR] Invalid Choice")
 
@@ -1451,7 +5532,8 @@ def add_policy_menu():
         print("1. Registration Policy")
         print("2. Admission Policy")
         print("3. General Policy (Class Wise)")
-        print("4. Back To Fee Management")
+        print("4. Sibling Discount Policy")
+        print("5. Back To Fee Management")
 
         choice = input("Enter your choice: ").strip()
 
@@ -1461,102 +5543,265 @@ def add_policy_menu():
             add_admission_policy()
         elif choice == "3":
             add_general_policy()
-        elif choice == "4" or choice.lower() == 'esc':
+        elif choice == "4":
+            add_sibling_policy()
+        elif choice == "5" or choice.lower() == 'esc':
             return
         else:
             print("Invalid choice. Please try again.")
 
-def add_registration_policy():
-    print("\n-- Add Registration Policy --")
-    registration_fee = input("Enter Registration Fee: ").strip()
-    print(f"[INFO] Registration policy added with fee: {registration_fee}")
+# Fee policies are kept in FeePolicies, one row per (type, class, effective
+# date): a change is saved as a new version effective from a given date, so
+# vouchers for any month are billed with the policy in force that month.
+# Voucher runs read them through fee_policy_cache (parsed Decimals, general
+# policies by class), which reloads only when FeePolicies changes.
+
+FEE_POLICY_FIELDS = {
+    "registration": ("registration_fee",),
+    "admission": ("admission_fee", "security_deposit"),
+    "general": ("monthly_fee", "annual_charges", "other_charges", "computer_lab_charges", "lab_charges"),
+    "sibling": ("second_child_discount", "later_child_discount"),  # percents off the monthly fee
+}
+_FEE_POLICY_COLUMNS = {
+    "registration_fee": "RegistrationFee",
+    "admission_fee": "AdmissionFee",
+    "security_deposit": "SecurityDeposit",
+    "monthly_fee": "MonthlyFee",
+    "annual_charges": "AnnualCharges",
+    "other_charges": "OtherCharges",
+    "computer_lab_charges": "ComputerLabCharges",
+    "lab_charges": "LabCharges",
+    "second_child_discount": "SecondChildDiscount",
+    "later_child_discount": "LaterChildDiscount",
+}
+FEE_POLICY_CHECK_SECONDS = 60  # how stale the cache may get before it re-checks the version
 
-def add_admission_policy():
-    print("\n-- Add Admission Policy --")
-    admission_fee = input("Enter Admission Fee: ").strip()
-    security_deposit = input("Enter Security Deposit: ").strip()
-    print(f"[INFO] Admission policy added with Admission Fee: {admission_fee} and Security Deposit: {security_deposit}")
+def class_key(class_name):
+    """
+    "  class 1 " and "Class 1" are the same class.
+    """
+    return " ".join((class_name or "").split()).lower()
 
-def add_general_policy():
-    print("\n-- Add General Policy (Class Wise) --")
-    
-    # Input for class name
-    class_name = input("Enter Class Name (e.g., Class 1): ").strip()
-    
-    # Input for monthly fee
-    monthly_fee = input("Enter Monthly Fee: ").strip()
-    
-    # Input for annual charges (charged once a year)
-    annual_charges = input("Enter Annual Charges: ").strip()
-    
-    # Input for other annual charges (charged once a year)
-    other_charges = input("Enter Other Annual Charges: ").strip()
-    
-    # Input for computer lab charges (charged monthly)
-    computer_lab_charges = input("Enter Monthly Computer Lab Charges: ").strip()
-    
-    # Input for lab charges (charged monthly)
-    lab_charges = input("Enter Monthly Lab Charges: ").strip()
-    
-    # Displaying the general policy summary
-    print(f"[INFO] General policy added for {class_name} with the following details:")
-    print(f"  - Monthly Fee: {monthly_fee}")
-    print(f"  - Annual Charges (once a year): {annual_charges}")
-    print(f"  - Other Annual Charges (once a year): {other_charges}")
-    print(f"  - Monthly Computer Lab Charges: {computer_lab_charges}")
-    print(f"  - Monthly Lab Charges: {lab_charges}")
+def parse_amount(text, blank=None):
+    """
+    A fee amount as a Decimal rounded to paisa, `blank` for an empty
+    string, or None if it is not a non-negative number.
+    """
+    text = (text or "").replace(",", "").strip()
+    if not text:
+        return blank
+    try:
+        amount = Decimal(text)
+    except InvalidOperation:
+        return None
+    if not amount.is_finite() or amount < 0:
+        return None
+    return amount.quantize(Decimal("0.01"))
+
+class FeePolicySnapshot:
+    """
+    The policies in force on one date. Each policy is a dict of the
+    FEE_POLICY_FIELDS of its type (Decimal values) plus class_name and
+    effective_from; registration, admission and sibling are None when
+    undefined.
+    """
 
-def view_fee_policy():
-    print("\n[INFO] Displaying all Fee Policies (Details will be fetched from the database)")
+    def __init__(self, as_of, registration, admission, general, sibling=None):
+        self.as_of = as_of
+        self.registration = registration
+        self.admission = admission
+        self.general = general  # class_key -> policy
+        self.sibling = sibling
 
-def generate_monthly_fee_vouchers_menu():
-    while True:
-        print("\n--- Generate Monthly Fee Vouchers ---")
-        print("1. Generate Fee Voucher")
-        print("2. View Fee Voucher (Print Option Available)")
-        print("3. Back To Fee Management")
+    def general_for(self, class_name):
+        return self.general.get(class_key(class_name))
 
-        choice = input("Enter your choice: ").strip()
+    def sibling_discount_percents(self):
+        """
+        Discount percents by position in the family, for
+        FamilyIndex.sibling_discounts; no discount without a sibling policy.
+        """
+        if self.sibling is None:
+            return (Decimal("0"),)
+        return (Decimal("0"), self.sibling["second_child_discount"], self.sibling["later_child_discount"])
 
-        if choice == "1":
-            generate_fee_voucher()
-        elif choice == "2":
-            view_fee_voucher()
-        elif choice == "3" or choice.lower() == 'esc':
-            return
-        else:
-            print("Invalid choice. Please try again.")
+class FeePolicyCache:
+    """
+    Read-through cache of FeePolicies. All versions are loaded in one query;
+    snapshot(as_of) picks the version in force per policy and is memoized,
+    so lookups during a voucher run are dict gets. The table's highest
+    rowversion is the cache version: when another session saves a policy it
+    changes and the next check reloads.
+    """
 
-# Global storage for fee policies
-fee_policies = {
-    "registration": None,  # Stores registration fee
-    "admission": {"fee": None, "security_deposit": None},  # Stores admission fee and security deposit
-    "general": []  # Stores a list of class-wise general policies
-}
+    def __init__(self):
+        self._versions = None   # (type, class_key) -> [(effective_from, policy)] sorted by date
+        self._version = None
+        self._checked_at = 0.0
+        self._snapshots = {}
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        with self._lock:
+            self._versions = None
+            self._snapshots.clear()
+
+    def refresh(self, force=False):
+        """
+        Reloads if FeePolicies changed since the last load. Without force
+        the version is checked at most every FEE_POLICY_CHECK_SECONDS.
+        """
+        with self._lock:
+            if (not force and self._versions is not None
+                    and time.monotonic() - self._checked_at < FEE_POLICY_CHECK_SECONDS):
+                return
+            with db_session() as conn:
+                sql = "SELECT MAX(RowVer) FROM FeePolicies"
+                version = conn.prepared(sql).execute(sql).fetchall()[0][0]
+                if self._versions is None or version != self._version:
+                    self._load_locked(conn)
+                    self._version = version
+            self._checked_at = time.monotonic()
+
+    def _load_locked(self, conn):
+        fields = list(_FEE_POLICY_COLUMNS)
+        rows = conn.execute(
+            f"SELECT PolicyType, ClassName, EffectiveFrom, {', '.join(_FEE_POLICY_COLUMNS.values())} "
+            "FROM FeePolicies ORDER BY EffectiveFrom"
+        ).fetchall()
+        versions = defaultdict(list)
+        for row in rows:
+            policy_type, class_name, effective_from = row[0], row[1], db_date(row[2])
+            values = dict(zip(fields, row[3:]))
+            policy = {field: Decimal(values[field] or 0) for field in FEE_POLICY_FIELDS.get(policy_type, ())}
+            policy["class_name"] = class_name
+            policy["effective_from"] = effective_from
+            versions[(policy_type, class_key(class_name))].append((effective_from, policy))
+        self._versions = dict(versions)
+        self._snapshots.clear()
+
+    def snapshot(self, as_of=None):
+        """
+        FeePolicySnapshot of the policies in force on `as_of` (default: today).
+        """
+        as_of = as_of or date.today()
+        self.refresh()
+        with self._lock:
+            snap = self._snapshots.get(as_of)
+            if snap is None:
+                current = {}
+                for (key, history) in self._versions.items():
+                    in_force = [policy for (effective_from, policy) in history if effective_from <= as_of]
+                    if in_force:
+                        current[key] = in_force[-1]
+                general = {cls: policy for ((policy_type, cls), policy) in current.items() if policy_type == "general"}
+                snap = self._snapshots[as_of] = FeePolicySnapshot(
+                    as_of, current.get(("registration", "")), current.get(("admission", "")), general,
+                    current.get(("sibling", "")))
+            return snap
+
+    def upcoming(self, as_of=None):
+        """
+        Versions that take effect after `as_of`: [(type, policy)] by date.
+        """
+        as_of = as_of or date.today()
+        self.refresh()
+        with self._lock:
+            later = [(effective_from, policy_type, policy)
+                     for ((policy_type, _cls), history) in self._versions.items()
+                     for (effective_from, policy) in history if effective_from > as_of]
+        return [(policy_type, policy) for (_d, policy_type, policy) in sorted(later, key=lambda item: item[0])]
+
+fee_policy_cache = FeePolicyCache()
+
+def save_fee_policy(policy_type, amounts, effective_from, class_name=""):
+    """
+    Saves a policy version; a version for the same type, class and date is
+    replaced. amounts maps the FEE_POLICY_FIELDS of the type to Decimals.
+    Returns True if saved; errors are printed.
+    """
+    columns = [_FEE_POLICY_COLUMNS[field] for field in FEE_POLICY_FIELDS[policy_type]]
+    values = [amounts[field] for field in FEE_POLICY_FIELDS[policy_type]]
+    class_name = " ".join(class_name.split())
+    with db_session() as conn:
+        cursor = conn.cursor()
+        try:
+            updated = cursor.execute(f"""
+                UPDATE FeePolicies SET {', '.join(f'{c} = ?' for c in columns)}, UpdatedAt = GETDATE()
+                WHERE PolicyType = ? AND ClassName = ? AND EffectiveFrom = ?
+            """, *values, policy_type, class_name, effective_from).rowcount
+            if not updated:
+                cursor.execute(f"""
+                    INSERT INTO FeePolicies (PolicyType, ClassName, EffectiveFrom, {', '.join(columns)})
+                    VALUES (?, ?, ?, {', '.join('?' for _ in columns)})
+                """, policy_type, class_name, effective_from, *values)
+            conn.commit()
+        except pyodbc.Error as e:
+            conn.rollback()
+            print(f"[ERROR] The policy was not saved: {e}")
+            return False
+        finally:
+            cursor.close()
+    fee_policy_cache.invalidate()
+    return True
+
+def prompt_effective_date():
+    """
+    Asks from when a policy applies. Returns a date, or None if the input
+    was invalid or cancelled.
+    """
+    text = input("Effective from (YYYY-MM-DD, Enter for today): ").strip()
+    if text.lower() == 'esc':
+        return None
+    if not text:
+        return date.today()
+    try:
+        return datetime.strptime(text, "%Y-%m-%d").date()
+    except ValueError:
+        print("[ERROR] Invalid date. Use YYYY-MM-DD.")
+        return None
+
+def _prompt_amounts(prompts, blank=None):
+    """
+    prompts: [(field, prompt text)]. Returns {field: Decimal}, or None
+    after reporting the first invalid amount.
+    """
+    amounts = {}
+    for (field, prompt_str) in prompts:
+        text = input(f"Enter {prompt_str}: ").strip()
+        if text.lower() == 'esc':
+            return None
+        amount = parse_amount(text, blank)
+        if amount is None:
+            print(f"[ERROR] Invalid amount for {prompt_str}: '{text}'")
+            return None
+        amounts[field] = amount
+    return amounts
 
 def view_fee_policy():
-    print("\n[INFO] Displaying all Fee Policies:")
-    
+    print("\n[INFO] Displaying all Fee Policies (in force today):")
+    snap = fee_policy_cache.snapshot()
+
     # Display Registration Policy
-    if fee_policies["registration"]:
-        print(f"\nRegistration Policy:")
-        print(f"  - Registration Fee: {fee_policies['registration']}")
+    if snap.registration:
+        print(f"\nRegistration Policy (since {snap.registration['effective_from']}):")
+        print(f"  - Registration Fee: {snap.registration['registration_fee']}")
     else:
         print("\nRegistration Policy: Not Defined")
 
     # Display Admission Policy
-    if fee_policies["admission"]["fee"] or fee_policies["admission"]["security_deposit"]:
-        print(f"\nAdmission Policy:")
-        print(f"  - Admission Fee: {fee_policies['admission']['fee'] or 'Not Defined'}")
-        print(f"  - Security Deposit: {fee_policies['admission']['security_deposit'] or 'Not Defined'}")
+    if snap.admission:
+        print(f"\nAdmission Policy (since {snap.admission['effective_from']}):")
+        print(f"  - Admission Fee: {snap.admission['admission_fee']}")
+        print(f"  - Security Deposit: {snap.admission['security_deposit']}")
     else:
         print("\nAdmission Policy: Not Defined")
 
     # Display General Policies
-    if fee_policies["general"]:
+    if snap.general:
         print("\nGeneral Policies (Class Wise):")
-        for policy in fee_policies["general"]:
-            print(f"  - Class: {policy['class_name']}")
+        for policy in sorted(snap.general.values(), key=lambda p: p['class_name']):
+            print(f"  - Class: {policy['class_name']} (since {policy['effective_from']})")
             print(f"    * Monthly Fee: {policy['monthly_fee']}")
             print(f"    * Annual Charges: {policy['annual_charges']}")
             print(f"    * Other Charges: {policy['other_charges']}")
@@ -1565,47 +5810,306 @@ def view_fee_policy():
     else:
         print("\nGeneral Policies: Not Defined")
 
+    if snap.sibling:
+        print(f"\nSibling Discount Policy (since {snap.sibling['effective_from']}):")
+        print(f"  - Second Child: {snap.sibling['second_child_discount']}% off the monthly fee")
+        print(f"  - Third And Later Children: {snap.sibling['later_child_discount']}% off the monthly fee")
+    else:
+        print("\nSibling Discount Policy: Not Defined (no sibling discount)")
+
+    upcoming = fee_policy_cache.upcoming()
+    if upcoming:
+        print("\nScheduled Changes:")
+        for (policy_type, policy) in upcoming:
+            label = f"{policy_type.title()} {policy['class_name']}".strip()
+            amounts = ", ".join(f"{field}: {policy[field]}" for field in FEE_POLICY_FIELDS[policy_type])
+            print(f"  - {label} from {policy['effective_from']}: {amounts}")
+
 def add_registration_policy():
-    global fee_policies
-    registration_fee = input("Enter Registration Fee: ").strip()
-    fee_policies["registration"] = registration_fee
-    print(f"[INFO] Registration policy updated with Registration Fee: {registration_fee}")
+    print("\n-- Add Registration Policy --")
+    amounts = _prompt_amounts([("registration_fee", "Registration Fee")])
+    if amounts is None:
+        return
+    effective_from = prompt_effective_date()
+    if effective_from is None:
+        return
+    if not save_fee_policy("registration", amounts, effective_from):
+        return
+    print(f"[INFO] Registration policy saved with Registration Fee: {amounts['registration_fee']} "
+          f"(effective {effective_from})")
 
 def add_admission_policy():
-    global fee_policies
-    admission_fee = input("Enter Admission Fee: ").strip()
-    security_deposit = input("Enter Security Deposit: ").strip()
-    fee_policies["admission"]["fee"] = admission_fee
-    fee_policies["admission"]["security_deposit"] = security_deposit
-    print(f"[INFO] Admission policy updated with Admission Fee: {admission_fee} and Security Deposit: {security_deposit}")
+    print("\n-- Add Admission Policy --")
+    amounts = _prompt_amounts([("admission_fee", "Admission Fee"), ("security_deposit", "Security Deposit")])
+    if amounts is None:
+        return
+    effective_from = prompt_effective_date()
+    if effective_from is None:
+        return
+    if not save_fee_policy("admission", amounts, effective_from):
+        return
+    print(f"[INFO] Admission policy saved with Admission Fee: {amounts['admission_fee']} and "
+          f"Security Deposit: {amounts['security_deposit']} (effective {effective_from})")
 
 def add_general_policy():
-    global fee_policies
+    """
+    Saves the class-wise policy. Entering a class that already has one
+    adds a new version instead of a second policy; blank amounts are 0.
+    """
     print("\n-- Add General Policy (Class Wise) --")
     class_name = input("Enter Class Name (e.g., Class 1): ").strip()
-    monthly_fee = input("Enter Monthly Fee: ").strip()
-    annual_charges = input("Enter Annual Charges: ").strip()
-    other_charges = input("Enter Other Annual Charges: ").strip()
-    computer_lab_charges = input("Enter Monthly Computer Lab Charges: ").strip()
-    lab_charges = input("Enter Monthly Lab Charges: ").strip()
+    if not class_name or class_name.lower() == 'esc':
+        return
+    amounts = _prompt_amounts([
+        ("monthly_fee", "Monthly Fee"),
+        ("annual_charges", "Annual Charges (once a year)"),
+        ("other_charges", "Other Annual Charges (once a year)"),
+        ("computer_lab_charges", "Monthly Computer Lab Charges"),
+        ("lab_charges", "Monthly Lab Charges"),
+    ], blank=Decimal("0.00"))
+    if amounts is None:
+        return
+    effective_from = prompt_effective_date()
+    if effective_from is None:
+        return
+    if not save_fee_policy("general", amounts, effective_from, class_name):
+        return
+    print(f"[INFO] General policy saved for {class_name} (effective {effective_from}).")
 
-    policy = {
-        "class_name": class_name,
-        "monthly_fee": monthly_fee,
-        "annual_charges": annual_charges,
-        "other_charges": other_charges,
-        "computer_lab_charges": computer_lab_charges,
-        "lab_charges": lab_charges,
-    }
-    fee_policies["general"].append(policy)
-    print(f"[INFO] General policy added for {class_name}.")
+def add_sibling_policy():
+    """
+    Saves the sibling discount percents. Within a family the eldest child
+    pays in full; the discount applies to the monthly fee only.
+    """
+    print("\n-- Add Sibling Discount Policy --")
+    amounts = _prompt_amounts([
+        ("second_child_discount", "Second Child Discount (% of monthly fee)"),
+        ("later_child_discount", "Third And Later Children Discount (% of monthly fee)"),
+    ], blank=Decimal("0.00"))
+    if amounts is None:
+        return
+    if any(percent > 100 for percent in amounts.values()):
+        print("[ERROR] A discount cannot be more than 100%.")
+        return
+    effective_from = prompt_effective_date()
+    if effective_from is None:
+        return
+    if not save_fee_policy("sibling", amounts, effective_from):
+        return
+    print(f"[INFO] Sibling discount policy saved: {amounts['second_child_discount']}% for the second child, "
+          f"{amounts['later_child_discount']}% for the third and later (effective {effective_from}).")
+
+def generate_monthly_fee_vouchers_menu():
+    while True:
+        print("\n--- Generate Monthly Fee Vouchers ---")
+        print("1. Generate Fee Voucher")
+        print("2. View Fee Voucher (Print Option Available)")
+        print("3. Back To Fee Management")
+
+        choice = input("Enter your choice: ").strip()
+
+        if choice == "1":
+            generate_fee_voucher()
+        elif choice == "2":
+            view_fee_voucher()
+        elif choice == "3" or choice.lower() == 'esc':
+            return
+        else:
+            print("Invalid choice. Please try again.")
 
-# Updated fee_management_menu() to use these functions 
 def generate_fee_voucher():
-    print("\n[INFO] Generate Fee Voucher functionality will process fee details and generate vouchers.")
+    print("\n--- Generate Monthly Fee Vouchers ---")
+    billing_month = prompt_billing_month()
+    if billing_month is None:
+        return
+    try:
+        result = generate_monthly_vouchers(billing_month)
+    except Exception as e:
+        print(f"[ERROR] Voucher generation stopped: {e}")
+        print("[INFO] Classes already committed keep their vouchers; run it again to finish the rest.")
+        return
+
+    print(f"\n[INFO] {result['vouchers']:,} vouchers generated for {billing_month:%B %Y} "
+          f"in {result['seconds']:.2f}s ({result['vouchers'] / max(result['seconds'], 1e-9):,.0f} rows/s).")
+    if result['already_billed']:
+        print(f"[INFO] {result['already_billed']:,} students already had a voucher for this month.")
+    for (class_name, count) in sorted(result['no_policy'].items(), key=str):
+        print(f"[WARNING] No general fee policy for class '{class_name}': {count} students not billed.")
+    for (reg_no, error) in result['failed']:
+        print(f"[ERROR] Voucher for RegNo {reg_no} could not be saved: {error}")
 
 def view_fee_voucher():
-    print("\n[INFO] View Fee Voucher functionality will display generated vouchers with print options.")
+    print("\n--- View Fee Voucher ---")
+    key = input("Enter Voucher No, RegNo or GR No, or 'print' to print a month's vouchers ('esc' to cancel): ").strip()
+    if not key or key.lower() == 'esc':
+        return
+    if key.lower() == 'print':
+        billing_month = prompt_billing_month()
+        if billing_month is None:
+            return
+        print_documents("voucher", fetch_voucher_documents,
+                        ["V.VoucherType = 'monthly'", "V.BillingMonth = ?"], [billing_month])
+        return
+    with db_session() as conn:
+        rows = conn.execute(f"""
+            SELECT {', '.join(VOUCHER_COLUMNS)}
+            FROM FeeVouchers
+            WHERE VoucherNo = ? OR RegNo = ? OR RegNo = (SELECT RegNo FROM StudentAdmitted WHERE GRNo = ?)
+            ORDER BY BillingMonth DESC, VoucherType
+        """, key, key, key).fetchall()
+    if not rows:
+        print(f"No vouchers found for '{key}'.")
+        return
+    print(f"\n--- Vouchers for '{key}' ---")
+    for row in rows:
+        v = dict(zip(VOUCHER_COLUMNS, row))
+        print(f"Voucher: {v['VoucherNo']}, RegNo: {v['RegNo']}, GR: {v['GRNo']}, {v['VoucherType'].title()} "
+              f"{db_date(v['BillingMonth']):%b %Y}, Class: {v['ClassName']}, Total: {v['TotalAmount']}, "
+              f"Due: {v['DueDate']}, Status: {v['Status']}")
+    if input("Print these vouchers? (y/N): ").strip().lower() == 'y':
+        print_documents("voucher", fetch_voucher_documents, [f"V.VoucherNo IN ({', '.join('?' for _ in rows)})"],
+                        [row[0] for row in rows], combined=True)
+
+###############################################################################
+# 3.1 Monthly fee vouchers (batch engine)
+###############################################################################
+#
+# A month's vouchers are generated in one pass: the roster of active
+# admitted students not yet billed for the month is read with one query,
+# amounts are worked out once per class (and per sibling-discount / annual
+# charge combination) instead of once per student, and the vouchers of each
+# class are bulk inserted and committed together. Re-running a month only
+# bills the students who are still missing a voucher; the unique key on
+# (RegNo, VoucherType, BillingMonth) backs that up.
+
+VOUCHER_DUE_DAY = 10  # vouchers are due on this day of the billing month
+
+VOUCHER_COLUMNS = (
+    "VoucherNo", "RegNo", "GRNo", "VoucherType", "BillingMonth", "ClassName",
+    "MonthlyFee", "ComputerLabCharges", "LabCharges", "AnnualCharges", "OtherCharges",
+    "AdmissionFee", "SecurityDeposit", "SiblingDiscount", "TotalAmount", "DueDate",
+    "Status", "PaidAmount", "PaidOn",
+)
+# The columns a new voucher is inserted with (Status etc. take their defaults)
+VOUCHER_INSERT_COLUMNS = VOUCHER_COLUMNS[:VOUCHER_COLUMNS.index("Status")]
+
+def prompt_billing_month():
+    """
+    Asks for a month as YYYY-MM (default: this month). Returns the first
+    day of the month as a date, or None if invalid or cancelled.
+    """
+    default = date.today().replace(day=1)
+    text = input(f"Billing month (YYYY-MM, Enter for {default:%Y-%m}): ").strip()
+    if text.lower() == 'esc':
+        return None
+    if not text:
+        return default
+    try:
+        return datetime.strptime(text, "%Y-%m").date()
+    except ValueError:
+        print("[ERROR] Invalid month. Use YYYY-MM.")
+        return None
+
+def academic_year_start(day):
+    """
+    First day of the academic year `day` falls in (see current_academic_year).
+    """
+    year = day.year if day.month >= ACADEMIC_YEAR_START_MONTH else day.year - 1
+    return date(year, ACADEMIC_YEAR_START_MONTH, 1)
+
+def reserve_voucher_numbers(cursor, billing_month, count):
+    """
+    `count` new voucher numbers for a billing month (YYYYMM + 5 digits,
+    e.g. 20250500042), reserved in the caller's transaction.
+    """
+    first = reserve_sequence_block(cursor, f"FeeVoucher:{billing_month:%Y%m}", count, lambda _cursor: 1)
+    return [f"{billing_month:%Y%m}{n:05d}" for n in range(first, first + count)]
+
+_MONTHLY_ROSTER_SQL = """
+    SELECT A.RegNo, A.GRNo, A.ClassName, R.ChildDOB,
+           CASE WHEN EXISTS (SELECT 1 FROM FeeVouchers P
+                             WHERE P.RegNo = A.RegNo AND P.VoucherType = 'monthly'
+                               AND P.BillingMonth >= ? AND P.BillingMonth < ?
+                               AND P.AnnualCharges + P.OtherCharges > 0)
+                THEN 0 ELSE 1 END AS OwesAnnual
+    FROM StudentAdmitted A
+    JOIN StudentRegistration R ON R.RegNo = A.RegNo
+    WHERE R.IsActive = 1
+      AND NOT EXISTS (SELECT 1 FROM FeeVouchers V
+                      WHERE V.RegNo = A.RegNo AND V.VoucherType = 'monthly' AND V.BillingMonth = ?)
+"""
+
+def _class_voucher_amounts(policy, discount_percent, owes_annual):
+    """
+    Amount columns (MonthlyFee .. TotalAmount) of a monthly voucher.
+    The sibling discount applies to the monthly (tuition) fee only; the
+    annual charges are billed on the first voucher of the academic year.
+    """
+    monthly = policy["monthly_fee"]
+    annual = policy["annual_charges"] if owes_annual else Decimal("0.00")
+    other = policy["other_charges"] if owes_annual else Decimal("0.00")
+    discount = (monthly * discount_percent / 100).quantize(Decimal("0.01"))
+    total = monthly + policy["computer_lab_charges"] + policy["lab_charges"] + annual + other - discount
+    return (monthly, policy["computer_lab_charges"], policy["lab_charges"], annual, other,
+            Decimal("0.00"), Decimal("0.00"), discount, total)
+
+def generate_monthly_vouchers(billing_month):
+    """
+    Generates the monthly vouchers of every active admitted student for
+    `billing_month` (any date in the month). Safe to run again for the same
+    month. Returns a summary dict: vouchers, already_billed, no_policy
+    ({class: students}), failed ([(RegNo, error)]) and seconds.
+    """
+    billing_month = billing_month.replace(day=1)
+    due_date = billing_month.replace(day=VOUCHER_DUE_DAY)
+    started = time.perf_counter()
+
+    fee_policy_cache.refresh(force=True)
+    policies = fee_policy_cache.snapshot(billing_month)
+    summary = {"vouchers": 0, "already_billed": 0, "no_policy": Counter(), "failed": [], "seconds": 0.0}
+
+    with db_session() as conn:
+        cursor = conn.cursor()
+        roster = cursor.execute(_MONTHLY_ROSTER_SQL, academic_year_start(billing_month), billing_month,
+                                billing_month).fetchall()
+        summary["already_billed"] = cursor.execute(
+            "SELECT COUNT(*) FROM FeeVouchers WHERE VoucherType = 'monthly' AND BillingMonth = ?",
+            billing_month).fetchone()[0]
+
+        # Siblings are ranked eldest first; unknown birth dates go last
+        dob = {row[0]: row[3] or "9999" for row in roster}
+        discounts = get_family_index().sibling_discounts(list(dob), policies.sibling_discount_percents(),
+                                                         order_key=lambda r: (dob[r], r))
+
+        by_class = defaultdict(list)
+        for row in roster:
+            by_class[class_key(row[2])].append(row)
+
+        for (cls, students) in sorted(by_class.items()):
+            policy = policies.general.get(cls)
+            if policy is None:
+                summary["no_policy"][students[0][2] or "(no class)"] += len(students)
+                continue
+
+            amounts = {}  # (discount %, owes annual) -> amount columns, computed once per class
+            voucher_nos = reserve_voucher_numbers(cursor, billing_month, len(students))
+            rows = []
+            for (voucher_no, (reg_no, gr_no, class_name, _dob, owes_annual)) in zip(voucher_nos, students):
+                combo = (discounts.get(reg_no, 0), bool(owes_annual))
+                values = amounts.get(combo)
+                if values is None:
+                    values = amounts[combo] = _class_voucher_amounts(policy, *combo)
+                rows.append((reg_no, (voucher_no, reg_no, gr_no, "monthly", billing_month, class_name)
+                             + values + (due_date,)))
+
+            inserted, failed = bulk_insert(cursor, "FeeVouchers", VOUCHER_INSERT_COLUMNS, rows)
+            conn.commit()
+            summary["vouchers"] += len(inserted)
+            summary["failed"].extend(failed)
+        cursor.close()
+
+    summary["seconds"] = time.perf_counter() - started
+    return summary
 
 
 ###############################################################################
@@ -1644,7 +6148,37 @@ def report_class_list():
     Class ________  Sec ________
     Display class teacher/subject teacher, then all students with GRNo, Student Name, Remarks column
     """
-    print("\n[INFO] Class List Report - NOT IMPLEMENTED (Placeholder)")
+    print("\n--- Class List ---")
+    academic_year = prompt_academic_year()
+    if academic_year is None:
+        return
+    class_name = input("Class (Enter for every class): ").strip()
+    if class_name.lower() == 'esc':
+        return
+    section = input("Section (Enter for every section): ").strip() if class_name else ""
+    fmt = input("Output: (S)creen, (C)SV or (H)TML? (Enter for screen): ").strip().lower()
+    if fmt == 'esc':
+        return
+    fmt = {"c": "csv", "h": "html"}.get(fmt[:1], "text")
+
+    if fmt == "text":
+        counts = write_class_list(sys.stdout, fmt, academic_year, class_name or None, section or None)
+    else:
+        default = os.path.join(DOCUMENTS_DIR, f"class_list_{academic_year}.{fmt}")
+        path = input(f"Output file (Enter for {default}): ").strip() or default
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, mode='w', newline='', encoding='utf-8') as out:
+                counts = write_class_list(out, fmt, academic_year, class_name or None, section or None)
+        except OSError as e:
+            print(f"[ERROR] Could not write the class list: {e}")
+            return
+        print(f"[INFO] Class list written to {path}")
+    if not counts["classes"]:
+        print("[INFO] No matching classes found.")
+        return
+    print(f"[INFO] {counts['classes']} class/sections, {counts['students']} students, "
+          f"{counts['teachers']} teacher assignments ({counts['seconds']:.2f}s).")
 
 def report_marks_sheet():
     """
@@ -1652,28 +6186,1042 @@ def report_marks_sheet():
     Class ________  Sec ________
     Contain the same info as class list but with marks, percentage, grade, etc.
     """
-    print("\n[INFO] Marks Sheet Report - NOT IMPLEMENTED (Placeholder)")
+    print("\n--- Marks Sheet ---")
+    report_sheets("marks")
 
 def report_tabulation_sheet():
     """
     For class teachers/management only. 
     Consolidates all subjects in one sheet.
     """
-    print("\n[INFO] Tabulation Sheet Report - NOT IMPLEMENTED (Placeholder)")
+    print("\n--- Tabulation Sheet ---")
+    report_sheets("tabulation")
+
+def report_sheets(kind):
+    """
+    Menu helper for the tabulation and marks sheets: one class/section, a
+    class or the whole school, to the screen or a CSV/HTML file.
+    """
+    if np is None:
+        print(f"[ERROR] {NUMPY_MISSING}")
+        return
+    academic_year = prompt_academic_year()
+    if academic_year is None:
+        return
+    term = input("Enter term (e.g. Final): ").strip()
+    if not term or term.lower() == 'esc':
+        return
+    key = input("Enter a class (e.g. 'Class 1' or 'Class 1/A'), or Enter for all: ").strip()
+    if key.lower() == 'esc':
+        return
+    (class_name, _slash, section) = key.partition("/")
+    subject = None
+    if kind == "marks":
+        subject = input("Subject (Enter for every subject): ").strip() or None
+    fmt = input("Output: (S)creen, (C)SV or (H)TML? (Enter for screen): ").strip().lower()
+    if fmt == 'esc':
+        return
+    fmt = {"c": "csv", "h": "html"}.get(fmt[:1], "text")
+
+    def write(out):
+        batch = load_tabulation(academic_year, term, class_name.strip() or None, section.strip() or None)
+        write_sheets(out, fmt, kind, batch, f"{academic_year} {term}", subject)
+        return batch
+
+    try:
+        if fmt == "text":
+            batch = write(sys.stdout)
+        else:
+            default = os.path.join(DOCUMENTS_DIR, f"{kind}_{academic_year}_{term}.{fmt}".replace(" ", "_"))
+            path = input(f"Output file (Enter for {default}): ").strip() or default
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, mode='w', newline='', encoding='utf-8') as out:
+                batch = write(out)
+            print(f"[INFO] {kind.title()} sheets written to {path}")
+    except OSError as e:
+        print(f"[ERROR] Could not write the sheets: {e}")
+        return
+    if not batch.groups:
+        print("[INFO] No marks found. StudentMarks is filled outside this program.")
+        return
+    print(f"[INFO] {len(batch.groups)} class/sections, {len(batch.gr_nos)} students, "
+          f"{len(batch.subjects)} subjects ({batch.seconds * 1000:.0f} ms to tabulate).")
 
 def report_individual_cards():
     """
-    For individual student(s) by GRNo or by name
+    For individual student(s) by GRNo, or a whole class/section, or everyone
+    """
+    print("\n--- Individual Report Cards ---")
+    academic_year = prompt_academic_year()
+    if not academic_year:
+        return
+    term = input("Enter term (e.g. Final): ").strip()
+    if not term or term.lower() == 'esc':
+        return
+    key = input("Enter a GR No, a class (e.g. 'Class 1' or 'Class 1/A'), or Enter for all: ").strip()
+    if key.lower() == 'esc':
+        return
+
+    where = ["M.AcademicYear = ?", "M.Term = ?"]
+    params = [academic_year, term]
+    if key.isdigit():
+        where.append("A.GRNo = ?")
+        params.append(key)
+    elif key:
+        (class_name, _slash, section) = key.partition("/")
+        where.append("A.ClassName = ?")
+        params.append(class_name.strip())
+        if section.strip():
+            where.append("A.Section = ?")
+            params.append(section.strip())
+    print_documents("report_card", fetch_report_card_documents, where, params, combined=key.isdigit())
+
+
+###############################################################################
+# 4.1 Printable documents (rendering pipeline)
+###############################################################################
+#
+# Vouchers and report cards are rendered from string.Template layouts,
+# compiled once per process. Documents are fetched in one streaming query,
+# rendered in chunks by a process pool (results come back in order) and
+# written as they arrive: one file per class/section or one combined file,
+# as plain text or HTML, so output can be checked without a printer.
+
+SCHOOL_NAME = "TFS"
+DOCUMENTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "documents")
+RENDER_WORKERS = os.cpu_count() or 1  # processes rendering documents
+RENDER_CHUNK = 200                    # documents handed to a worker at a time
+
+# Grade by percentage: the first band whose lower limit is reached
+GRADE_BANDS = ((80, "A+"), (70, "A"), (60, "B"), (50, "C"), (40, "D"), (0, "F"))
+
+def grade_for(percentage):
+    for (lower, grade) in GRADE_BANDS:
+        if percentage >= lower:
+            return grade
+    return GRADE_BANDS[-1][1]
+
+_VOUCHER_LINES = (
+    ("MonthlyFee", "Monthly Fee"),
+    ("ComputerLabCharges", "Computer Lab Charges"),
+    ("LabCharges", "Lab Charges"),
+    ("AnnualCharges", "Annual Charges"),
+    ("OtherCharges", "Other Annual Charges"),
+    ("AdmissionFee", "Admission Fee"),
+    ("SecurityDeposit", "Security Deposit"),
+)
+
+_TEMPLATE_SOURCES = {
+    ("voucher", "text"): """\
+==============================================================
+$school - $title
+--------------------------------------------------------------
+Voucher No : $voucher_no
+Due Date   : $due_date
+RegNo      : $reg_no        GR No: $gr_no
+Student    : $child_name
+Father     : $father_name
+Class      : $class_name    Month: $month
+--------------------------------------------------------------
+$lines
+--------------------------------------------------------------
+TOTAL PAYABLE$total
+Status: $status
+==============================================================
+
+""",
+    ("voucher", "html"): """\
+<div class="doc">
+<h2>$school - $title</h2>
+<table class="head">
+<tr><th>Voucher No</th><td>$voucher_no</td><th>Due Date</th><td>$due_date</td></tr>
+<tr><th>RegNo</th><td>$reg_no</td><th>GR No</th><td>$gr_no</td></tr>
+<tr><th>Student</th><td>$child_name</td><th>Father</th><td>$father_name</td></tr>
+<tr><th>Class</th><td>$class_name</td><th>Month</th><td>$month</td></tr>
+</table>
+<table class="lines">
+$lines
+<tr class="total"><th>Total Payable</th><td>$total</td></tr>
+</table>
+<p>Status: $status</p>
+</div>
+""",
+    ("report_card", "text"): """\
+==============================================================
+$school - Report Card - $academic_year - $term
+--------------------------------------------------------------
+GR No   : $gr_no
+Student : $child_name
+Father  : $father_name
+Class   : $class_name
+--------------------------------------------------------------
+Subject                         Obtained    Total       %
+$lines
+--------------------------------------------------------------
+$totals
+Grade: $grade
+==============================================================
+
+""",
+    ("report_card", "html"): """\
+<div class="doc">
+<h2>$school - Report Card - $academic_year - $term</h2>
+<table class="head">
+<tr><th>GR No</th><td>$gr_no</td><th>Class</th><td>$class_name</td></tr>
+<tr><th>Student</th><td>$child_name</td><th>Father</th><td>$father_name</td></tr>
+</table>
+<table class="lines">
+<tr><th>Subject</th><th>Obtained</th><th>Total</th><th>%</th></tr>
+$lines
+<tr class="total"><th>Total</th><td>$obtained</td><td>$total_marks</td><td>$percentage</td></tr>
+</table>
+<p>Grade: $grade</p>
+</div>
+""",
+}
+
+_HTML_HEAD = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>$title</title>
+<style>
+body { font-family: sans-serif; font-size: 12px; }
+.doc { page-break-after: always; border: 1px solid #000; padding: 8px; margin-bottom: 12px; }
+table { border-collapse: collapse; width: 100%; }
+th, td { border: 1px solid #999; padding: 2px 6px; text-align: left; }
+tr.total th, tr.total td { font-weight: bold; }
+</style></head><body>
+"""
+_HTML_TAIL = "</body></html>\n"
+
+_compiled_templates = {}
+
+def document_template(kind, fmt):
+    """
+    The compiled Template for a document kind and format (once per process).
+    """
+    template = _compiled_templates.get((kind, fmt))
+    if template is None:
+        template = _compiled_templates[(kind, fmt)] = Template(_TEMPLATE_SOURCES[(kind, fmt)])
+    return template
+
+def _voucher_fields(doc, fmt):
+    lines = [(label, doc[col]) for (col, label) in _VOUCHER_LINES if doc[col]]
+    if doc["SiblingDiscount"]:
+        lines.append(("Sibling Discount", -doc["SiblingDiscount"]))
+    if fmt == "html":
+        lines = "\n".join(f"<tr><th>{escape(label)}</th><td>{amount:,.2f}</td></tr>" for (label, amount) in lines)
+    else:
+        lines = "\n".join(f"{label:<40}{amount:>14,.2f}" for (label, amount) in lines)
+    class_name = " ".join(str(part) for part in (doc["ClassName"], doc["Section"]) if part)
+    return {
+        "title": "Admission Fee Voucher" if doc["VoucherType"] == "admission" else "Monthly Fee Voucher",
+        "voucher_no": doc["VoucherNo"],
+        "due_date": doc["DueDate"] or "",
+        "reg_no": doc["RegNo"],
+        "gr_no": doc["GRNo"] or "-",
+        "child_name": doc["ChildName"],
+        "father_name": doc["FatherName"],
+        "class_name": class_name,
+        "month": f"{doc['BillingMonth']:%B %Y}",
+        "total": f"{doc['TotalAmount']:,.2f}" if fmt == "html" else f"{doc['TotalAmount']:>41,.2f}",
+        "status": doc["Status"],
+    }, lines
+
+def _report_card_fields(doc, fmt):
+    rows = []
+    obtained_sum = Decimal(0)
+    total_sum = Decimal(0)
+    for (subject, obtained, total) in doc["marks"]:
+        obtained_sum += obtained or 0
+        total_sum += total
+        percentage = (obtained or 0) * 100 / total if total else 0
+        rows.append((subject, "-" if obtained is None else f"{obtained:.2f}", f"{total:.2f}", f"{percentage:.1f}"))
+    if fmt == "html":
+        lines = "\n".join("<tr>" + "".join(f"<td>{escape(cell)}</td>" for cell in row) + "</tr>" for row in rows)
+    else:
+        lines = "\n".join(f"{subject[:30]:<30}{obtained:>10}{total:>9}{pct:>8}" for (subject, obtained, total, pct) in rows)
+    percentage = obtained_sum * 100 / total_sum if total_sum else Decimal(0)
+    totals = f"{'Total':<30}{obtained_sum:>10.2f}{total_sum:>9.2f}{percentage:>8.1f}"
+    return {
+        "academic_year": doc["AcademicYear"],
+        "term": doc["Term"],
+        "gr_no": doc["GRNo"],
+        "child_name": doc["ChildName"],
+        "father_name": doc["FatherName"],
+        "class_name": " ".join(part for part in (doc["ClassName"], doc["Section"]) if part),
+        "obtained": f"{obtained_sum:.2f}",
+        "total_marks": f"{total_sum:.2f}",
+        "percentage": f"{percentage:.1f}%",
+        "grade": grade_for(percentage),
+        "totals": totals,
+    }, lines
+
+_DOCUMENT_FIELDS = {"voucher": _voucher_fields, "report_card": _report_card_fields}
+
+def _render_chunk(kind, fmt, docs):
+    """
+    Worker entry point: renders a list of documents to strings.
+    """
+    template = document_template(kind, fmt)
+    fields_for = _DOCUMENT_FIELDS[kind]
+    out = []
+    for doc in docs:
+        fields, lines = fields_for(doc, fmt)
+        if fmt == "html":
+            fields = {key: escape(str(value)) for (key, value) in fields.items()}
+        fields["lines"] = lines
+        fields["school"] = escape(SCHOOL_NAME) if fmt == "html" else SCHOOL_NAME
+        out.append(template.substitute(fields))
+    return out
+
+def _chunked(documents, chunk_size):
+    chunk = []
+    for item in documents:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _rendered_chunks(kind, fmt, documents, workers, chunk_size):
+    """
+    Yields (chunk, texts) in document order; with workers > 1 the rendering
+    runs in a process pool with at most two chunks per worker in flight.
+    """
+    chunks = _chunked(documents, chunk_size)
+    if workers <= 1:
+        for chunk in chunks:
+            yield chunk, _render_chunk(kind, fmt, [doc for (_group, doc) in chunk])
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = deque()
+        for chunk in chunks:
+            in_flight.append((chunk, pool.submit(_render_chunk, kind, fmt, [doc for (_group, doc) in chunk])))
+            if len(in_flight) >= workers * 2:
+                (done, future) = in_flight.popleft()
+                yield done, future.result()
+        while in_flight:
+            (done, future) = in_flight.popleft()
+            yield done, future.result()
+
+def render_documents(kind, fmt, documents, output_dir=DOCUMENTS_DIR, combined=False, name=None,
+                     workers=RENDER_WORKERS, chunk_size=RENDER_CHUNK, progress=True):
+    """
+    Renders `documents` ((group, doc) pairs, grouped by class/section) to
+    files in output_dir: <name>_<group>.txt|.html per group, or a single
+    <name>.txt|.html when combined. Returns (documents written, file paths,
+    seconds).
+    """
+    name = name or kind
+    ext = "html" if fmt == "html" else "txt"
+    os.makedirs(output_dir, exist_ok=True)
+    started = time.perf_counter()
+    files = []
+    outputs = {}  # file name (lower case) -> open file; each file is opened once per run
+    out = None
+    out_group = None
+    count = 0
+
+    def open_output(label):
+        # "Class 1", "class 1" and "Class 1 " can interleave in SQL order but
+        # share a file name (and one file on case-insensitive disks)
+        safe = re.sub(r"[^A-Za-z0-9_-]+", "_", label).strip("_") or "unassigned"
+        file_name = f"{name}.{ext}" if combined else f"{name}_{safe}.{ext}"
+        f = outputs.get(file_name.lower())
+        if f is None:
+            path = os.path.join(output_dir, file_name)
+            f = outputs[file_name.lower()] = open(path, 'w', encoding='utf-8')
+            if fmt == "html":
+                f.write(Template(_HTML_HEAD).substitute(title=escape(f"{SCHOOL_NAME} {name} {label}".strip())))
+            files.append(path)
+        return f
+
+    def close_output(f):
+        if fmt == "html":
+            f.write(_HTML_TAIL)
+        f.close()
+
+    try:
+        for (chunk, texts) in _rendered_chunks(kind, fmt, documents, workers, chunk_size):
+            for ((group, _doc), text) in zip(chunk, texts):
+                if out is None or (not combined and group != out_group):
+                    out = open_output("" if combined else group)
+                    out_group = group
+                out.write(text)
+            count += len(chunk)
+            if progress:
+                elapsed = time.perf_counter() - started
+                print(f"\r  ... {count:,} documents ({count / max(elapsed, 1e-9):,.0f} docs/s)", end="", flush=True)
+    finally:
+        for f in outputs.values():
+            close_output(f)
+        if progress and count:
+            print()
+    return count, files, time.perf_counter() - started
+
+def fetch_voucher_documents(conn, where, params, batch_size=1000):
+    """
+    Streams (group, voucher dict) for the FeeVouchers rows matching `where`
+    (conditions on V = FeeVouchers, R = StudentRegistration, A = StudentAdmitted),
+    ordered by class and section.
+    """
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT V.VoucherNo, V.RegNo, V.GRNo, V.VoucherType, V.BillingMonth, V.ClassName, A.Section,
+               R.ChildName, R.FatherName, V.MonthlyFee, V.ComputerLabCharges, V.LabCharges,
+               V.AnnualCharges, V.OtherCharges, V.AdmissionFee, V.SecurityDeposit, V.SiblingDiscount,
+               V.TotalAmount, V.DueDate, V.Status
+        FROM FeeVouchers V
+        JOIN StudentRegistration R ON R.RegNo = V.RegNo
+        LEFT JOIN StudentAdmitted A ON A.RegNo = V.RegNo
+        WHERE {' AND '.join(where)}
+        ORDER BY V.ClassName, A.Section, V.VoucherNo
+    """, *params)
+    columns = [d[0] for d in cursor.description]
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        for row in rows:
+            doc = dict(zip(columns, row))
+            doc["BillingMonth"] = db_date(doc["BillingMonth"])
+            doc["DueDate"] = db_date(doc["DueDate"])
+            yield f"{doc['ClassName'] or ''} {doc['Section'] or ''}".strip(), doc
+    cursor.close()
+
+def fetch_report_card_documents(conn, where, params, batch_size=1000):
+    """
+    Streams (group, report card dict) from StudentMarks (M) for the students
+    (A = StudentAdmitted, R = StudentRegistration) matching `where`; each
+    card holds the student's (subject, obtained, total) marks.
+    """
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT M.AcademicYear, M.Term, A.GRNo, R.ChildName, R.FatherName, A.ClassName, A.Section,
+               M.Subject, M.ObtainedMarks, M.TotalMarks
+        FROM StudentMarks M
+        JOIN StudentAdmitted A ON A.GRNo = M.GRNo
+        JOIN StudentRegistration R ON R.RegNo = A.RegNo
+        WHERE {' AND '.join(where)}
+        ORDER BY A.ClassName, A.Section, A.GRNo, M.Subject
+    """, *params)
+    card = None
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        for (year, term, gr_no, child, father, class_name, section, subject, obtained, total) in rows:
+            if card is None or card["GRNo"] != gr_no:
+                if card is not None:
+                    yield f"{card['ClassName'] or ''} {card['Section'] or ''}".strip(), card
+                card = {"AcademicYear": year, "Term": term, "GRNo": gr_no, "ChildName": child,
+                        "FatherName": father, "ClassName": class_name, "Section": section, "marks": []}
+            card["marks"].append((subject, obtained, total))
+    if card is not None:
+        yield f"{card['ClassName'] or ''} {card['Section'] or ''}".strip(), card
+    cursor.close()
+
+def prompt_render_options(combined=False):
+    """
+    Asks for the output format and folder (and whether to split the output
+    per class). Returns (fmt, combined, output_dir), or None if cancelled.
+    """
+    fmt = input("Output format: (T)ext or (H)TML? (Enter for text): ").strip().lower()
+    if fmt == 'esc':
+        return None
+    fmt = "html" if fmt.startswith("h") else "text"
+    if not combined:
+        split = input("One file per class/section? (Y/n): ").strip().lower()
+        if split == 'esc':
+            return None
+        combined = split.startswith("n")
+    output_dir = input(f"Output folder (Enter for {DOCUMENTS_DIR}): ").strip() or DOCUMENTS_DIR
+    return fmt, combined, output_dir
+
+def print_documents(kind, fetch, where, params, combined=False):
     """
-    print("\n[INFO] Individual Report Cards - NOT IMPLEMENTED (Placeholder)")
+    Menu helper: asks for the output options, then streams `fetch`'s
+    documents through render_documents.
+    """
+    options = prompt_render_options(combined)
+    if options is None:
+        return
+    (fmt, combined, output_dir) = options
+    try:
+        with db_session() as conn:
+            (count, files, seconds) = render_documents(kind, fmt, fetch(conn, where, params),
+                                                       output_dir, combined=combined)
+    except OSError as e:
+        print(f"[ERROR] Could not write the documents: {e}")
+        return
+    if not count:
+        print("[INFO] Nothing to print.")
+        return
+    print(f"[INFO] {count:,} documents written to {len(files)} file(s) in {output_dir} "
+          f"({seconds:.2f}s, {count / max(seconds, 1e-9):,.0f} docs/s).")
+
+def benchmark_rendering(documents=10_000, seed=5):
+    """
+    Renders synthetic vouchers as text and HTML, in this process and in the
+    pool, into a temporary folder.
+    """
+    import random
+    import shutil
+    import tempfile
+    rng = random.Random(seed)
+    zero = Decimal("0.00")
+    docs = []
+    for i in range(documents):
+        class_name = f"Class {i % 10 + 1}"
+        monthly = Decimal(rng.choice([3000, 3500, 4000, 4500]))
+        discount = monthly / 10 if i % 7 == 0 else zero
+        docs.append((f"{class_name} {'AB'[i % 2]}", {
+            "VoucherNo": f"202504{i:05d}", "RegNo": f"2025{i:06d}", "GRNo": str(1000 + i),
+            "VoucherType": "monthly", "BillingMonth": date(2025, 4, 1), "ClassName": class_name,
+            "Section": "AB"[i % 2], "ChildName": f"Student {i}", "FatherName": f"Father {i}",
+            "MonthlyFee": monthly, "ComputerLabCharges": Decimal(300), "LabCharges": Decimal(200),
+            "AnnualCharges": Decimal(5000), "OtherCharges": zero, "AdmissionFee": zero,
+            "SecurityDeposit": zero, "SiblingDiscount": discount,
+            "TotalAmount": monthly + 5500 - discount, "DueDate": date(2025, 4, 10), "Status": "unpaid",
+        }))
+    docs.sort(key=lambda item: item[0])
+
+    output_dir = tempfile.mkdtemp(prefix="tfs_render_")
+    print(f"\n--- Rendering benchmark ({documents:,} vouchers, {RENDER_WORKERS} workers) ---")
+    try:
+        for fmt in ("text", "html"):
+            for workers in sorted({1, RENDER_WORKERS}):
+                (count, files, seconds) = render_documents("voucher", fmt, iter(docs), output_dir,
+                                                           workers=workers, progress=False)
+                print(f"  {fmt:<5} workers={workers:<3} {count / seconds:>10,.0f} docs/s   ({len(files)} files)")
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+###############################################################################
+# 4.2 Class lists
+###############################################################################
+#
+# One query returns the teachers and the active students of every matching
+# class/section, already in print order (class teacher, subject teachers,
+# then students by GR No). Rows are fetched in batches and handed straight
+# to a formatter, which writes each class/section as it goes, so a whole
+# school's list never sits in memory.
+
+CLASS_LIST_BATCH = 500
+
+# Kind of row in the class list query, also its order within a class/section
+CLASS_TEACHER, SUBJECT_TEACHER, STUDENT = 0, 1, 2
+
+_CLASS_LIST_SQL = """
+    SELECT ClassName, Section, Kind, Number, Name, Detail
+    FROM (
+        SELECT TC.ClassName, TC.Section,
+               CASE WHEN T.IsClassTeacher = 1 THEN 0 ELSE 1 END AS Kind,
+               T.Name AS SortKey, CAST(T.ID AS VARCHAR(20)) AS Number, T.Name, T.Subjects AS Detail
+        FROM TeacherClasses TC
+        JOIN Teachers T ON T.ID = TC.TeacherID
+        WHERE {teacher_where}
+        UNION ALL
+        SELECT A.ClassName, A.Section, 2, A.GRNo, A.GRNo, R.ChildName, R.FatherName
+        FROM StudentAdmitted A
+        JOIN StudentRegistration R ON R.RegNo = A.RegNo
+        WHERE R.IsActive = 1 AND A.AcademicYear = ?{student_where}
+    ) L
+    ORDER BY ClassName, Section, Kind, SortKey
+"""
+
+def iter_class_list(conn, academic_year, class_name=None, section=None, batch_size=CLASS_LIST_BATCH):
+    """
+    Streams (ClassName, Section, kind, number, name, detail) rows for the
+    class list; kind is CLASS_TEACHER, SUBJECT_TEACHER or STUDENT, number is
+    the teacher ID or GR No and detail the subjects or the father's name.
+    """
+    teacher_where, student_where = ["1 = 1"], ""
+    teacher_params, student_params = [], [academic_year]
+    for (column, value) in (("ClassName", class_name), ("Section", section)):
+        if value:
+            teacher_where.append(f"TC.{column} = ?")
+            teacher_params.append(value)
+            student_where += f" AND A.{column} = ?"
+            student_params.append(value)
+    sql = _CLASS_LIST_SQL.format(teacher_where=" AND ".join(teacher_where), student_where=student_where)
+    cursor = conn.cursor()
+    cursor.execute(sql, *teacher_params, *student_params)
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        yield from rows
+    cursor.close()
+
+class ClassListText:
+    """
+    Fixed-width layout for the terminal (or a .txt file). The CSV and HTML
+    formatters below have the same methods, called in this order: begin,
+    then per class/section start_group, teacher..., student..., end_group,
+    and finally end.
+    """
+    def __init__(self, out, title):
+        self.out = out
+        self.title = title
+        self.students = 0
+
+    def begin(self):
+        pass
+
+    def start_group(self, class_name, section):
+        self.out.write(f"\n{'=' * 72}\n{self.title}\nClass: {class_name or '-':<20}  Sec: {section or '-'}\n"
+                       f"{'-' * 72}\n")
+        self.students = 0
+
+    def teacher(self, kind, teacher_id, name, subjects):
+        role = "Class Teacher" if kind == CLASS_TEACHER else "Subject Teacher"
+        self.out.write(f"{role:<16}: {name}" + (f" ({subjects})" if subjects else "") + "\n")
+
+    def student(self, gr_no, name, father):
+        if not self.students:
+            self.out.write(f"{'-' * 72}\n{'#':>4}  {'GR No':<8}{'Student Name':<30}Remarks\n")
+        self.students += 1
+        self.out.write(f"{self.students:>4}  {gr_no:<8}{(name or '')[:29]:<30}{'_' * 26}\n")
+
+    def end_group(self):
+        self.out.write(f"{'-' * 72}\nTotal students: {self.students}\n")
+
+    def end(self):
+        pass
+
+class ClassListCSV(ClassListText):
+    """
+    One row per teacher or student, with the class and section on every row.
+    """
+    def begin(self):
+        self.writer = csv.writer(self.out)
+        self.writer.writerow(["Class", "Section", "Role", "No", "GR No / Teacher ID", "Name", "Subjects", "Remarks"])
+
+    def start_group(self, class_name, section):
+        self.group = [class_name, section]
+        self.students = 0
+
+    def teacher(self, kind, teacher_id, name, subjects):
+        role = "Class Teacher" if kind == CLASS_TEACHER else "Subject Teacher"
+        self.writer.writerow(self.group + [role, "", teacher_id, name, subjects or "", ""])
+
+    def student(self, gr_no, name, father):
+        self.students += 1
+        self.writer.writerow(self.group + ["Student", self.students, gr_no, name, "", ""])
+
+    def end_group(self):
+        pass
+
+class ClassListHTML(ClassListText):
+    """
+    One printable page per class/section, styled like the other documents.
+    """
+    def begin(self):
+        self.out.write(Template(_HTML_HEAD).substitute(title=escape(self.title)))
+
+    def start_group(self, class_name, section):
+        self.out.write(f'<div class="doc">\n<h2>{escape(self.title)}</h2>\n'
+                       f"<p>Class: {escape(class_name or '-')} &nbsp; Sec: {escape(section or '-')}</p>\n"
+                       '<table class="head">\n')
+        self.students = 0
+
+    def teacher(self, kind, teacher_id, name, subjects):
+        role = "Class Teacher" if kind == CLASS_TEACHER else "Subject Teacher"
+        self.out.write(f"<tr><th>{role}</th><td>{escape(name or '')}</td><td>{escape(subjects or '')}</td></tr>\n")
+
+    def student(self, gr_no, name, father):
+        if not self.students:
+            self.out.write('</table>\n<table class="lines">\n'
+                           "<tr><th>#</th><th>GR No</th><th>Student Name</th><th>Remarks</th></tr>\n")
+        self.students += 1
+        self.out.write(f"<tr><td>{self.students}</td><td>{escape(gr_no)}</td><td>{escape(name or '')}</td>"
+                       "<td></td></tr>\n")
 
+    def end_group(self):
+        self.out.write(f"</table>\n<p>Total students: {self.students}</p>\n</div>\n")
+
+    def end(self):
+        self.out.write(_HTML_TAIL)
+
+CLASS_LIST_FORMATTERS = {"text": ClassListText, "csv": ClassListCSV, "html": ClassListHTML}
+
+def write_class_list(out, fmt, academic_year, class_name=None, section=None):
+    """
+    Writes the class list of one class/section, a class, or every class of
+    `academic_year` to the open file `out` as "text", "csv" or "html".
+    Returns counts: classes (class/sections written), teachers, students, seconds.
+    """
+    started = time.perf_counter()
+    formatter = CLASS_LIST_FORMATTERS[fmt](out, f"{SCHOOL_NAME} - Class List - {academic_year}")
+    counts = {"classes": 0, "teachers": 0, "students": 0}
+    current = None
+    formatter.begin()
+    with db_session() as conn:
+        for (cls, sec, kind, number, name, detail) in iter_class_list(conn, academic_year, class_name, section):
+            group = (class_key(cls), class_key(sec))  # teachers and students may differ in case/spacing
+            if group != current:
+                if current is not None:
+                    formatter.end_group()
+                current = group
+                formatter.start_group(cls, sec)
+                counts["classes"] += 1
+            if kind == STUDENT:
+                formatter.student(number, name, detail)
+                counts["students"] += 1
+            else:
+                formatter.teacher(kind, number, name, detail)
+                counts["teachers"] += 1
+    if current is not None:
+        formatter.end_group()
+    formatter.end()
+    counts["seconds"] = time.perf_counter() - started
+    return counts
+
+
+###############################################################################
+# 4.3 Tabulation and marks sheets
+###############################################################################
+#
+# The marks of every class being reported are loaded with one query into a
+# single students x subjects NumPy matrix (NaN where a student has no mark,
+# students grouped by class/section). Totals, percentages, grades, class
+# ranks and per-class subject averages are then computed for all classes at
+# once with array operations instead of a Python loop per student; the
+# sheets are just views over those arrays. Absent (NULL) marks count as 0
+# out of the subject's total.
+
+NUMPY_MISSING = "The tabulation and marks sheets need NumPy (pip install numpy)."
+
+_TABULATION_SQL = """
+    SELECT A.ClassName, A.Section, A.GRNo, R.ChildName, M.Subject, M.ObtainedMarks, M.TotalMarks
+    FROM StudentMarks M
+    JOIN StudentAdmitted A ON A.GRNo = M.GRNo
+    JOIN StudentRegistration R ON R.RegNo = A.RegNo
+    WHERE M.AcademicYear = ? AND M.Term = ?
+"""
+
+def competition_ranks(groups, scores):
+    """
+    1-based "1224" ranks of `scores` (higher is better) within each group
+    of `groups` (integer ids), vectorized.
+    """
+    order = np.lexsort((-scores, groups))
+    g, v = groups[order], scores[order]
+    positions = np.arange(len(order))
+    new_group = np.r_[True, g[1:] != g[:-1]]
+    new_score = new_group | np.r_[True, v[1:] != v[:-1]]
+    group_start = np.maximum.accumulate(np.where(new_group, positions, 0))
+    tie_start = np.maximum.accumulate(np.where(new_score, positions, 0))
+    ranks = np.empty(len(order), dtype=np.int64)
+    ranks[order] = tie_start - group_start + 1
+    return ranks
+
+def grades_for(percentages):
+    """
+    grade_for over an array: the band of each percentage in GRADE_BANDS.
+    """
+    lower = np.array([band[0] for band in GRADE_BANDS][::-1], dtype=float)  # ascending
+    labels = np.array([band[1] for band in GRADE_BANDS][::-1])
+    return labels[np.maximum(np.searchsorted(lower, percentages, side="right") - 1, 0)]
+
+class TabulationBatch:
+    """
+    The students x subjects marks of one or more class/sections and their
+    results. Rows of the matrices are students, grouped by class/section
+    (groups[i] is (ClassName, Section), starts[i] its first row).
+    """
+
+    def __init__(self, groups, group_of, gr_nos, names, subjects, obtained, max_marks):
+        started = time.perf_counter()
+        self.groups = groups
+        self.group_of = group_of
+        self.gr_nos = gr_nos
+        self.names = names
+        self.subjects = subjects
+        self.obtained = obtained
+        self.max_marks = max_marks
+        self.starts = np.searchsorted(group_of, np.arange(len(groups)))
+
+        taken = ~np.isnan(max_marks)
+        self.totals = np.nansum(obtained, axis=1)
+        self.max_totals = np.nansum(max_marks, axis=1)
+        self.percentages = np.round(np.divide(self.totals * 100, self.max_totals, out=np.zeros_like(self.totals),
+                                              where=self.max_totals > 0), 2)
+        self.grades = grades_for(self.percentages)
+        self.ranks = competition_ranks(group_of, self.percentages)
+
+        # Per class/section and subject (absent counts as 0, untaken is ignored)
+        if len(groups):
+            marked = np.where(taken, np.nan_to_num(obtained), 0.0)
+            self.subject_totals = np.add.reduceat(marked, self.starts, axis=0)
+            self.subject_counts = np.add.reduceat(taken.astype(np.int64), self.starts, axis=0)
+        else:
+            self.subject_totals = np.zeros((0, len(subjects)))
+            self.subject_counts = np.zeros((0, len(subjects)), dtype=np.int64)
+        self.subject_averages = np.round(np.divide(self.subject_totals, self.subject_counts,
+                                                   out=np.full(self.subject_totals.shape, np.nan),
+                                                   where=self.subject_counts > 0), 2)
+        self.seconds = time.perf_counter() - started
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        rows: (ClassName, Section, GRNo, ChildName, Subject, Obtained, Total)
+        ordered by class, section and GR No.
+        """
+        groups, group_of, gr_nos, names = [], [], [], []
+        subject_index = {}
+        student_rows, subject_cols, obtained, max_marks = [], [], [], []
+        group_key = gr_key = None
+        for (class_name, section, gr_no, name, subject, marks, total) in rows:
+            key = (class_key(class_name), class_key(section))
+            if key != group_key:
+                group_key = key
+                groups.append((class_name, section))
+            if gr_no != gr_key:
+                gr_key = gr_no
+                gr_nos.append(gr_no)
+                names.append(name)
+                group_of.append(len(groups) - 1)
+            student_rows.append(len(gr_nos) - 1)
+            subject_cols.append(subject_index.setdefault(subject, len(subject_index)))
+            obtained.append(np.nan if marks is None else float(marks))
+            max_marks.append(float(total))
+
+        # Subjects in alphabetical order, then scatter the marks into the matrix
+        subjects = sorted(subject_index)
+        column_of = np.empty(len(subjects), dtype=np.int64)
+        column_of[[subject_index[s] for s in subjects]] = np.arange(len(subjects))
+        shape = (len(gr_nos), len(subjects))
+        obtained_matrix = np.full(shape, np.nan)
+        max_matrix = np.full(shape, np.nan)
+        if student_rows:
+            r = np.array(student_rows)
+            c = column_of[np.array(subject_cols)]
+            obtained_matrix[r, c] = obtained
+            max_matrix[r, c] = max_marks
+        return cls(groups, np.array(group_of, dtype=np.int64), gr_nos, names, subjects, obtained_matrix, max_matrix)
+
+    def sheet_rows(self, group):
+        """
+        (first row, last row + 1, subject columns taken in this group).
+        """
+        first = self.starts[group]
+        last = self.starts[group + 1] if group + 1 < len(self.groups) else len(self.gr_nos)
+        columns = np.flatnonzero(self.subject_counts[group] > 0)
+        return first, last, columns
+
+def load_tabulation(academic_year, term, class_name=None, section=None):
+    """
+    TabulationBatch for one class/section, a class, or every class, from a
+    single query.
+    """
+    if np is None:
+        raise RuntimeError(NUMPY_MISSING)
+    sql = _TABULATION_SQL
+    params = [academic_year, term]
+    if class_name:
+        sql += " AND A.ClassName = ?"
+        params.append(class_name)
+    if section:
+        sql += " AND A.Section = ?"
+        params.append(section)
+    with db_session() as conn:
+        cursor = conn.cursor()
+        cursor.execute(sql + " ORDER BY A.ClassName, A.Section, A.GRNo", *params)
+        rows = cursor.fetchall()
+        cursor.close()
+    return TabulationBatch.from_rows(rows)
+
+def _marks_text(value):
+    return "Abs" if np.isnan(value) else f"{value:g}"
+
+def tabulation_sheets(batch):
+    """
+    Yields (title, header, rows, footer) per class/section: every subject,
+    then total, percentage, grade and rank; the footer holds the subject
+    averages.
+    """
+    for (group, (class_name, section)) in enumerate(batch.groups):
+        first, last, columns = batch.sheet_rows(group)
+        header = ["GR No", "Student Name"] + [batch.subjects[c] for c in columns] + ["Total", "Out Of", "%", "Grade", "Rank"]
+        rows = []
+        for i in range(first, last):
+            marks = [_marks_text(batch.obtained[i, c]) if not np.isnan(batch.max_marks[i, c]) else "-" for c in columns]
+            rows.append([batch.gr_nos[i], batch.names[i]] + marks +
+                        [f"{batch.totals[i]:g}", f"{batch.max_totals[i]:g}", f"{batch.percentages[i]:.2f}",
+                         batch.grades[i], str(batch.ranks[i])])
+        footer = ["", "Average"] + [f"{batch.subject_averages[group, c]:g}" for c in columns] + [""] * 5
+        yield f"{class_name or ''} {section or ''}".strip(), header, rows, footer
+
+def marks_sheets(batch, subject=None):
+    """
+    Yields (title, header, rows, footer) per class/section and subject:
+    each student's marks, percentage, grade and rank in that subject.
+    """
+    for (group, (class_name, section)) in enumerate(batch.groups):
+        first, last, columns = batch.sheet_rows(group)
+        for c in columns:
+            if subject and class_key(batch.subjects[c]) != class_key(subject):
+                continue
+            obtained = batch.obtained[first:last, c]
+            out_of = batch.max_marks[first:last, c]
+            taken = ~np.isnan(out_of)
+            percentages = np.round(np.divide(np.nan_to_num(obtained) * 100, out_of, out=np.zeros(len(out_of)),
+                                             where=taken & (out_of > 0)), 2)
+            grades = grades_for(percentages)
+            ranks = competition_ranks(np.where(taken, 0, 1), percentages)
+            rows = [[batch.gr_nos[first + i], batch.names[first + i], _marks_text(obtained[i]), f"{out_of[i]:g}",
+                     f"{percentages[i]:.2f}", grades[i], str(ranks[i])]
+                    for i in np.flatnonzero(taken)]
+            footer = ["", "Average", f"{batch.subject_averages[group, c]:g}", "", "", "", ""]
+            title = f"{class_name or ''} {section or ''} - {batch.subjects[c]}".strip()
+            yield title, ["GR No", "Student Name", "Marks", "Out Of", "%", "Grade", "Rank"], rows, footer
+
+def write_sheets(out, fmt, kind, batch, label, subject=None):
+    """
+    Writes the tabulation ("tabulation") or marks ("marks") sheets of
+    `batch` to `out` as fixed-width "text", "csv" or "html".
+    """
+    sheets = tabulation_sheets(batch) if kind == "tabulation" else marks_sheets(batch, subject)
+    heading = f"{SCHOOL_NAME} - {kind.title()} Sheet - {label}"
+    if fmt == "csv":
+        writer = csv.writer(out)
+        for (title, header, rows, footer) in sheets:
+            writer.writerow(["Class", *header])
+            writer.writerows([title, *row] for row in rows)
+            writer.writerow([title, *footer])
+            writer.writerow([])
+        return
+    if fmt == "html":
+        out.write(Template(_HTML_HEAD).substitute(title=escape(heading)))
+        for (title, header, rows, footer) in sheets:
+            out.write(f'<div class="doc">\n<h2>{escape(heading)}</h2>\n<p>Class: {escape(title)}</p>\n'
+                      '<table class="lines">\n<tr>' + "".join(f"<th>{escape(h)}</th>" for h in header) + "</tr>\n")
+            for row in rows:
+                out.write("<tr>" + "".join(f"<td>{escape(str(v))}</td>" for v in row) + "</tr>\n")
+            out.write('<tr class="total">' + "".join(f"<td>{escape(v)}</td>" for v in footer) + "</tr>\n")
+            out.write("</table>\n</div>\n")
+        out.write(_HTML_TAIL)
+        return
+    for (title, header, rows, footer) in sheets:
+        widths = [6, 24] + [max(6, min(len(h), 10)) for h in header[2:]]
+        line = lambda cells: "  ".join(f"{str(v)[:w]:<{w}}" if i < 2 else f"{str(v)[:w]:>{w}}"
+                                       for (i, (v, w)) in enumerate(zip(cells, widths))).rstrip()
+        rule = "-" * len(line(header))
+        out.write(f"\n{'=' * len(rule)}\n{heading}\nClass: {title}\n{rule}\n{line(header)}\n{rule}\n")
+        for row in rows:
+            out.write(line(row) + "\n")
+        out.write(f"{rule}\n{line(footer)}\n")
+
+def benchmark_tabulation(students=5000, subjects=12, class_size=40, seed=13):
+    """
+    Tabulates a synthetic school (students x subjects, some absentees) and
+    compares the vectorized results with a plain Python loop.
+    """
+    if np is None:
+        print(f"[ERROR] {NUMPY_MISSING}")
+        return
+    import random
+    rng = random.Random(seed)
+    names = [f"Subject {n:02d}" for n in range(subjects)]
+    rows = []
+    for i in range(students):
+        group = i // class_size
+        for subject in names:
+            marks = None if rng.random() < 0.02 else Decimal(rng.randint(10, 100))
+            rows.append((f"Class {group // 4 + 1:02d}", "ABCD"[group % 4], f"{i:05d}", f"Student {i}",
+                         subject, marks, Decimal(100)))
+
+    started = time.perf_counter()
+    batch = TabulationBatch.from_rows(rows)
+    build_time = time.perf_counter() - started
+
+    # The same results one student at a time
+    started = time.perf_counter()
+    by_student = defaultdict(lambda: [0.0, 0.0])
+    group_of = {}
+    for (class_name, section, gr_no, _name, _subject, marks, total) in rows:
+        by_student[gr_no][0] += float(marks or 0)
+        by_student[gr_no][1] += float(total)
+        group_of[gr_no] = (class_name, section)
+    percentage = {gr_no: round(t * 100 / m, 2) for (gr_no, (t, m)) in by_student.items()}
+    grade = {gr_no: grade_for(p) for (gr_no, p) in percentage.items()}
+    by_group = defaultdict(list)
+    for (gr_no, p) in percentage.items():
+        by_group[group_of[gr_no]].append(p)
+    rank = {gr_no: 1 + sum(1 for other in by_group[group_of[gr_no]] if other > p) for (gr_no, p) in percentage.items()}
+    loop_time = time.perf_counter() - started
+
+    same = all(abs(batch.percentages[i] - percentage[g]) < 0.005 and batch.grades[i] == grade[g]
+               and batch.ranks[i] == rank[g] for (i, g) in enumerate(batch.gr_nos))
+    print(f"{students:,} students x {subjects} subjects in {len(batch.groups)} class/sections:")
+    print(f"  matrix build {build_time * 1000:.1f} ms, vectorized results {batch.seconds * 1000:.1f} ms")
+    print(f"  Python loop  {loop_time * 1000:.1f} ms  (results {'match' if same else 'DIFFER'})")
 
 ###############################################################################
 # Main entry point
 ###############################################################################
 
+def _int_arg(args, index, default):
+    return int(args[index]) if len(args) > index else default
+
+# Maintenance commands: python school_management.py <command> [args]
+COMMANDS = {
+    "bench-normalizers": (
+        "bench-normalizers [rows]  - time the column-wise phone/CNIC/DOB normalizers",
+        lambda args: benchmark_normalizers(_int_arg(args, 0, 100_000)),
+    ),
+    "bench-render": (
+        "bench-render [documents]  - time voucher rendering (text/HTML, with and without the process pool)",
+        lambda args: benchmark_rendering(_int_arg(args, 0, 10_000)),
+    ),
+    "bench-sections": (
+        "bench-sections [students]  - time the section balancing heuristic on one synthetic class",
+        lambda args: benchmark_section_planner(_int_arg(args, 0, 1500)),
+    ),
+    "bench-search": (
+        "bench-search [students] [queries]  - time fuzzy name search against a LIKE scan",
+        lambda args: benchmark_name_search(_int_arg(args, 0, 100_000), _int_arg(args, 1, 200)),
+    ),
+    "bench-tabulation": (
+        "bench-tabulation [students] [subjects]  - time the vectorized tabulation sheet on a synthetic school",
+        lambda args: benchmark_tabulation(_int_arg(args, 0, 5000), _int_arg(args, 1, 12)),
+    ),
+    "backfill-contacts": (
+        "backfill-contacts [chunk]  - rebuild the phone number lookup table from StudentRegistration",
+        lambda args: backfill_student_contacts(_int_arg(args, 0, CONTACT_BACKFILL_CHUNK)),
+    ),
+    "reconcile": (
+        "reconcile <statement.csv> [exceptions.csv]  - apply a bank statement to the outstanding fee vouchers",
+        lambda args: print_reconciliation_summary(
+            reconcile_bank_statement(args[0], args[1] if len(args) > 1 else None)),
+    ),
+    "stress-allocator": (
+        "stress-allocator [processes] [threads] [per_thread]  - check RegNo/GRNo allocation for duplicates",
+        lambda args: sys.exit(0 if stress_test_sequence_allocator(
+            _int_arg(args, 0, 4), _int_arg(args, 1, 4), _int_arg(args, 2, 250)) else 1),
+    ),
+}
+
+def run_command(argv):
+    entry = COMMANDS.get(argv[0])
+    if entry is None:
+        print(f"[ERROR] Unknown command: {argv[0]}")
+        print("Available commands:")
+        for (usage, _fn) in COMMANDS.values():
+            print(f"  {usage}")
+        sys.exit(2)
+    entry[1](argv[1:])
+
 def main():
+    if len(sys.argv) > 1:
+        run_command(sys.argv[1:])
+        return
     initialize_database()  # Ensure tables exist
+    load_name_index()
+    load_family_index()
     main_menu()
 
 if __name__ == "__main__":